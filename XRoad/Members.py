@@ -1,45 +1,105 @@
+import dataclasses
 import logging
 from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, ClassVar, cast
+from weakref import WeakValueDictionary
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
 
 _logger = logging.getLogger(__name__)
 
+_FIELDS = (
+    "xRoadInstance",
+    "memberClass",
+    "memberCode",
+    "subsystemCode",
+    "serviceCode",
+    "serviceVersion",
+)
+
 
-@dataclass
+@dataclass(frozen=True, init=False)
 class Members:
     """
     This class is used to parse the memberPath and create a dictionary with the member details.
+
+    Instances are frozen dataclasses and interned: building a `Members` from arguments
+    that are already in use returns the existing instance, whose parts, `member_dict`
+    and `wsdl_path` are computed once. The fields can be passed as before, but parts
+    present in memberPath take precedence. Unlike the earlier mutable dataclass, fields
+    cannot be assigned; use `dataclasses.replace()` instead.
     """
 
+    # The fields have no class-level defaults so they can live in slots; the defaults
+    # are on `__new__()`. The derived values are slots too, filled in by `_parse()`.
+    __slots__ = (*_FIELDS, "objectType", "memberPath", "_member_dict", "_wsdl_path", "__weakref__")
+
     objectType: str  # NOSONAR
     memberPath: str  # NOSONAR
-    xRoadInstance: str | None = None  # NOSONAR
-    memberClass: str | None = None  # NOSONAR
-    memberCode: str | None = None  # NOSONAR
-    subsystemCode: str | None = None  # NOSONAR
-    serviceCode: str | None = None  # NOSONAR
-    serviceVersion: str | None = None  # NOSONAR
-
-    def __post_init__(self):
+    xRoadInstance: str | None  # NOSONAR
+    memberClass: str | None  # NOSONAR
+    memberCode: str | None  # NOSONAR
+    subsystemCode: str | None  # NOSONAR
+    serviceCode: str | None  # NOSONAR
+    serviceVersion: str | None  # NOSONAR
+
+    if TYPE_CHECKING:
+        _member_dict: dict[str, str]
+        _wsdl_path: str | None
+
+    _interned: ClassVar["WeakValueDictionary[tuple[str | None, ...], Members]"] = WeakValueDictionary()
+
+    def __new__(
+            cls,
+            objectType: str,  # NOSONAR
+            memberPath: str,  # NOSONAR
+            xRoadInstance: str | None = None,  # NOSONAR
+            memberClass: str | None = None,  # NOSONAR
+            memberCode: str | None = None,  # NOSONAR
+            subsystemCode: str | None = None,  # NOSONAR
+            serviceCode: str | None = None,  # NOSONAR
+            serviceVersion: str | None = None,  # NOSONAR
+    ) -> "Self":
+        # Fields given for parts that memberPath has are ignored, so they are not part of the key.
+        given = (xRoadInstance, memberClass, memberCode, subsystemCode, serviceCode, serviceVersion)
+        key = (objectType, memberPath, *given[memberPath.count("/") + 1 if memberPath else 0:])
+        member = cls._interned.get(key)
+        if member is None:
+            member = object.__new__(cls)
+            member._parse(objectType, memberPath, given)
+            member = cls._interned.setdefault(key, member)
+        return cast("Self", member)
+
+    def __init__(self, *args: str | None, **kwargs: str | None) -> None:
+        """
+        The instance is set up once, in `__new__()`.
+        """
+
+    def _parse(self, objectType: str, memberPath: str, given: tuple[str | None, ...]) -> None:  # NOSONAR
         """
         This method is used to parse the memberPath and assign the values to the class variables.
-        :return:
         """
-        _logger.debug(f"Members init: {self.memberPath}")
-        if self.memberPath:
-            for iteration, val in enumerate(self.memberPath.split("/")):
-                match iteration:
-                    case 0:
-                        self.xRoadInstance = val
-                    case 1:
-                        self.memberClass = val
-                    case 2:
-                        self.memberCode = val
-                    case 3:
-                        self.subsystemCode = val
-                    case 4:
-                        self.serviceCode = val
-                    case 5:
-                        self.serviceVersion = val
+        _logger.debug("Members init: %s", memberPath)
+        parts = memberPath.split("/") if memberPath else []
+        values = {field: parts[i] if i < len(parts) else given[i] for i, field in enumerate(_FIELDS)}
+        for name, value in (("objectType", objectType), ("memberPath", memberPath), *values.items()):
+            object.__setattr__(self, name, value)
+        member_dict = {field: value for field, value in values.items() if value}
+        if objectType:
+            member_dict["objectType"] = objectType
+        object.__setattr__(self, "_member_dict", member_dict)
+        wsdl_path = None
+        if "SERVICE" in objectType:
+            wsdl_path = "&".join(
+                f"{'version' if field == 'serviceVersion' else field}={value}"
+                for field, value in values.items()
+                if value
+            )
+        object.__setattr__(self, "_wsdl_path", wsdl_path)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return type(self), tuple(getattr(self, field.name) for field in dataclasses.fields(self))
 
     @property
     def wsdl_path(self) -> str:
@@ -47,27 +107,9 @@ class Members:
         This method returns the wsdl path for the service.
         :return: String
         """
-        if "SERVICE" in self.objectType:
-            _path = []
-            for key, value in self.member_dict.items():
-                if not value:
-                    _logger.debug(f"Skipping {key} as value is None")
-                    continue
-                if key in ("objectType", "memberPath"):
-                    _logger.debug(f"Skipping {key}")
-                    continue
-                if value is None:
-                    _logger.debug(f"Skipping {key}")
-                    continue
-                if "serviceVersion" in key:
-                    _logger.debug(f"Adding version={value}")
-                    _path.append(f"version={value}")
-                    continue
-                _logger.debug(f"Adding {key}={value}")
-                _path.append(f"{key}={value}")
-            _logger.info(f"wsdl path: {_path[:-1]}")
-            return "&".join(_path)
-        raise ValueError("wsdl_path is only available for SERVICE objectType")
+        if self._wsdl_path is None:
+            raise ValueError("wsdl_path is only available for SERVICE objectType")
+        return self._wsdl_path
 
     def wsdl_url(self, ssu: str) -> str:
         """
@@ -75,30 +117,12 @@ class Members:
         :param: Ssu - url to securyt server
         :return: String
         """
-        _logger.info(f"Generating wsdl url for {ssu}")
         return f"{ssu}/wsdl?{self.wsdl_path}"
 
     @property
     def member_dict(self) -> dict[str, str]:
         """
         This method returns the member details in a dictionary format.
-        :return: Dict
+        :return: Dict - a copy, the caller may change it.
         """
-        _logger.info("Returning member details as dictionary")
-        r = {}
-        if self.xRoadInstance:
-            r["xRoadInstance"] = self.xRoadInstance
-        if self.memberClass:
-            r["memberClass"] = self.memberClass
-        if self.memberCode:
-            r["memberCode"] = self.memberCode
-        if self.subsystemCode:
-            r["subsystemCode"] = self.subsystemCode
-        if self.serviceCode:
-            r["serviceCode"] = self.serviceCode
-        if self.serviceVersion:
-            r["serviceVersion"] = self.serviceVersion
-        if self.objectType:
-            r["objectType"] = self.objectType
-
-        return r
+        return dict(self._member_dict)
@@ -1,16 +1,51 @@
-from .client import XClient
-from .transport import DRACTransport
+from .client import AsyncXClient, XClient, gather, preload, prewarm
+from .transport import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DRACTransport,
+    PooledTransport,
+    RequestCompression,
+)
 from zeep.cache import SqliteCache, InMemoryCache
 from zeep.transports import Transport
-from .cache import RedisCache
+from .cache import LRUCache, RedisCache
+from .catalog import ServiceCatalog, UnknownServiceError
+from .coalesce import RequestCoalescer
+from .limiter import LimiterTimeout, ServiceLimiter
+from .plugins import CallLogPlugin, MetricsPlugin
+from .registry import WSDLRegistry, wsdl_registry
+from .response import LazyElement
+from .response_cache import ResponseCache
+from .wsdl_cache import CompiledWSDLCache
 
 __all__ = [
     "XClient",
+    "AsyncXClient",
+    "gather",
+    "prewarm",
+    "preload",
     "Transport",
     "DRACTransport",
+    "PooledTransport",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "RequestCompression",
     "RedisCache",
+    "LRUCache",
     "SqliteCache",
     "InMemoryCache",
+    "WSDLRegistry",
+    "wsdl_registry",
+    "CompiledWSDLCache",
+    "ResponseCache",
+    "RequestCoalescer",
+    "LazyElement",
+    "ServiceLimiter",
+    "LimiterTimeout",
+    "MetricsPlugin",
+    "CallLogPlugin",
+    "ServiceCatalog",
+    "UnknownServiceError",
 ]
 
 __author__ = "Andrii Shapovalov"
@@ -0,0 +1,18 @@
+import argparse
+import sys
+
+from . import batch
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m XRoad")
+    commands = parser.add_subparsers(dest="command", required=True)
+    batch.configure(
+        commands.add_parser("batch", help="Call one service for every line of a JSONL or CSV file")
+    )
+    args = parser.parse_args(argv)
+    return batch.main(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
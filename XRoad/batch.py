@@ -0,0 +1,379 @@
+"""
+Bulk calls of one X-Road service, run from the command line:
+
+    python -m XRoad batch --ssu http://security-server:8080 \\
+        --client INSTANCE/CLASS/CODE/SUBSYSTEM \\
+        --service INSTANCE/CLASS/CODE/SUBSYSTEM/Service/v1 \\
+        calls.jsonl -o results.jsonl --workers 8 --rate 50
+
+Every line of a JSONL input (or row of a CSV input) holds the keyword arguments of
+one `XClient.request()` call. The calls run on a pool of worker processes, each with
+its own `XClient`, so parsing and serializing scale past the GIL. The WSDL is
+loaded once by the parent; forked workers inherit it.
+
+The outcome of every call is appended to the output as one JSON line:
+
+    {"index": 17, "status": "ok", "transaction_id": "...", "seconds": 0.21, "result": {...}}
+    {"index": 18, "status": "fault", "fault": {"code": "...", "message": "..."}, ...}
+    {"index": 19, "status": "error", "error": {"type": "ReadTimeout", "message": "..."}, ...}
+
+`index` is the position of the call in the input. Lines are written in completion
+order. The output doubles as the checkpoint: ``--resume`` skips the calls that
+already have an "ok" or "fault" line and runs the rest, including the failed ones,
+again. Calls that finished but were not written yet when a run was killed are
+made again, so every call runs at least once.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from typing import IO, Any
+
+import requests
+from lxml import etree
+from zeep.exceptions import Error, Fault
+from zeep.plugins import Plugin
+
+from .client import XClient
+from .limiter import ServiceLimiter
+from .registry import wsdl_registry
+
+_DONE = ("ok", "fault")
+
+# What a single call can fail with, including zeep's TypeError for unknown
+# arguments; anything else is a bug and stops the run.
+_CALL_ERRORS = (
+    requests.RequestException,
+    Error,
+    etree.LxmlError,
+    OSError,
+    LookupError,
+    TypeError,
+    ValueError,
+)
+
+
+class _TransactionPlugin(Plugin):
+    """
+    Remembers the `uxp-transaction-id` header of the last response.
+    """
+
+    def __init__(self) -> None:
+        self.transaction_id: str | None = None
+
+    def ingress(self, envelope, http_headers, operation):
+        self.transaction_id = http_headers.get("uxp-transaction-id")
+        return envelope, http_headers
+
+
+_worker: tuple[XClient, _TransactionPlugin] | None = None
+
+
+def _init_worker(ssu: str, client: str, service: str) -> None:
+    global _worker
+    plugin = _TransactionPlugin()
+    _worker = XClient(ssu, client, service, registry=wsdl_registry, plugins=[plugin]), plugin
+
+
+def _fault(error: Fault) -> dict[str, Any]:
+    # XClient.request re-raises a Fault wrapping the original one.
+    while isinstance(error.message, Fault):
+        error = error.message
+    return {"code": error.code, "message": str(error.message)}
+
+
+def _call(index: int, kwargs: dict[str, Any]) -> tuple[str, float, str]:
+    """
+    Makes one call in a worker process.
+
+    :return: The status, the duration in seconds and the JSON line of the outcome.
+    """
+    assert _worker is not None
+    client, plugin = _worker
+    plugin.transaction_id = None
+    record: dict[str, Any] = {"index": index}
+    started = time.perf_counter()
+    try:
+        result = client.request(**kwargs)
+        record.update(status="ok", result=result)
+    except Fault as error:
+        record.update(status="fault", fault=_fault(error))
+    except _CALL_ERRORS as error:
+        record.update(status="error", error={"type": type(error).__name__, "message": str(error)})
+    seconds = time.perf_counter() - started
+    record.update(transaction_id=plugin.transaction_id, seconds=round(seconds, 6))
+    return record["status"], seconds, json.dumps(record, ensure_ascii=False, default=str)
+
+
+def read_calls(file: IO[str], fmt: str) -> Iterator[dict[str, Any]]:
+    """
+    Streams the keyword arguments of the calls from a JSONL or CSV file.
+
+    Empty CSV cells are left out, so optional elements can be omitted per row.
+
+    :param file: The open input file.
+    :param fmt: "jsonl" or "csv".
+    :return: A generator of kwargs dicts, one per call.
+    :raises ValueError: If a JSONL line is not valid JSON.
+    :raises TypeError: If a JSONL line is not a JSON object.
+    """
+    if fmt == "csv":
+        for row in csv.DictReader(file):
+            yield {key: value for key, value in row.items() if value not in ("", None)}
+        return
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        call = json.loads(line)
+        if not isinstance(call, dict):
+            raise TypeError(f"Line {number} is not a JSON object")
+        yield call
+
+
+def checkpoint(path: str) -> set[int]:
+    """
+    Reads the indexes of the finished calls from a previous output file.
+
+    A last line cut short by a killed run is removed from the file, so appending
+    to it starts on a fresh line.
+
+    :param path: The output file.
+    :return: The indexes of the calls with an "ok" or "fault" line.
+    """
+    done: set[int] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as file:
+        content = file.read()
+        end = content.rfind(b"\n") + 1
+        if end < len(content):
+            file.truncate(end)
+    for line in content[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get("status") in _DONE:
+            done.add(record["index"])
+    return done
+
+
+class BatchStats:
+    """
+    Counts the outcomes of a batch run and reports its throughput.
+    """
+
+    def __init__(self, skipped: int = 0):
+        self.skipped = skipped
+        self.ok = 0
+        self.faults = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.started = time.monotonic()
+        self._reported = (self.started, 0)
+
+    @property
+    def done(self) -> int:
+        return self.ok + self.faults + self.errors
+
+    def add(self, status: str) -> None:
+        if status == "ok":
+            self.ok += 1
+        elif status == "fault":
+            self.faults += 1
+        else:
+            self.errors += 1
+
+    def report(self) -> str:
+        """
+        Formats the counters with the average and the recent calls per second.
+        """
+        now = time.monotonic()
+        since, done_then = self._reported
+        self._reported = (now, self.done)
+        average = self.done / max(now - self.started, 1e-9)
+        recent = (self.done - done_then) / max(now - since, 1e-9)
+        return (
+            f"{self.done} done ({self.ok} ok, {self.faults} faults, {self.errors} errors), "
+            f"{self.skipped} skipped, {self.in_flight} in flight, "
+            f"{recent:.1f} calls/s now, {average:.1f} calls/s overall"
+        )
+
+
+def run(
+        ssu: str,
+        client: str,
+        service: str,
+        calls: Iterable[tuple[int, dict[str, Any]]],
+        output: IO[str],
+        workers: int = 4,
+        rate: float | None = None,
+        in_flight: int | None = None,
+        redis: str | None = None,
+        stats: BatchStats | None = None,
+        stats_interval: float = 5.0,
+        stats_file: IO[str] | None = None,
+) -> BatchStats:
+    """
+    Runs the calls on a process pool and writes one JSON line per outcome.
+
+    Submissions are paced by a `ServiceLimiter`: at most `rate` calls per second
+    and `in_flight` calls submitted but not finished. The limit shrinks while calls
+    fail with errors other than SOAP faults.
+
+    :param ssu: The security server URL.
+    :param client: The CLIENT member path.
+    :param service: The SERVICE member path.
+    :param calls: (index, kwargs) pairs; consumed lazily.
+    :param output: The open output file.
+    :param workers: The number of worker processes.
+    :param rate: Calls per second over all workers; None does not limit the rate.
+    :param in_flight: The maximum number of unfinished calls; defaults to four per worker.
+    :param redis: A Redis URL to share the rate limit with other runs.
+    :param stats: The counters to update; a new `BatchStats` when None.
+    :param stats_interval: Seconds between two progress lines.
+    :param stats_file: Where progress lines are written; None writes none.
+    :return: The final counters.
+    :raises ValueError: If `workers` or `in_flight` is less than 1.
+    :raises BrokenProcessPool: If a worker process died; the unfinished calls have
+        no output line and are made again by a resumed run.
+    """
+    in_flight = in_flight or 4 * workers
+    if workers < 1 or in_flight < 1:
+        raise ValueError("workers and in_flight must be at least 1")
+    stats = stats or BatchStats()
+    limiter = ServiceLimiter(
+        rate=rate,
+        max_concurrency=in_flight,
+        initial_concurrency=in_flight,
+        timeout=None,
+        redis=redis,
+    )
+    # Loaded here first: a bad address fails at once, and forked workers find the
+    # parsed WSDL in the registry.
+    XClient(ssu, client, service, registry=wsdl_registry)
+
+    pending: dict[Future, str] = {}
+    iterator = iter(calls)
+    call = next(iterator, None)
+    next_report = time.monotonic() + stats_interval
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(ssu, client, service)) as pool:
+        try:
+            while call is not None or pending:
+                timeout = max(next_report - time.monotonic(), 0.0)
+                if call is not None:
+                    token, retry = limiter.try_acquire(service)
+                    if token is not None:
+                        pending[pool.submit(_call, *call)] = token
+                        stats.in_flight = len(pending)
+                        call = next(iterator, None)
+                        continue
+                    timeout = min(timeout, retry)
+                if pending:
+                    finished, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    finished = set()
+                    time.sleep(timeout)
+                for future in finished:
+                    try:
+                        status, seconds, line = future.result()
+                    except BrokenProcessPool as error:
+                        raise BrokenProcessPool(
+                            f"A worker process died, {len(pending)} calls were not finished"
+                        ) from error
+                    limiter.release(service, pending.pop(future), seconds, status == "error")
+                    output.write(line + "\n")
+                    stats.add(status)
+                stats.in_flight = len(pending)
+                if time.monotonic() >= next_report:
+                    output.flush()
+                    if stats_file is not None:
+                        print(stats.report(), file=stats_file, flush=True)
+                    next_report = time.monotonic() + stats_interval
+        finally:
+            for future in pending:
+                future.cancel()
+            output.flush()
+    return stats
+
+
+def configure(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the arguments of the batch command to `parser`.
+    """
+    parser.add_argument("input", help="A JSONL or CSV file of call kwargs; '-' reads stdin")
+    parser.add_argument("-o", "--output", required=True, help="The JSONL file of the outcomes")
+    parser.add_argument("--ssu", required=True, help="The security server URL")
+    parser.add_argument("--client", required=True, help="The CLIENT member path")
+    parser.add_argument("--service", required=True, help="The SERVICE member path")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="The input format (default: by extension)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--rate", type=float, help="Calls per second over all workers")
+    parser.add_argument("--in-flight", type=int, help="Unfinished calls at most (default: 4 per worker)")
+    parser.add_argument("--redis", help="A Redis URL to share the rate limit between runs")
+    parser.add_argument("--resume", action="store_true", help="Continue an existing output file")
+    parser.add_argument("--stats-interval", type=float, default=5.0, help="Seconds between progress lines")
+
+
+def main(args: argparse.Namespace) -> int:
+    """
+    Runs the batch command.
+
+    :return: The exit status: 0 when every call got a response or a fault, 1 when
+        some calls failed, 2 on bad arguments or input and 3 when a worker process
+        died or a file could not be read or written.
+    """
+    if os.path.exists(args.output) and os.path.getsize(args.output) and not args.resume:
+        print(f"{args.output} exists; pass --resume to continue it", file=sys.stderr)
+        return 2
+    done = checkpoint(args.output) if args.resume else set()
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    stats = BatchStats()
+
+    def pending(file: IO[str]) -> Iterator[tuple[int, dict[str, Any]]]:
+        for index, call in enumerate(read_calls(file, fmt)):
+            if index in done:
+                stats.skipped += 1
+            else:
+                yield index, call
+
+    try:
+        with (
+            nullcontext(sys.stdin) if args.input == "-" else open(args.input, encoding="utf-8", newline="")
+        ) as source, open(args.output, "a", encoding="utf-8") as output:
+            run(
+                args.ssu,
+                args.client,
+                args.service,
+                pending(source),
+                output,
+                workers=args.workers,
+                rate=args.rate,
+                in_flight=args.in_flight,
+                redis=args.redis,
+                stats=stats,
+                stats_interval=args.stats_interval,
+                stats_file=sys.stderr,
+            )
+    except KeyboardInterrupt:
+        print("Interrupted; run again with --resume to continue", file=sys.stderr)
+        return 130
+    except (TypeError, ValueError) as error:
+        print(f"Bad input: {error}", file=sys.stderr)
+        return 2
+    except BrokenProcessPool as error:
+        print(f"{error}; run again with --resume to continue", file=sys.stderr)
+        return 3
+    except OSError as error:
+        print(f"Stopped: {error}; run again with --resume to continue", file=sys.stderr)
+        return 3
+    finally:
+        print(stats.report(), file=sys.stderr)
+    return 1 if stats.errors else 0
@@ -1,16 +1,144 @@
 import hashlib
 import logging
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
 from typing import Any, Optional, cast
 
 from zeep.cache import Base, InMemoryCache
+from zeep.exceptions import Error
+
+from . import fork
 
 _logger = logging.getLogger(__name__)
 
+_REDIS_ERRORS: tuple[type[Exception], ...] = ()
 try:
     from redis import Redis
+    from redis.exceptions import RedisError, WatchError
+
+    _REDIS_ERRORS = (RedisError,)
 except ImportError:
     Redis = None  # type: ignore[assignment, misc]
 
+_DECOMPRESS_ERRORS: tuple[type[Exception], ...] = (zlib.error,)
+try:
+    import zstandard
+
+    _DECOMPRESS_ERRORS += (zstandard.ZstdError,)
+except ImportError:
+    zstandard = None  # type: ignore[assignment]
+
+# What a background refresh can fail with: fetching the URL or storing it in Redis.
+_REFRESH_ERRORS: tuple[type[Exception], ...] = (OSError, Error, *_REDIS_ERRORS)
+
+_COMPRESSION_MARKERS = {"zlib": b"$XROAD:zlib$", "zstd": b"$XROAD:zstd$"}
+
+
+class LRUCache(Base):
+    """
+    A bounded in-process cache with least-recently-used eviction.
+
+    Unlike zeep's `InMemoryCache`, which keeps every entry in a class-level dict, this
+    cache is limited both by the number of entries and by their total size, and every
+    entry may have its own expiry. It is used as the local tier of `RedisCache`, but
+    works as a standalone zeep cache as well.
+
+    :ivar hits: The number of lookups served from this cache.
+    :type hits: Int
+    :ivar misses: The number of lookups not found or expired.
+    :type misses: Int
+    """
+
+    def __init__(self, maxsize: int = 256, maxbytes: int = 64 * 1024 * 1024, timeout: int = 3600):
+        """
+        :param maxsize: The maximum number of entries.
+        :param maxbytes: The maximum total size of the cached content in bytes. Larger
+            single entries are not cached.
+        :param timeout: The default time-to-live of an entry in seconds.
+        """
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        fork.register(self)
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+    def add(self, url: str, content: bytes, timeout: float | None = None):
+        """
+        Adds content to the cache, evicting the least recently used entries.
+
+        :param url: The URL used as the key.
+        :param content: The content to cache.
+        :param timeout: The time-to-live of this entry in seconds; defaults to `timeout`.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if timeout <= 0 or len(content) > self.maxbytes:
+            return
+        expires = time.monotonic() + timeout
+        with self._lock:
+            self._discard(url)
+            self._entries[url] = (expires, content)
+            self._size += len(content)
+            while len(self._entries) > self.maxsize or self._size > self.maxbytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def get(self, url: str) -> bytes | None:
+        """
+        Retrieves content from the cache if present and not expired.
+
+        :param url: The URL used as the key.
+        :return: The cached content or None.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and entry[0] < time.monotonic():
+                self._discard(url)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(url)
+            self.hits += 1
+            return entry[1]
+
+    def _discard(self, url: str) -> None:
+        entry = self._entries.pop(url, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def clear(self) -> None:
+        """
+        Drops every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def size(self) -> int:
+        """
+        The total size of the cached content in bytes.
+        """
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        # zeep skips falsy caches (`if self.cache:`), so an empty cache must be truthy.
+        return True
+
 
 class RedisCache(Base):
     """
@@ -28,13 +156,24 @@ class RedisCache(Base):
     :type ttl: Int
     :ivar prefix: The prefix used to generate cache keys.
     :type prefix: String
+    :ivar local: The optional in-process tier in front of Redis.
+    :type local: LRUCache | None
+    :ivar hits: The number of lookups served by Redis.
+    :type hits: Int
+    :ivar misses: The number of lookups missing in Redis.
+    :type misses: Int
+    :ivar stale: The number of lookups that found a stale entry.
+    :type stale: Int
+    :ivar fetch: Loads a URL for background refreshes of stale entries.
+    :type fetch: Callable | None
     """
 
     _version = "1"
     
     redis_client: Optional[Any]
 
-    def __new__(cls,  path: str | Any | None = None, timeout: int = 3600):
+    def __new__(cls, path: str | Any | None = None, timeout: int = 3600, *args, **kwargs):
+        # Takes the same arguments as __init__; only path and timeout matter here.
         if Redis is None:
             _logger.warning("Redis is not installed, caching will not be available")
             return InMemoryCache(timeout=timeout)
@@ -48,7 +187,7 @@ class RedisCache(Base):
 
         try:
             redis_client.ping()
-        except Exception as e:
+        except _REDIS_ERRORS as e:
             _logger.warning("Could not connect to Redis: %s. Caching will not be available. Error: %s", path, e)
             return InMemoryCache(timeout=timeout)
 
@@ -56,7 +195,21 @@ class RedisCache(Base):
         instance.redis_client = redis_client
         return instance
 
-    def __init__(self, path: str | Redis | None = None, timeout: int = 3600):
+    def __init__(
+            self,
+            path: str | Redis | None = None,
+            timeout: int = 3600,
+            local_size: int = 0,
+            local_bytes: int = 64 * 1024 * 1024,
+            local_ttl: int | None = None,
+            single_flight: bool = False,
+            lock_timeout: float = 10.0,
+            wait_timeout: float = 5.0,
+            stale_ttl: int = 0,
+            fetch: Callable[[str], bytes] | None = None,
+            compression: str | None = None,
+            compress_min_size: int = 1024,
+    ):
         """
         Initializes a cache object for managing data with Redis as a backend.
 
@@ -64,16 +217,159 @@ class RedisCache(Base):
             object. If none is provided, a TypeError is raised.
         :param timeout: The time-to-live (TTL) for the cached data, specified in seconds.
             Defaults to 3600 seconds (1 hour).
+        :param local_size: The number of entries kept in an in-process LRU tier in front
+            of Redis. Local hits cost neither a network round trip nor a key hash.
+            Defaults to 0, which disables the local tier.
+        :param local_bytes: The maximum total size of the local tier in bytes.
+        :param local_ttl: The time-to-live of local entries in seconds. It is capped by
+            `timeout` and by the remaining Redis TTL of each entry, so the local tier
+            never serves an entry Redis has already expired.
+        :param single_flight: Coordinate refreshes across processes. On a miss only the
+            worker that wins a short Redis lock gets None (and loads the URL); the
+            others wait up to `wait_timeout` seconds for its result.
+        :param lock_timeout: Seconds after which an unreleased refresh lock expires,
+            e.g. when the loading worker died.
+        :param wait_timeout: Seconds a worker waits for another worker's refresh before
+            loading the URL itself.
+        :param stale_ttl: Seconds an entry is kept after `timeout` (the soft TTL) as a
+            stale copy. A stale hit is served to everyone except the one worker that
+            wins the refresh lock, so entries are refreshed before Redis drops them.
+            Defaults to 0, which disables stale entries.
+        :param fetch: A callable returning the content of a URL, e.g. one built on the
+            transport's `session` (not `Transport.load()`, which reads this cache back).
+            When set, the lock winner of a stale hit also gets the stale copy and the
+            entry is refreshed by `fetch` in a background thread.
+        :param compression: "zlib" or "zstd" (needs the `zstandard` package) to store
+            compressed content behind a format marker. Entries are read correctly
+            whatever the setting, so it can be changed on a live fleet. Defaults to None.
+        :param compress_min_size: Content smaller than this many bytes is stored raw.
 
         :raises TypeError: If `path` is not a string or an instance of Redis.
+        :raises ValueError: If `compression` is unknown or its package is missing.
         """
         self.ttl = timeout
         self.prefix = "zeep:cache:"
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.single_flight = single_flight
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.stale_ttl = stale_ttl
+        self.fetch = fetch
+        self._locks: dict[str, str] = {}
+        if compression not in (None, *_COMPRESSION_MARKERS):
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        self.compression = compression
+        self.compress_min_size = compress_min_size
+        self.local: LRUCache | None = None
+        if local_size > 0:
+            local_ttl = min(local_ttl or timeout, timeout)
+            self.local = LRUCache(maxsize=local_size, maxbytes=local_bytes, timeout=local_ttl)
+        fork.register(self)
+
+    def _after_fork(self) -> None:
+        # Single-flight locks taken by the parent are left to expire in Redis.
+        self._locks = {}
+        fork.reset_redis(self.redis_client)
 
     def _key(self, url: str) -> str:
         digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
         return f"{self.prefix}{digest}"
 
+    def _encode(self, content: bytes) -> bytes:
+        if self.compression is None or len(content) < self.compress_min_size:
+            return content
+        if self.compression == "zstd":
+            compressed = cast(bytes, zstandard.ZstdCompressor().compress(content))
+        else:
+            compressed = zlib.compress(content, 6)
+        return _COMPRESSION_MARKERS[self.compression] + compressed
+
+    @staticmethod
+    def _decode(value: bytes | None) -> bytes | None:
+        """
+        Returns the content of a stored value, raw (written without compression or by
+        an older version) or compressed behind a format marker.
+        """
+        if not value or not value.startswith(b"$XROAD:"):
+            return value
+        try:
+            if value.startswith(_COMPRESSION_MARKERS["zlib"]):
+                return zlib.decompress(value[len(_COMPRESSION_MARKERS["zlib"]):])
+            if value.startswith(_COMPRESSION_MARKERS["zstd"]) and zstandard is not None:
+                return cast(
+                    bytes,
+                    zstandard.ZstdDecompressor().decompress(value[len(_COMPRESSION_MARKERS["zstd"]):]),
+                )
+        except _DECOMPRESS_ERRORS as e:
+            _logger.warning("Could not decompress %d bytes of cached content, ignoring it: %s", len(value), e)
+            return None
+        _logger.warning("Cached content has an unsupported format, ignoring it")
+        return None
+
+    def _fresh_key(self, key: str) -> str:
+        return f"{key}:fresh" if self.stale_ttl else key
+
+    def _lock_key(self, key: str) -> str:
+        return f"{key}:lock"
+
+    def _acquire(self, url: str, key: str) -> bool:
+        """
+        Tries to take the refresh lock of `url` for this cache instance.
+        """
+        if self.redis_client is None:
+            return True
+        token = uuid.uuid4().hex
+        lock_ms = int(self.lock_timeout * 1000)
+        if self.redis_client.set(self._lock_key(key), token, nx=True, px=lock_ms):
+            self._locks[url] = token
+            return True
+        return False
+
+    def _release(self, url: str, key: str) -> None:
+        """
+        Releases the refresh lock of `url` if this cache instance still owns it.
+        """
+        token = self._locks.pop(url, None)
+        if token is None or self.redis_client is None:
+            return
+        lock_key = self._lock_key(key)
+        with self.redis_client.pipeline() as pipe:
+            try:
+                pipe.watch(lock_key)
+                if pipe.get(lock_key) == token.encode("ascii"):
+                    pipe.multi()
+                    pipe.delete(lock_key)
+                    pipe.execute()
+            except WatchError:
+                _logger.debug("Refresh lock of %s changed before release", url)
+
+    def _refresh(self, url: str, key: str) -> None:
+        try:
+            self.add(url, self.fetch(url))  # type: ignore[misc]
+        except _REFRESH_ERRORS as e:
+            _logger.warning("Background refresh of %s failed, the stale entry stays: %s", url, e)
+        finally:
+            # add() has released the lock already unless the refresh failed.
+            self._release(url, key)
+
+    def _wait(self, key: str) -> bytes | None:
+        """
+        Polls Redis for an entry another worker is loading.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        delay = 0.01
+        while self.redis_client is not None and time.monotonic() < deadline:
+            time.sleep(delay)
+            content = self._decode(self.redis_client.get(key))
+            if content:
+                return content
+            delay = min(delay * 2, 0.2)
+        return None
+
     def add(self, url: str, content: bytes):
         """
         Adds content to the cache associated with a specific URL.
@@ -83,6 +379,10 @@ class RedisCache(Base):
         caching is generated from the URL, which ensures that the content is identifiable
         and retrievable.
 
+        With `stale_ttl` the entry is kept `stale_ttl` seconds longer in Redis and a
+        companion key marks it fresh for `timeout` seconds. A refresh lock taken by
+        `get()` is released.
+
         :param url: The URL to serve as the key for caching. It must be a string.
         :param content: The content to cache, provided as a sequence of bytes.
         :return: None
@@ -90,7 +390,83 @@ class RedisCache(Base):
         _logger.debug("Caching contents of %s", url)
         key = self._key(url)
         if self.redis_client is not None:
-            self.redis_client.set(key, content, ex=self.ttl)
+            pipe = self.redis_client.pipeline(transaction=False)
+            self._store(pipe, key, content)
+            pipe.execute()
+            self._release(url, key)
+        if self.local is not None:
+            self.local.add(url, content)
+
+    def _store(self, pipe: Any, key: str, content: bytes) -> None:
+        """
+        Queues the commands storing one entry on a pipeline.
+        """
+        if self.stale_ttl:
+            pipe.set(key, self._encode(content), ex=self.ttl + self.stale_ttl)
+            pipe.set(self._fresh_key(key), b"1", ex=self.ttl)
+        else:
+            pipe.set(key, self._encode(content), ex=self.ttl)
+
+    def add_many(self, items: Iterable[tuple[str, bytes]]) -> None:
+        """
+        Adds many entries in a single pipelined round trip, e.g. to pre-warm the cache
+        with a WSDL and all of its XSD imports.
+
+        :param items: (url, content) pairs.
+        """
+        items = list(items)
+        if self.redis_client is not None and items:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for url, content in items:
+                self._store(pipe, self._key(url), content)
+            pipe.execute()
+            for url, _ in items:
+                self._release(url, self._key(url))
+        if self.local is not None:
+            for url, content in items:
+                self.local.add(url, content)
+
+    def get_many(self, urls: Iterable[str]) -> dict[str, bytes | None]:
+        """
+        Retrieves many entries in a single pipelined round trip. Entries found in
+        Redis are also put into the local tier, so a following zeep load of those URLs
+        does not touch the network at all.
+
+        Unlike `get()`, this does not take refresh locks: stale or missing entries are
+        returned as None.
+
+        :param urls: The URLs to look up.
+        :return: A dict of url to content, None for misses.
+        :rtype: Dict
+        """
+        result: dict[str, bytes | None] = {}
+        pending = []
+        for url in urls:
+            content = self.local.get(url) if self.local is not None else None
+            result[url] = content
+            if not content:
+                pending.append(url)
+        if self.redis_client is None or not pending:
+            return result
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for url in pending:
+            key = self._key(url)
+            pipe.get(key)
+            pipe.pttl(self._fresh_key(key))
+        replies = pipe.execute()
+        for index, url in enumerate(pending):
+            value, ttl_ms = replies[2 * index], replies[2 * index + 1]
+            content = self._decode(value)
+            if content and (not self.stale_ttl or ttl_ms != -2):
+                self.hits += 1
+                result[url] = content
+                if self.local is not None:
+                    remaining = ttl_ms / 1000 if ttl_ms and ttl_ms > 0 else self.local.timeout
+                    self.local.add(url, content, min(self.local.timeout, remaining))
+            else:
+                self.misses += 1
+        return result
 
     def get(self, url: str) -> bytes | None:
         """
@@ -98,17 +474,79 @@ class RedisCache(Base):
         found in the cache (cache hit), it is returned. Otherwise, it logs a cache
         miss and returns None.
 
+        With `single_flight` or `stale_ttl`, None means "load it and call `add()`":
+        it is only returned to the worker that won the refresh lock, or after waiting
+        `wait_timeout` seconds for another worker.
+
         :param url: The URL used to retrieve the cached content.
         :type url: String
         :return: The cached content as bytes if the key exists in the cache; None
             otherwise.
         :rtype: Bytes or None
         """
-        key = self._key(url)
-        if self.redis_client is not None:
-            content = cast(bytes | None, self.redis_client.get(key))
+        if self.local is not None:
+            content = self.local.get(url)
             if content:
-                _logger.debug("Cache HIT for %s", url)
+                _logger.debug("Local cache HIT for %s", url)
                 return content
+
+        key = self._key(url)
+        if self.redis_client is None:
+            self.misses += 1
+            _logger.debug("Cache MISS for %s", url)
+            return None
+
+        if self.local is not None or self.stale_ttl:
+            pipe = self.redis_client.pipeline()
+            value, ttl_ms = pipe.get(key).pttl(self._fresh_key(key)).execute()
+            fresh = not self.stale_ttl or ttl_ms != -2
+        else:
+            value, ttl_ms, fresh = self.redis_client.get(key), None, True
+        content = self._decode(value)
+
+        if content and fresh:
+            self.hits += 1
+            if self.local is not None:
+                remaining = ttl_ms / 1000 if ttl_ms and ttl_ms > 0 else self.local.timeout
+                self.local.add(url, content, min(self.local.timeout, remaining))
+            _logger.debug("Cache HIT for %s", url)
+            return content
+
+        if content:
+            self.stale += 1
+            if not self._acquire(url, key):
+                _logger.debug("Cache STALE for %s, refreshed elsewhere", url)
+                return content
+            if self.fetch is not None:
+                _logger.debug("Cache STALE for %s, refreshing in background", url)
+                threading.Thread(target=self._refresh, args=(url, key), daemon=True).start()
+                return content
+            _logger.debug("Cache STALE for %s, refreshing", url)
+            return None
+
+        self.misses += 1
         _logger.debug("Cache MISS for %s", url)
+        if self.single_flight and not self._acquire(url, key):
+            content = self._wait(key)
+            if content:
+                self.hits += 1
+                return content
         return None
+
+    @property
+    def stats(self) -> dict[str, dict[str, int]]:
+        """
+        Hit and miss counters of each tier.
+
+        :return: ``{"local": {"hits": ..., "misses": ...}, "redis": {..., "stale": ...}}``; the
+            local counters are zero when the local tier is disabled.
+        :rtype: Dict
+        """
+        local = self.local
+        return {
+            "local": {
+                "hits": local.hits if local else 0,
+                "misses": local.misses if local else 0,
+            },
+            "redis": {"hits": self.hits, "misses": self.misses, "stale": self.stale},
+        }
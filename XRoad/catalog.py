@@ -0,0 +1,360 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from lxml import etree
+from zeep.exceptions import Fault, TransportError
+
+from . import fork
+from .Members import Members
+from .transport import PooledTransport
+
+_logger = logging.getLogger(__name__)
+
+SOAP_NS = "http://schemas.xmlsoap.org/soap/envelope/"
+XROAD_NS = "http://x-road.eu/xsd/xroad.xsd"
+IDENTIFIERS_NS = "http://x-road.eu/xsd/identifiers"
+METASERVICES = ("listMethods", "allowedMethods")
+_PARTS = ("xRoadInstance", "memberClass", "memberCode", "subsystemCode", "serviceCode", "serviceVersion")
+
+
+class UnknownServiceError(ValueError):
+    """
+    Raised when a service path is not in the `ServiceCatalog`.
+    """
+
+
+def _local(tag: Any) -> str:
+    return etree.QName(tag).localname if isinstance(tag, str) else ""
+
+
+def _member(identifier: etree._Element) -> Members | None:
+    """
+    Builds a `Members` from an X-Road identifier element, whatever its namespace.
+    """
+    object_type = next(
+        (value for name, value in identifier.attrib.items() if _local(name) == "objectType"), None
+    )
+    parts = {_local(child.tag): (child.text or "").strip() for child in identifier}
+    if not object_type or not parts.get("xRoadInstance"):
+        return None
+    values = [parts.get(name, "") for name in _PARTS]
+    while values and not values[-1]:
+        values.pop()
+    return Members(objectType=object_type, memberPath="/".join(values))
+
+
+def _provider(service: Members) -> tuple[str | None, ...]:
+    return service.xRoadInstance, service.memberClass, service.memberCode, service.subsystemCode
+
+
+class ServiceCatalog:
+    """
+    A local index of the X-Road services a client can reach, built from the
+    security server metaservices.
+
+    `refresh()` reads the member list (``GET {ssu}/listClients``) and then calls
+    `listMethods` (or, with `allowed`, `allowedMethods`: only the services the client
+    may call) of every provider subsystem in parallel. The services are kept as
+    interned `Members`, indexed by path, by service code and by provider, so a lookup
+    is a dictionary access. Readers never lock: each refresh swaps in new indexes.
+
+    Pass the catalog to `XClient(catalog=...)` to reject an unknown service path
+    before any WSDL is fetched. `save()` and `load()` keep the catalog on disk, so
+    workers start without asking the security server.
+
+    :ivar ssu: The security server URL.
+    :type ssu: String
+    :ivar client: The CLIENT subsystem the metaservices are called as.
+    :type client: Members
+    :ivar allowed: Whether `allowedMethods` is used instead of `listMethods`.
+    :type allowed: Bool
+    """
+
+    def __init__(
+            self,
+            ssu: str,
+            client: str,
+            transport: Any = None,
+            allowed: bool = False,
+            max_workers: int = 8,
+    ):
+        """
+        :param ssu: The security server URL.
+        :param client: The CLIENT member path, e.g. ``"INSTANCE/GOV/00000000/SUB"``.
+        :param transport: A zeep transport; defaults to a `PooledTransport` that
+            retries the metaservices.
+        :param allowed: List only the services this client is allowed to call.
+        :param max_workers: Providers queried in parallel by `refresh()`.
+
+        :raises ValueError: If `max_workers` is less than 1.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.ssu = ssu.rstrip("/")
+        self.client = Members(objectType="SUBSYSTEM", memberPath=client)
+        self.transport = transport if transport is not None else PooledTransport(safe_operations=METASERVICES)
+        self.allowed = allowed
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._clients: dict[str, tuple[Members, str | None]] = {}
+        # provider path -> (fetched at, its services)
+        self._providers: dict[str, tuple[float, tuple[Members, ...]]] = {}
+        self._services: dict[str, Members] = {}
+        self._by_code: dict[str, tuple[Members, ...]] = {}
+        fork.register(self)
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+        fork.reset_session(self.transport.session)
+
+    def fetch_clients(self) -> list[tuple[Members, str | None]]:
+        """
+        Calls the `listClients` metaservice.
+
+        :return: The members and subsystems known to the security server, with
+            their names.
+        :raises TransportError: If the security server does not answer with a list.
+        """
+        response = self.transport.session.get(
+            f"{self.ssu}/listClients",
+            headers={"Accept": "text/xml"},
+            timeout=self.transport.load_timeout,
+        )
+        if response.status_code != 200:
+            raise TransportError(f"listClients failed with HTTP {response.status_code}", response.status_code)
+        clients = []
+        for element in etree.fromstring(response.content).iter():
+            if _local(element.tag) != "member":
+                continue
+            identifier = next((child for child in element if _local(child.tag) == "id"), None)
+            member = _member(identifier) if identifier is not None else None
+            if member is None:
+                continue
+            name = next((child.text for child in element if _local(child.tag) == "name"), None)
+            clients.append((member, name))
+        return clients
+
+    def _envelope(self, provider: Members, method: str) -> etree._Element:
+        soap, xrd, iden = (f"{{{SOAP_NS}}}", f"{{{XROAD_NS}}}", f"{{{IDENTIFIERS_NS}}}")
+        envelope = etree.Element(soap + "Envelope", nsmap={"soapenv": SOAP_NS, "xrd": XROAD_NS, "id": IDENTIFIERS_NS})
+        header = etree.SubElement(envelope, soap + "Header")
+        for name, member in (("client", self.client.member_dict), ("service", provider.member_dict)):
+            if name == "service":
+                member.update(serviceCode=method, objectType="SERVICE")
+            element = etree.SubElement(header, xrd + name, {iden + "objectType": member.pop("objectType")})
+            for part in _PARTS:
+                if member.get(part):
+                    etree.SubElement(element, iden + part).text = member[part]
+        etree.SubElement(header, xrd + "id").text = uuid.uuid4().hex
+        etree.SubElement(header, xrd + "userId").text = self.client.subsystemCode
+        etree.SubElement(header, xrd + "protocolVersion").text = "4.0"
+        etree.SubElement(etree.SubElement(envelope, soap + "Body"), xrd + method)
+        return envelope
+
+    def fetch_services(self, provider: str) -> tuple[Members, ...]:
+        """
+        Calls `listMethods` (or `allowedMethods`) of one provider subsystem.
+
+        :param provider: The provider subsystem path.
+        :return: The services of the provider.
+        :raises Fault: If the security server answers with a SOAP Fault.
+        :raises TransportError: If the answer is not a SOAP envelope.
+        """
+        method = METASERVICES[1] if self.allowed else METASERVICES[0]
+        response = self.transport.post_xml(
+            self.ssu,
+            self._envelope(Members(objectType="SUBSYSTEM", memberPath=provider), method),
+            {"Content-Type": "text/xml; charset=utf-8", "SOAPAction": ""},
+        )
+        try:
+            document = etree.fromstring(response.content)
+        except etree.XMLSyntaxError as error:
+            raise TransportError(f"{method} of {provider}: {error}", response.status_code) from error
+        fault = next((e for e in document.iter() if _local(e.tag) == "Fault"), None)
+        if fault is not None:
+            texts = {_local(child.tag): child.text for child in fault}
+            raise Fault(texts.get("faultstring") or f"{method} failed", code=texts.get("faultcode"))
+        return tuple(
+            member
+            for element in document.iter()
+            if _local(element.tag) == "service"
+            for member in (_member(element),)
+            if member is not None and member.serviceCode not in METASERVICES
+        )
+
+    def refresh(self, providers: Iterable[str] | None = None, max_age: float | None = None) -> dict[str, BaseException]:
+        """
+        Updates the catalog from the security server.
+
+        Without `providers`, the member list is read first: providers that left it
+        are dropped, and every provider subsystem is queried, except those fetched
+        less than `max_age` seconds ago. A provider whose query fails keeps its
+        previous services.
+
+        :param providers: Query only these provider subsystem paths; the member list
+            is not read.
+        :param max_age: Skip providers fetched less than this many seconds ago.
+        :return: The provider paths that could not be queried, mapped to their
+            exceptions.
+        :raises TransportError: If the member list cannot be read.
+        """
+        if providers is None:
+            clients = self.fetch_clients()
+            with self._lock:
+                self._clients = {member.memberPath: (member, name) for member, name in clients}
+                for gone in set(self._providers) - set(self._clients):
+                    del self._providers[gone]
+            targets = [member.memberPath for member, _ in clients if member.objectType == "SUBSYSTEM"]
+        else:
+            targets = list(providers)
+        if max_age is not None:
+            now = time.time()
+            targets = [p for p in targets if now - self._providers.get(p, (0.0, ()))[0] >= max_age]
+
+        failures: dict[str, BaseException] = {}
+        if targets:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="XRoadCatalog") as executor:
+                futures = [(provider, executor.submit(self.fetch_services, provider)) for provider in targets]
+            with self._lock:
+                for provider, future in futures:
+                    error = future.exception()
+                    if error is not None:
+                        _logger.warning("Could not list the services of %s: %s", provider, error)
+                        failures[provider] = error
+                    else:
+                        self._providers[provider] = (time.time(), future.result())
+        self._reindex()
+        return failures
+
+    def _reindex(self) -> None:
+        with self._lock:
+            services: dict[str, Members] = {}
+            by_code: dict[str, list[Members]] = {}
+            for _, members in self._providers.values():
+                for member in members:
+                    services[member.memberPath] = member
+                    by_code.setdefault(member.serviceCode or "", []).append(member)
+            self._services = services
+            self._by_code = {code: tuple(members) for code, members in by_code.items()}
+
+    def get(self, service: str) -> Members | None:
+        """
+        Looks up a service by its full path, version included.
+
+        :param service: e.g. ``"INSTANCE/GOV/00000000/SUB/Service/v1"``.
+        :rtype: Members | None
+        """
+        return self._services.get(service)
+
+    def resolve(self, service: str) -> Members:
+        """
+        Like `get()`, but an unknown service is an error.
+
+        :param service: The service path.
+        :rtype: Members
+        :raises UnknownServiceError: If the catalog does not list the service.
+        """
+        member = self._services.get(service)
+        if member is None:
+            wanted = Members(objectType="SERVICE", memberPath=service)
+            known = sorted(
+                m.memberPath for m in self.find(wanted.serviceCode or "") if _provider(m) == _provider(wanted)
+            )
+            hint = f"; known versions: {', '.join(known)}" if known else ""
+            raise UnknownServiceError(f"Unknown service {service}{hint}")
+        return member
+
+    def find(self, service_code: str) -> tuple[Members, ...]:
+        """
+        Returns every listed version and provider of a service code.
+
+        :param service_code: e.g. ``"CheckPassportStatus"``.
+        :rtype: Tuple
+        """
+        return self._by_code.get(service_code, ())
+
+    def services(self, provider: str | None = None) -> list[Members]:
+        """
+        Returns the services of a provider, or of every provider.
+
+        :param provider: A member (``"INSTANCE/GOV/00000000"``) or subsystem path.
+        :rtype: List
+        """
+        if provider is None:
+            return list(self._services.values())
+        providers = self._providers
+        prefix = provider.rstrip("/")
+        if prefix in providers:
+            return list(providers[prefix][1])
+        return [
+            member
+            for path, (_, members) in providers.items()
+            if path.startswith(prefix + "/")
+            for member in members
+        ]
+
+    def clients(self) -> list[tuple[Members, str | None]]:
+        """
+        Returns the members and subsystems of the last member list, with their names.
+
+        :rtype: List
+        """
+        return list(self._clients.values())
+
+    def __contains__(self, service: object) -> bool:
+        return service in self._services
+
+    def __len__(self) -> int:
+        return len(self._services)
+
+    def save(self, path: str | os.PathLike) -> None:
+        """
+        Writes the catalog to a JSON file; the file is replaced atomically.
+
+        :param path: The file path.
+        """
+        with self._lock:
+            data = {
+                "ssu": self.ssu,
+                "client": self.client.memberPath,
+                "clients": [[m.objectType, m.memberPath, name] for m, name in self._clients.values()],
+                "providers": {
+                    provider: [fetched, [m.memberPath for m in members]]
+                    for provider, (fetched, members) in self._providers.items()
+                },
+            }
+        temporary = f"{os.fspath(path)}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(data, file, separators=(",", ":"))
+        os.replace(temporary, path)
+
+    def load(self, path: str | os.PathLike) -> "ServiceCatalog":
+        """
+        Replaces the catalog with one written by `save()`.
+
+        :param path: The file path.
+        :return: The catalog itself.
+        :raises ValueError: If the file belongs to another security server or client.
+        """
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        if (data["ssu"], data["client"]) != (self.ssu, self.client.memberPath):
+            raise ValueError(f"{path} is the catalog of {data['client']} at {data['ssu']}")
+        with self._lock:
+            self._clients = {
+                member_path: (Members(objectType=object_type, memberPath=member_path), name)
+                for object_type, member_path, name in data["clients"]
+            }
+            self._providers = {
+                provider: (fetched, tuple(Members(objectType="SERVICE", memberPath=p) for p in paths))
+                for provider, (fetched, paths) in data["providers"].items()
+            }
+        self._reindex()
+        return self
@@ -1,18 +1,61 @@
 from __future__ import annotations
 
+import asyncio
+import gc
 import logging
+import threading
 import uuid
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import (
+    AbstractAsyncContextManager,
+    AbstractContextManager,
+    ExitStack,
+    nullcontext,
+)
+from typing import Any
 
-from zeep import Client
-from zeep.cache import InMemoryCache
+from zeep import AsyncClient, Client
+from zeep.cache import InMemoryCache, SqliteCache
 from zeep.exceptions import Fault
 from zeep.helpers import serialize_object
-from zeep.transports import Transport
+from zeep.loader import parse_xml
+from zeep.transports import AsyncTransport, Transport
+from zeep.wsdl import Document
 
+from . import fork
+from .catalog import ServiceCatalog
+from .coalesce import RequestCoalescer
+from .envelope import DYNAMIC_HEADERS, EnvelopeTemplate
+from .limiter import ServiceLimiter
 from .Members import Members
+from .plugins import NULL_TIMER, CallLogPlugin, CallTimer, MetricsPlugin
+from .registry import WSDLRegistry
+from .response import RESPONSE_MODES, ElementStream, LazyElement, iter_elements
+from .response_cache import ResponseCache
+from .transport import PooledTransport
+from .wsdl_cache import CompiledWSDLCache
 
 _logger = logging.getLogger("XRoad")
 
+# Marks the end of the calls of `request_many()`, which may themselves be None.
+_END: Any = object()
+
+try:
+    import httpx
+except ImportError:
+    httpx = None  # type: ignore[assignment]
+
+
+class _PendingWSDL(Document):
+    """
+    Stands in for the WSDL document of a lazy client until a call needs it.
+    """
+
+    def __init__(self, load: Callable[[], str | Document]):
+        self.loader = load
+
 
 class XClient(Client):
     """
@@ -25,6 +68,12 @@ class XClient(Client):
     setup, ensuring proper initialization of member and service objects, and
     handling request serialization.
 
+    A single instance is safe to share between threads: `request()` builds the
+    `id`/`userId` headers for each call without touching the client's state, so a
+    pool of workers can reuse one parsed WSDL per service. Assigning `id`/`userId`
+    on the instance changes the defaults for every caller and is meant for
+    configuration, not for per-call values.
+
     :ivar response: Holds the response of the latest SOAP request.
     :type response: Any
     """
@@ -32,7 +81,23 @@ class XClient(Client):
     _version = 4.0
 
     def __init__(
-            self, ssu: str, client: str, service: str, transport: object | None = None, *args, **kwargs
+            self,
+            ssu: str,
+            client: str,
+            service: str,
+            transport: object | None = None,
+            *args,
+            registry: WSDLRegistry | None = None,
+            compiled_cache: CompiledWSDLCache | None = None,
+            response_cache: ResponseCache | None = None,
+            response_ttl: int | None = None,
+            coalescer: RequestCoalescer | None = None,
+            response_mode: str = "dict",
+            precompiled: bool = False,
+            limiter: ServiceLimiter | None = None,
+            lazy: bool = False,
+            catalog: ServiceCatalog | None = None,
+            **kwargs,
     ):
         """
         Initializes an instance of the class, configuring service and client details along with
@@ -46,8 +111,46 @@ class XClient(Client):
         :param service: The service identifier within the X-Road ecosystem to be accessed.
         :type service: String
         :param transport: Optional transport object for handling HTTP requests. Defaults
-            to an instance of `Transport` with in-memory caching if not provided.
+            to a zeep `Transport` with in-memory caching if not provided; pass a
+            `PooledTransport` for connection pooling, retries and a circuit breaker.
         :type transport: Object | None
+        :param registry: The registry of parsed WSDL documents to reuse, e.g. the
+            process-wide `wsdl_registry`. Defaults to `None`, which parses the WSDL for
+            every client. Clients created with custom zeep `settings` do not use the
+            registry, because the parsed document depends on them.
+        :type registry: WSDLRegistry | None
+        :param compiled_cache: An on-disk cache of parsed WSDL documents used when the
+            WSDL is not in the registry, so fresh worker processes skip parsing.
+        :type compiled_cache: CompiledWSDLCache | None
+        :param response_cache: Memoizes the results of this service's calls. Only pass it
+            for idempotent queries; calls with `xroad_cache=False` bypass it.
+        :type response_cache: ResponseCache | None
+        :param response_ttl: The time-to-live of this service's cached results in
+            seconds. Defaults to the `ttl` of `response_cache`.
+        :type response_ttl: Int | None
+        :param coalescer: Makes identical concurrent calls share one upstream call. It
+            can be shared by clients of different services.
+        :type coalescer: RequestCoalescer | None
+        :param response_mode: What `request()` returns by default: "dict" (the
+            serialized response), "raw" (the response bytes), "lazy" (a `LazyElement`
+            view) or "iter" (a generator over a repeated element).
+        :type response_mode: String
+        :param precompiled: Render the static X-Road headers once per operation and only
+            fill in `id`, `userId` and the body per call. Calls with other per-call
+            headers are rendered by zeep as usual.
+        :type precompiled: Bool
+        :param limiter: Paces the upstream calls of this service: a token bucket and an
+            adaptive concurrency limit, shared with other clients and processes using
+            the same limiter state. Calls answered by the response cache or by another
+            coalesced call do not take a slot.
+        :type limiter: ServiceLimiter | None
+        :param lazy: Defer downloading and parsing the WSDL until the first call (or
+            `load()`), so constructing the client needs no network and cannot fail on
+            an unreachable WSDL. A failed load is retried by the next call.
+        :type lazy: Bool
+        :param catalog: Checks `service` against the services listed by the security
+            server before anything is loaded.
+        :type catalog: ServiceCatalog | None
         :param args: Additional positional arguments to be passed to the parent class
             initializer.
         :param kwargs: Additional keyword arguments to be passed to the parent class
@@ -55,6 +158,8 @@ class XClient(Client):
 
         :raises ValueError: If the `service` parameter is not provided.
         :raises ValueError: If the `client` parameter is not provided.
+        :raises ValueError: If `response_mode` is unknown.
+        :raises UnknownServiceError: If `catalog` does not list `service`.
         """
 
         self.response = None
@@ -63,23 +168,49 @@ class XClient(Client):
             raise ValueError("service - required")
         if not client:
             raise ValueError("client - required")
+        if response_mode not in RESPONSE_MODES:
+            raise ValueError(f"response_mode must be one of {', '.join(RESPONSE_MODES)}")
 
         client_member = Members(objectType="SUBSYSTEM", memberPath=client)
-        service_member = Members(objectType="SERVICE", memberPath=service)
+        if catalog is not None:
+            service_member = catalog.resolve(service)
+        else:
+            service_member = Members(objectType="SERVICE", memberPath=service)
 
         if "transport" not in kwargs:
-            kwargs["transport"] = transport if transport else Transport(InMemoryCache(timeout=60))
+            kwargs["transport"] = transport if transport else self._create_transport(ssu)
 
+        def load() -> str | Document:
+            if kwargs.get("settings") is None:
+                return self._load_wsdl(
+                    ssu, service_member, kwargs["transport"], registry, compiled_cache
+                )
+            return service_member.wsdl_url(ssu)
+
+        self._wsdl_lock = threading.Lock()
         super().__init__(
-            service_member.wsdl_url(ssu),
+            _PendingWSDL(load) if lazy else load(),
             *args,
             **kwargs,
         )
 
-        self.transport.session.proxies.update({"http": ssu, })
+        self._set_proxy(ssu)
+
+        self._pinned_id: str | None = None
+        self.response_cache = response_cache
+        self.response_ttl = response_ttl
+        self.coalescer = coalescer
+        self.response_mode = response_mode
+        self.precompiled = precompiled
+        self._templates: dict[str, EnvelopeTemplate] = {}
+        self.limiter = limiter
+        self._service_key = ServiceLimiter.key(service_member)
+        self.metrics = next((p for p in self.plugins if isinstance(p, MetricsPlugin)), None)
+        self.call_log = next((p for p in self.plugins if isinstance(p, CallLogPlugin)), None)
+        fork.register(self)
 
-        self.set_ns_prefix("xro", "https://x-road.eu/xsd/xroad.xsd")
-        self.set_ns_prefix("iden", "https://x-road.eu/xsd/identifiers")
+        if not lazy:
+            self._set_ns_prefixes(self.wsdl)
 
         self.set_default_soapheaders(
             {
@@ -92,6 +223,460 @@ class XClient(Client):
         )
         _logger.debug("Default header (%s)", self._default_soapheaders)
 
+    @property
+    def wsdl(self) -> Document:
+        """
+        The parsed WSDL document; a lazy client loads it on first access.
+
+        :rtype: Document
+        """
+        document = self._wsdl
+        if isinstance(document, _PendingWSDL):
+            document = self._resolve_wsdl(document)
+        return document
+
+    @wsdl.setter
+    def wsdl(self, value: Document) -> None:
+        self._wsdl = value
+
+    @property
+    def loaded(self) -> bool:
+        """
+        Whether the WSDL document has been loaded.
+
+        :rtype: Bool
+        """
+        return not isinstance(self._wsdl, _PendingWSDL)
+
+    def load(self) -> XClient:
+        """
+        Loads the WSDL of a lazy client now; does nothing if it is loaded.
+
+        :return: The client itself.
+        :rtype: XClient
+        :raises Exception: Whatever loading the WSDL raised, e.g. a `TransportError`.
+        """
+        if isinstance(self._wsdl, _PendingWSDL):
+            self._resolve_wsdl(self._wsdl)
+        return self
+
+    def _resolve_wsdl(self, pending: _PendingWSDL) -> Document:
+        with self._wsdl_lock:
+            if self._wsdl is pending:
+                document = pending.loader()
+                if not isinstance(document, Document):
+                    document = Document(document, self.transport, settings=self.settings)
+                self._set_ns_prefixes(document)
+                self._wsdl = document
+                _logger.debug("Loaded WSDL of %s", self._service_key)
+        return self._wsdl
+
+    def _after_fork(self) -> None:
+        # The parsed WSDL is kept; the pooled connections belong to the parent.
+        # httpx clients of an async transport cannot be reset in place, create
+        # async clients in the worker instead.
+        self._wsdl_lock = threading.Lock()
+        session = getattr(self.transport, "session", None)
+        if session is not None:
+            fork.reset_session(session)
+        cache = getattr(self.transport, "cache", None)
+        if isinstance(cache, SqliteCache):
+            fork.reset_sqlite_cache(cache)
+
+    @staticmethod
+    def _set_ns_prefixes(document: Document) -> None:
+        document.types.set_ns_prefix("xro", "https://x-road.eu/xsd/xroad.xsd")
+        document.types.set_ns_prefix("iden", "https://x-road.eu/xsd/identifiers")
+
+    @staticmethod
+    def _load_wsdl(
+            ssu: str,
+            service_member: Members,
+            transport: Any,
+            registry: WSDLRegistry | None,
+            compiled_cache: CompiledWSDLCache | None,
+    ) -> str | Document:
+        """
+        Resolves the WSDL of the service through the registry and the compiled cache.
+
+        :return: A parsed `Document`, or the WSDL URL when neither cache is used.
+        """
+        wsdl_url = service_member.wsdl_url(ssu)
+
+        def load() -> Document:
+            if compiled_cache is not None:
+                return compiled_cache.document(wsdl_url, transport)
+            return Document(wsdl_url, transport)
+
+        if registry is not None:
+            return registry.get_or_load(  # type: ignore[no-any-return]
+                registry.key(ssu, service_member), load
+            )
+        if compiled_cache is not None:
+            return load()
+        return wsdl_url
+
+    def _create_transport(self, ssu: str):
+        """
+        Creates the transport used when the caller does not supply one.
+
+        :param ssu: The security server URL.
+        :type ssu: String
+        :return: A zeep `Transport` with a short-lived in-memory WSDL cache.
+        """
+        return Transport(InMemoryCache(timeout=60))
+
+    def _set_proxy(self, ssu: str) -> None:
+        """
+        Routes SOAP calls through the security server, which acts as an HTTP proxy
+        for the producer addresses declared in the WSDL.
+
+        :param ssu: The security server URL.
+        :type ssu: String
+        """
+        self.transport.session.proxies.update({"http": ssu, })
+
+    def _call_headers(self, kwargs: dict[str, Any]) -> dict[str, Any]:
+        """
+        Pops the per-call header arguments from `kwargs` and returns the SOAP headers
+        for one envelope. zeep merges them over a copy of the default headers, so
+        the client's own headers are never modified.
+
+        :param kwargs: The keyword arguments given to `request()`.
+        :type kwargs: Dict
+        :return: The headers to send as `_soapheaders`.
+        :rtype: Dict
+        """
+        headers = dict(kwargs.pop("xroad_headers", None) or {})
+        headers.update(kwargs.pop("_soapheaders", None) or {})
+        xroad_id = kwargs.pop("xroad_id", None)
+        if xroad_id:
+            headers["id"] = xroad_id
+        elif "id" not in headers:
+            headers["id"] = self._pinned_id or uuid.uuid4().hex
+        user_id = kwargs.pop("xroad_user_id", None)
+        if user_id:
+            headers["userId"] = user_id
+        return headers
+
+    def _prepare_call(self, kwargs: dict[str, Any]) -> tuple[str | None, str | None]:
+        """
+        Replaces the per-call arguments in `kwargs` with the `_soapheaders` of the
+        envelope and returns the response cache and coalescing keys of the call.
+
+        Both keys cover the client and service identities, the other effective headers
+        except `id`, and the operation arguments.
+
+        :param kwargs: The keyword arguments given to `request()`.
+        :type kwargs: Dict
+        :return: The (cache key, flight key) pair; an entry is None when the call does
+            not use the response cache or the coalescer.
+        :rtype: Tuple
+        """
+        use_cache = kwargs.pop("xroad_cache", True)
+        headers = self._call_headers(kwargs)
+        key = flight = None
+        if (self.response_cache is not None and use_cache) or self.coalescer is not None:
+            effective = {**self._default_soapheaders, **headers}
+            effective.pop("id", None)
+            client, service = effective.pop("client"), effective.pop("service")
+            call = {**kwargs, "_headers": effective}
+            if self.response_cache is not None and use_cache:
+                key = self.response_cache.key(client, service, call)
+            if self.coalescer is not None:
+                flight = self.coalescer.key(client, service, call)
+        kwargs["_soapheaders"] = headers
+        return key, flight
+
+    def _cached_response(self, key: str | None) -> tuple[bool, Any]:
+        """
+        Looks the call up in the response cache.
+
+        :return: A (found, result) pair.
+        :rtype: Tuple
+        :raises Fault: If the call's fault is cached.
+        """
+        if key is None or self.response_cache is None:
+            return False, None
+        try:
+            found, s_object = self.response_cache.get(key)
+        except Fault as error:
+            _logger.debug("Cached service error (%s: %s)", error.code, error.message)
+            raise
+        if found:
+            _logger.debug("Cached response for %s", key)
+        return found, s_object
+
+    def _handle_response(self, key: str | None, response: Any) -> Any:
+        """
+        Serializes a response and stores it in the response cache.
+        """
+        s_object = serialize_object(response)
+        # Formatting a large response is costly; CallLogPlugin logs sampled, redacted payloads.
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug("Response (%s)", s_object)
+        if key is not None and self.response_cache is not None:
+            self.response_cache.add(key, s_object, self.response_ttl)
+        return s_object
+
+    def _handle_fault(self, key: str | None, error: Fault) -> None:
+        """
+        Logs a service fault and caches it when negative caching is on.
+        """
+        _logger.exception("service error (%s: %s)", error.code, error.message)
+        if key is not None and self.response_cache is not None:
+            self.response_cache.add_fault(key, error)
+
+    def _slot(self) -> AbstractContextManager[Any]:
+        """
+        Returns the limiter slot one upstream call holds.
+        """
+        if self.limiter is None:
+            return nullcontext()
+        return self.limiter.slot(self._service_key)
+
+    def _timer(self, service: str, kwargs: dict[str, Any]) -> CallTimer:
+        """
+        Starts timing a call when the client has a `MetricsPlugin`, or a
+        `CallLogPlugin` whose logger is enabled.
+        """
+        log = self.call_log if self.call_log is not None and self.call_log.enabled() else None
+        if self.metrics is None and log is None:
+            return NULL_TIMER
+        timer = CallTimer(self.metrics, self._service_key, service, log=log)
+        timer.message_id = (kwargs.get("_soapheaders") or {}).get("id", "")
+        return timer
+
+    def _call_service(self, service: str, key: str | None, kwargs: dict[str, Any]) -> Any:
+        """
+        Sends the envelope to the security server.
+        """
+        timer: CallTimer = NULL_TIMER
+        try:
+            with self._slot():
+                timer = self._timer(service, kwargs)
+                response = self._send(service, kwargs, timer)
+        except Fault as error:
+            timer.finish(error)
+            self._handle_fault(key, error)
+            raise
+        except Exception as error:
+            timer.finish(error)
+            raise
+        s_object = self._handle_response(key, response)
+        timer.mark("serialize")
+        timer.finish()
+        return s_object
+
+    def _post(self, service: str, kwargs: dict[str, Any], timer: CallTimer, stream: bool = False) -> Any:
+        """
+        Builds the envelope of a call and posts it to the security server.
+
+        :param stream: Leave the response body unread; only a `PooledTransport`
+            supports it.
+        :return: The HTTP response.
+        """
+        address, envelope, http_headers = self._envelope(service, kwargs)
+        timer.mark("build")
+        if stream:
+            response = self.transport.post_xml(address, envelope, http_headers, stream=True)
+        else:
+            response = self.transport.post_xml(address, envelope, http_headers)
+        timer.received(response, streamed=stream)
+        return response
+
+    def _send(self, service: str, kwargs: dict[str, Any], timer: CallTimer) -> Any:
+        """
+        Calls the operation the way zeep's `SoapBinding.send` does, timing each step.
+        """
+        reply = self._post(service, kwargs, timer)
+        if self.settings.raw_response:
+            return reply
+        binding = self.service._binding
+        response = binding.process_reply(self, binding.get(service), reply)
+        timer.mark("parse")
+        return response
+
+    def _call_raw(self, service: str, mode: str, items: str | None, kwargs: dict[str, Any]) -> Any:
+        """
+        Sends the envelope for the "raw", "lazy" and "iter" response modes.
+        """
+        if mode == "iter" and isinstance(self.transport, PooledTransport):
+            return self._call_stream(service, items, kwargs)
+        timer: CallTimer = NULL_TIMER
+        try:
+            with self._slot():
+                timer = self._timer(service, kwargs)
+                response = self._post(service, kwargs, timer)
+            result = self._read_response(service, mode, items, response)
+        except Exception as error:
+            timer.finish(error)
+            raise
+        if mode == "lazy":
+            timer.mark("parse")
+        timer.finish()
+        return result
+
+    def _call_stream(self, service: str, items: str | None, kwargs: dict[str, Any]) -> Any:
+        """
+        Sends the envelope for the "iter" mode over a `PooledTransport`, which reads
+        the body off the socket while the caller iterates. The limiter slot and the
+        timer of the call stay with the returned `ElementStream` until it is closed,
+        and only then does the circuit breaker learn how the call went.
+        """
+        slot = ExitStack()
+        slot.enter_context(self._slot())
+        timer: CallTimer = NULL_TIMER
+        response = None
+        try:
+            timer = self._timer(service, kwargs)
+            response = self._post(service, kwargs, timer, stream=True)
+            if response.status_code == 200:
+                return self._read_response(
+                    service,
+                    "iter",
+                    items,
+                    response,
+                    on_done=lambda error: self._stream_done(slot, timer, response, error),
+                )
+            result = self._read_response(service, "iter", items, response)
+        except BaseException as error:
+            if response is not None:
+                self.transport.finish_stream(response, error)
+            slot.__exit__(type(error), error, error.__traceback__)
+            timer.finish(error)
+            raise
+        slot.close()
+        timer.finish()
+        return result
+
+    def _stream_done(self, slot: ExitStack, timer: CallTimer, response: Any, error: BaseException | None) -> None:
+        """
+        Ends a streamed call once its `ElementStream` is closed: reports the outcome to
+        the circuit breaker (a Fault is an answer, not a failure), frees the limiter
+        slot and finishes the timer.
+        """
+        try:
+            self.transport.finish_stream(response, None if isinstance(error, Fault) else error)
+        finally:
+            if error is None:
+                slot.close()
+            else:
+                slot.__exit__(type(error), error, error.__traceback__)
+            timer.mark("parse")
+            timer.finish(error)
+
+    def _response_mode(self, kwargs: dict[str, Any]) -> tuple[str, str | None]:
+        """
+        Pops the per-call response mode arguments from `kwargs`.
+
+        :return: The (mode, repeated element name) pair.
+        :rtype: Tuple
+        :raises ValueError: If the mode is unknown, or "iter" is used without 'xroad_items'.
+        """
+        mode = kwargs.pop("xroad_response", None) or self.response_mode
+        items = kwargs.pop("xroad_items", None)
+        if mode not in RESPONSE_MODES:
+            raise ValueError(f"xroad_response must be one of {', '.join(RESPONSE_MODES)}")
+        if mode == "iter" and not items:
+            raise ValueError("xroad_items is required for the iter response mode")
+        return mode, items
+
+    def _envelope(self, service: str, kwargs: dict[str, Any]) -> tuple[str, Any, dict[str, str]]:
+        """
+        Builds the envelope of a call the way the zeep service proxy does, or from the
+        precompiled template.
+
+        :return: The (address, envelope, HTTP headers) triple.
+        :rtype: Tuple
+        """
+        options = self.service._binding_options
+        headers = kwargs.get("_soapheaders") or {}
+        template = self._template(service, headers)
+        if template is not None:
+            values = {key: headers.get(key, self._default_soapheaders.get(key)) for key in DYNAMIC_HEADERS}
+            kwargs.pop("_soapheaders", None)
+            envelope, http_headers = template.create(self, values, kwargs, options)
+        else:
+            kwargs["_soapheaders"] = self.service[service]._merge_soap_headers(headers)
+            envelope, http_headers = self.service._binding._create(
+                service, (), kwargs, client=self, options=options
+            )
+        return options["address"], envelope, http_headers
+
+    def _template(self, service: str, headers: dict[str, Any]) -> EnvelopeTemplate | None:
+        """
+        Returns the precompiled envelope of `service`, or None when the client is not
+        precompiled or the call sets headers besides `id` and `userId`. The template
+        is rebuilt when the client's static default headers change.
+        """
+        if not self.precompiled or not isinstance(headers, dict) or any(
+                key not in DYNAMIC_HEADERS for key in headers
+        ):
+            return None
+        template = self._templates.get(service)
+        defaults = self._default_soapheaders
+        if template is None or any(
+                template.static.get(key) != value
+                for key, value in defaults.items()
+                if key not in DYNAMIC_HEADERS
+        ):
+            template = EnvelopeTemplate(self.service._binding, service, defaults)
+            self._templates[service] = template
+        return template
+
+    def _read_response(
+            self,
+            service: str,
+            mode: str,
+            items: str | None,
+            response: Any,
+            on_done: Callable[[BaseException | None], None] | None = None,
+    ) -> Any:
+        """
+        Converts an HTTP response for the "raw", "lazy" and "iter" modes, skipping
+        zeep's object tree and `serialize_object`. Error responses are handed to zeep,
+        which raises the `Fault`.
+
+        :param on_done: Given for a streamed "iter" response, whose body is still to
+            be read: called when its `ElementStream` is closed.
+        :return: The response bytes, a `LazyElement` or an iterator, see `request()`.
+        """
+        binding = self.service._binding
+        operation = binding.get(service)
+
+        def process_reply() -> Any:
+            try:
+                return binding.process_reply(self, operation, response)
+            except Fault as error:
+                self._handle_fault(None, error)
+                raise
+
+        def raise_fault() -> None:
+            # Raised while iterating, outside of `request()`.
+            try:
+                process_reply()
+            except Fault as error:
+                raise Fault(error)
+
+        if response.status_code != 200:
+            return process_reply()
+        if on_done is not None and mode == "iter":
+            return ElementStream(response, items or "", on_fault=raise_fault, on_done=on_done)
+        content = response.content
+        _logger.debug("Response (%d bytes, mode %s)", len(content), mode)
+        if mode == "raw":
+            return content
+        if mode == "iter":
+            return iter_elements(content, items or "", on_fault=raise_fault)
+
+        doc = parse_xml(content, self.transport, settings=self.settings)
+        body = doc.find("soap-env:Body", namespaces=binding.nsmap)
+        if body is None or body.find("soap-env:Fault", namespaces=binding.nsmap) is not None:
+            return process_reply()
+        result = next((child for child in body if isinstance(child.tag, str)), None)
+        return LazyElement(result) if result is not None else None
+
     def request(self, **kwargs):
         """
         Handles SOAP service requests with the ability to specify custom arguments and
@@ -99,29 +684,118 @@ class XClient(Client):
         specified arguments, perform serialization of the response object, and handle
         any potential SOAP Fault exceptions that may occur.
 
+        The X-Road headers are built for this call only. Every call gets a fresh
+        `id` unless one is passed (or pinned with the `id` setter).
+
         :param kwargs: Arbitrary keyword arguments to be passed to the SOAP service
             request. These may include service-specific parameters or optional settings.
-            If an argument with the key 'xroad_id' is supplied, it will set the 'id'
-            attribute of the instance.
-        :return: Serialized response object from the SOAP service.
+            The reserved keys 'xroad_id', 'xroad_user_id' and 'xroad_headers' (a dict of
+            extra SOAP headers, e.g. `{"issue": "..."}`) only apply to this envelope;
+            'xroad_cache=False' bypasses the response cache for this call.
+            'xroad_response' overrides the client's `response_mode` for this call, and
+            'xroad_items' names the repeated element the "iter" mode yields.
+        :return: The response in the selected mode: "dict" returns the serialized
+            response; "raw" the SOAP response bytes; "lazy" a read-only `LazyElement`
+            view of the result element, converted on access; "iter" a generator of
+            the 'xroad_items' elements as dicts, pruning the parsed tree as it goes.
+            With a `PooledTransport` "iter" returns an `ElementStream` that reads
+            the body off the socket and holds the call's limiter slot until it is
+            exhausted or closed; use it in a ``with`` block to stop early.
+            The last three skip zeep's object tree, type conversion (values are
+            text), the response cache and the coalescer.
         :rtype: Any
         :raises Fault: If a SOAP Fault exception occurs during the service call, it is
             raised after logging the error details.
         """
 
         service = self._default_soapheaders["service"].get("serviceCode")
-        if "xroad_id" in kwargs:
-            self.id = kwargs.pop("xroad_id")
+        mode, items = self._response_mode(kwargs)
+        key, flight = self._prepare_call(kwargs)
 
         try:
-            response = self.service[service](**kwargs)
+            if mode != "dict":
+                return self._call_raw(service, mode, items, kwargs)
+            found, s_object = self._cached_response(key)
+            if found:
+                return s_object
+            if flight is None or self.coalescer is None:
+                return self._call_service(service, key, kwargs)
+            return self.coalescer.run(flight, lambda: self._call_service(service, key, kwargs))
         except Fault as error:
-            _logger.exception("service error (%s: %s)", error.code, error.message)
             raise Fault(error)
-        else:
-            s_object = serialize_object(response)
-            _logger.debug("Response (%s)", s_object)
-            return s_object
+
+    def request_many(
+            self,
+            calls: Iterable[dict[str, Any]],
+            max_workers: int = 8,
+            ordered: bool = True,
+            in_flight: int | None = None,
+    ) -> Iterator[tuple[dict[str, Any], Any]]:
+        """
+        Runs `request()` for every kwargs dict of `calls` on a bounded thread pool and
+        streams the outcomes back as a generator.
+
+        `calls` is consumed lazily: at most `in_flight` calls (default: twice
+        `max_workers`) are submitted but not yet yielded, so an input of millions of
+        rows is never read into memory. An error of one call does not stop the run;
+        it is yielded in place of that call's result.
+
+        :param calls: An iterable of keyword-argument dicts, one per `request()` call.
+        :type calls: Iterable
+        :param max_workers: The number of worker threads sharing this client.
+        :type max_workers: Int
+        :param ordered: Yield in input order when true; in completion order otherwise.
+        :type ordered: Bool
+        :param in_flight: The maximum number of submitted, not yet yielded calls.
+        :type in_flight: Int | None
+        :return: A generator of `(kwargs, outcome)` pairs, where outcome is the
+            serialized response or the raised exception (e.g. `Fault`).
+        :rtype: Iterator
+        :raises ValueError: If `max_workers` or `in_flight` is less than 1.
+        """
+        if in_flight is None:
+            in_flight = 2 * max_workers
+        if max_workers < 1 or in_flight < 1:
+            raise ValueError("max_workers and in_flight must be at least 1")
+        return self._request_many(iter(calls), max_workers, ordered, in_flight)
+
+    def _request_many(
+            self, calls: Iterator[dict[str, Any]], max_workers: int, ordered: bool, in_flight: int
+    ) -> Iterator[tuple[dict[str, Any], Any]]:
+        pending: deque[tuple[dict[str, Any], Future]] = deque()
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="XClient")
+
+        def run(call: dict[str, Any]) -> Any:
+            # Unpacked in the worker, so a malformed call is yielded as its error.
+            return self.request(**call)
+
+        def submit() -> bool:
+            call = next(calls, _END)
+            if call is _END:
+                return False
+            pending.append((call, executor.submit(run, call)))
+            return True
+
+        def outcome(future: Future) -> Any:
+            error = future.exception()
+            return error if error is not None else future.result()
+
+        try:
+            while len(pending) < in_flight and submit():
+                pass
+            while pending:
+                if ordered:
+                    call, future = pending.popleft()
+                    done = outcome(future)
+                else:
+                    wait([f for _, f in pending], return_when=FIRST_COMPLETED)
+                    call, future = next((c, f) for c, f in pending if f.done())
+                    pending.remove((call, future))
+                    done = outcome(future)
+                submit()
+                yield call, done
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
 
     @property
     def id(self):
@@ -130,8 +804,8 @@ class XClient(Client):
         default SOAP header. This property fetches and returns the associated identifier value from
         a predefined key called "id" in the default SOAP headers.
 
-        The property is read-only and allows retrieval of the value, but no direct modifications
-        to the object’s underlying internal data structures.
+        `request()` generates a fresh id per call, so this value is only sent when it was
+        pinned with the setter or when the zeep service proxy is called directly.
 
         :rtype: Any
         :return: The value corresponding to the "id" key in the default SOAP headers.
@@ -145,13 +819,17 @@ class XClient(Client):
         headers. This setter ensures that the `id` value is synchronized with
         the default SOAP headers and logs the operation for debugging purposes.
 
+        The value is pinned: every later `request()` without its own `xroad_id`
+        reuses it. The headers dict is replaced rather than mutated, so calls already
+        in flight keep the headers they started with.
+
         :param value: The new value to set for the `id` attribute. This value
             is used to update the `_default_soapheaders`.
         :type value: Any
         """
 
-        self._default_soapheaders["id"] = value
-        self.set_default_soapheaders(self._default_soapheaders)
+        self._pinned_id = value
+        self.set_default_soapheaders({**self._default_soapheaders, "id": value})
         _logger.debug("Set (id: %s)", value)
 
     @property
@@ -180,6 +858,281 @@ class XClient(Client):
         :type value: String
         """
 
-        self._default_soapheaders["userId"] = value
-        self.set_default_soapheaders(self._default_soapheaders)
+        self.set_default_soapheaders({**self._default_soapheaders, "userId": value})
         _logger.debug("Set (userId: %s)", value)
+
+
+class AsyncXClient(XClient, AsyncClient):
+    """
+    An asyncio flavour of `XClient` built on zeep's `AsyncClient`.
+
+    The constructor, X-Road SOAP headers and `id`/`userId` handling are the same as
+    in `XClient`, but `request()` is a coroutine, so many X-Road calls can be in
+    flight from one event loop. Loading the WSDL is still synchronous (a zeep
+    limitation): it happens in the constructor, or on the first call with ``lazy=True``.
+
+    Requires the `httpx` package (``pip install pyxroad[async]``). When a custom
+    `AsyncTransport` is passed, it must itself route plain HTTP traffic through the
+    security server.
+    """
+
+    def _create_transport(self, ssu: str):
+        """
+        Creates an `AsyncTransport` whose operation client proxies plain HTTP through
+        the security server, mirroring the session proxy set up by `XClient`.
+
+        :param ssu: The security server URL.
+        :type ssu: String
+        :raises RuntimeError: If `httpx` is not installed.
+        """
+        if httpx is None:
+            raise RuntimeError("AsyncXClient requires httpx: pip install pyxroad[async]")
+        return AsyncTransport(
+            cache=InMemoryCache(timeout=60),
+            client=httpx.AsyncClient(
+                mounts={"http://": httpx.AsyncHTTPTransport(proxy=ssu)},
+                timeout=None,
+            ),
+        )
+
+    def _set_proxy(self, ssu: str) -> None:
+        # The proxy is configured on the httpx client in `_create_transport`.
+        _logger.debug("Async transport routes via %s", ssu)
+
+    def request_many(self, *args, **kwargs):
+        """
+        Not available on the async client; use `gather()` with `request()` coroutines.
+
+        :raises TypeError: Always.
+        """
+        raise TypeError("AsyncXClient.request_many is not supported, use XRoad.gather")
+
+    async def request(self, **kwargs):  # type: ignore[override]
+        """
+        Asynchronous counterpart of `XClient.request`.
+
+        :param kwargs: Arguments of the SOAP operation, including the per-call
+            'xroad_id', 'xroad_user_id', 'xroad_headers', 'xroad_cache',
+            'xroad_response' and 'xroad_items' keys.
+        :return: Serialized response object from the SOAP service.
+        :rtype: Any
+        :raises Fault: If the service returns a SOAP Fault.
+        """
+
+        service = self._default_soapheaders["service"].get("serviceCode")
+        mode, items = self._response_mode(kwargs)
+        key, flight = self._prepare_call(kwargs)
+
+        try:
+            if mode != "dict":
+                return await self._acall_raw(service, mode, items, kwargs)
+            found, s_object = self._cached_response(key)
+            if found:
+                return s_object
+            if flight is None or self.coalescer is None:
+                return await self._acall_service(service, key, kwargs)
+            return await self.coalescer.arun(
+                flight, lambda: self._acall_service(service, key, kwargs)
+            )
+        except Fault as error:
+            raise Fault(error)
+
+    def _aslot(self) -> AbstractAsyncContextManager[Any]:
+        """
+        Asynchronous counterpart of `XClient._slot`.
+        """
+        if self.limiter is None:
+            return nullcontext()
+        return self.limiter.aslot(self._service_key)
+
+    async def _acall_service(self, service: str, key: str | None, kwargs: dict[str, Any]) -> Any:
+        """
+        Asynchronous counterpart of `XClient._call_service`.
+        """
+        timer: CallTimer = NULL_TIMER
+        try:
+            async with self._aslot():
+                timer = self._timer(service, kwargs)
+                response = await self._asend(service, kwargs, timer)
+        except Fault as error:
+            timer.finish(error)
+            self._handle_fault(key, error)
+            raise
+        except Exception as error:
+            timer.finish(error)
+            raise
+        s_object = self._handle_response(key, response)
+        timer.mark("serialize")
+        timer.finish()
+        return s_object
+
+    async def _apost(self, service: str, kwargs: dict[str, Any], timer: CallTimer) -> Any:
+        """
+        Asynchronous counterpart of `XClient._post`.
+        """
+        address, envelope, http_headers = self._envelope(service, kwargs)
+        timer.mark("build")
+        response = await self.transport.post_xml(address, envelope, http_headers)
+        timer.received(response)
+        return response
+
+    async def _asend(self, service: str, kwargs: dict[str, Any], timer: CallTimer) -> Any:
+        """
+        Asynchronous counterpart of `XClient._send`.
+        """
+        reply = await self._apost(service, kwargs, timer)
+        if self.settings.raw_response:
+            return reply
+        binding = self.service._binding
+        response = binding.process_reply(self, binding.get(service), reply)
+        timer.mark("parse")
+        return response
+
+    async def _acall_raw(
+            self, service: str, mode: str, items: str | None, kwargs: dict[str, Any]
+    ) -> Any:
+        """
+        Asynchronous counterpart of `XClient._call_raw`.
+        """
+        timer: CallTimer = NULL_TIMER
+        try:
+            async with self._aslot():
+                timer = self._timer(service, kwargs)
+                response = await self._apost(service, kwargs, timer)
+            result = self._read_response(service, mode, items, response)
+        except Exception as error:
+            timer.finish(error)
+            raise
+        if mode == "lazy":
+            timer.mark("parse")
+        timer.finish()
+        return result
+
+
+async def gather(
+        *aws: Awaitable[Any], limit: int = 10, return_exceptions: bool = False
+) -> list[Any]:
+    """
+    Runs awaitables concurrently like `asyncio.gather`, but keeps at most `limit` of
+    them running at any moment. Results are returned in the order of `aws`.
+
+    Coroutines are not started until a slot is free, so passing thousands of
+    `AsyncXClient.request(...)` coroutines only opens `limit` connections at a time.
+
+    :param aws: Awaitables to run, typically `AsyncXClient.request(...)` coroutines.
+    :param limit: The maximum number of awaitables running at the same time.
+    :type limit: Int
+    :param return_exceptions: Passed to `asyncio.gather`; when true, exceptions
+        (e.g. `Fault`) are returned in place of results instead of being raised.
+    :type return_exceptions: Bool
+    :return: The results in the order of `aws`.
+    :rtype: List
+    :raises ValueError: If `limit` is less than 1.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _run(aw: Awaitable[Any]) -> Any:
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(_run(aw) for aw in aws), return_exceptions=return_exceptions)
+
+
+def prewarm(services: Iterable[XClient], max_workers: int = 8) -> Future:
+    """
+    Loads the WSDL documents of lazy clients on a background thread pool and returns
+    at once, so a slow or unreachable producer does not hold up startup.
+
+    Clients that are already loaded are skipped. A client whose WSDL fails to load
+    stays lazy (its next call tries again); the failure is logged and reported in
+    the result.
+
+    :param services: The clients to load, typically created with ``lazy=True``.
+    :type services: Iterable
+    :param max_workers: The number of WSDL documents loaded in parallel.
+    :type max_workers: Int
+    :return: A future that resolves, once every client has been tried, to a dict
+        mapping the service path of each failed client to its exception; it is
+        empty when all loads succeeded.
+    :rtype: Future
+    :raises ValueError: If `max_workers` is less than 1.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    result: Future = Future()
+    clients = [client for client in services if not client.loaded]
+    if not clients:
+        result.set_result({})
+        return result
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="XRoadPrewarm")
+    futures = {executor.submit(client.load): client for client in clients}
+    executor.shutdown(wait=False)
+    failures: dict[str, BaseException] = {}
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(future: Future) -> None:
+        client = futures[future]
+        error = future.exception()
+        with lock:
+            if error is not None:
+                _logger.warning("Could not load the WSDL of %s: %s", client._service_key, error)
+                failures[client._service_key] = error
+            remaining[0] -= 1
+            finished = not remaining[0]
+        if finished:
+            result.set_result(failures)
+
+    for future in futures:
+        future.add_done_callback(done)
+    return result
+
+
+def preload(services: Iterable[XClient], max_workers: int = 8, freeze: bool = False) -> dict[str, BaseException]:
+    """
+    Loads the WSDL documents of the clients in the master process of a pre-fork
+    server (gunicorn, uwsgi, celery prefork), so the workers share the parsed
+    definitions copy-on-write instead of each parsing them again.
+
+    The clients can be used in the workers as they are: after a fork their pooled
+    connections, Redis connections and locks are reset automatically (see
+    `XRoad.fork`), while the parsed documents are kept.
+
+    With `freeze`, the objects allocated so far are moved out of the reach of the
+    garbage collector (`gc.freeze()`). Otherwise the first collection in every worker
+    writes to the header of every parsed XSD object and copies the pages they live on.
+    Freezing affects the whole process, including the application's own objects, and
+    frozen garbage is never collected, so it is opt-in.
+
+    :param services: The clients to load, typically created with ``lazy=True``.
+    :type services: Iterable
+    :param max_workers: The number of WSDL documents loaded in parallel.
+    :type max_workers: Int
+    :param freeze: Whether to freeze the loaded objects for the garbage collector;
+        defaults to False.
+    :type freeze: Bool
+    :return: The service path of each client that failed to load, mapped to its
+        exception; those clients stay lazy.
+    :rtype: dict
+    :raises ValueError: If `max_workers` is less than 1.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    failures: dict[str, BaseException] = {}
+    clients = [client for client in services if not client.loaded]
+    if clients:
+        # Joined before returning: a fork must not copy a half-finished worker thread.
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="XRoadPreload") as executor:
+            futures = [(client, executor.submit(client.load)) for client in clients]
+        for client, future in futures:
+            error = future.exception()
+            if error is not None:
+                _logger.warning("Could not load the WSDL of %s: %s", client._service_key, error)
+                failures[client._service_key] = error
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    return failures
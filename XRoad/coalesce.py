@@ -0,0 +1,310 @@
+import asyncio
+import copy
+import logging
+import pickle
+import threading
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any
+
+from zeep.exceptions import Fault
+
+from . import fork
+from .response_cache import call_digest
+
+_logger = logging.getLogger(__name__)
+
+_REDIS_ERRORS: tuple[type[Exception], ...] = ()
+try:
+    from redis import Redis
+    from redis.exceptions import RedisError, WatchError
+
+    _REDIS_ERRORS = (RedisError,)
+except ImportError:
+    Redis = None  # type: ignore[assignment, misc]
+
+# What unpickling a damaged or foreign result can raise.
+_LOAD_ERRORS = (
+    pickle.UnpicklingError,
+    EOFError,
+    AttributeError,
+    ImportError,
+    LookupError,
+    TypeError,
+    ValueError,
+)
+
+_RESULT = "result"
+_FAULT = "fault"
+_FAILED = "failed"
+
+
+class RequestCoalescer:
+    """
+    Single-flight for identical concurrent X-Road calls.
+
+    While a call is in flight, every identical call (same client and service
+    identities, headers except `id`, and operation arguments) waits for it instead of
+    going to the security server, and gets the same result or the same `Fault`.
+    Nothing is kept once the call finishes, so no result is ever stale; combine it
+    with a `ResponseCache` to also reuse finished calls.
+
+    Threads of one process are coalesced in memory. With a Redis connection, calls
+    are also coalesced across processes: the first caller takes a short-lived lock
+    key, and callers in other processes poll for the result it publishes under that
+    lock's token. When the leader fails with anything but a `Fault` (across
+    processes), its result cannot be pickled, or it does not finish within
+    `wait_timeout`, the waiting callers make the call themselves.
+
+    The `AsyncXClient` coalesces in memory only, per event loop.
+
+    Results shared through Redis are pickled, so the server must only be writable by
+    trusted processes.
+
+    :ivar redis_client: The Redis client used across processes, if any.
+    :type redis_client: Redis | None
+    :ivar lock_timeout: Seconds after which the lock of a crashed leader expires.
+    :type lock_timeout: Float
+    :ivar wait_timeout: The maximum seconds a caller waits for a leader.
+    :type wait_timeout: Float
+    :ivar coalesced: The number of calls answered by another caller's call.
+    :type coalesced: Int
+    """
+
+    def __init__(
+            self,
+            redis: str | Any | None = None,
+            lock_timeout: float = 30.0,
+            wait_timeout: float = 30.0,
+            prefix: str = "xroad:flight:",
+    ):
+        """
+        :param redis: A Redis URL or client to coalesce across processes; in-process
+            only when None.
+        :param lock_timeout: Seconds after which the lock of a crashed leader expires.
+            Must be longer than the slowest call.
+        :param wait_timeout: The maximum seconds a caller, in this or another process,
+            waits for a leader before calling the service itself.
+        :param prefix: The prefix of the Redis keys.
+        """
+        self.redis_client: Any | None = None
+        if redis is not None:
+            if Redis is None:
+                _logger.warning("Redis is not installed, calls are coalesced in-process only")
+            elif isinstance(redis, str):
+                self.redis_client = Redis.from_url(redis)
+            else:
+                self.redis_client = redis
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.prefix = prefix
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._flights: dict[str, Future] = {}
+        self._async_flights: dict[tuple[int, str], asyncio.Future] = {}
+        fork.register(self)
+
+    def _after_fork(self) -> None:
+        # The parent's flights are led by threads that do not exist in the child.
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._async_flights = {}
+        fork.reset_redis(self.redis_client)
+
+    def key(self, client: dict[str, Any], service: dict[str, Any], kwargs: dict[str, Any]) -> str:
+        """
+        Builds the flight key of a call.
+
+        :param client: The client member dict.
+        :param service: The service member dict.
+        :param kwargs: The SOAP operation arguments, without the per-call `xroad_*` keys.
+        :return: The flight key.
+        :rtype: String
+        """
+        return self.prefix + call_digest(client, service, kwargs)
+
+    def run(self, key: str, call: Callable[[], Any]) -> Any:
+        """
+        Runs `call`, or waits for the identical call already in flight.
+
+        :param key: The key built by `key()`.
+        :param call: Makes the upstream call and returns its serialized result.
+        :return: The result; callers that waited get their own copy.
+        :rtype: Any
+        :raises Fault: The fault of the shared call.
+        """
+        with self._lock:
+            future = self._flights.get(key)
+            leader = future is None
+            if future is None:
+                future = self._flights[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            try:
+                return copy.deepcopy(future.result(timeout=self.wait_timeout))
+            except FutureTimeoutError:
+                _logger.warning("Call %s took over %ss, calling the service directly", key, self.wait_timeout)
+                with self._lock:
+                    self.coalesced -= 1
+                return call()
+
+        try:
+            result = self._run_shared(key, call)
+        except BaseException as error:
+            self._land(key)
+            future.set_exception(error)
+            raise
+        self._land(key)
+        future.set_result(result)
+        return result
+
+    def _land(self, key: str) -> None:
+        with self._lock:
+            self._flights.pop(key, None)
+
+    async def arun(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Asynchronous counterpart of `run()`, coalescing the calls of one event loop.
+
+        :param key: The key built by `key()`.
+        :param call: Returns a coroutine making the upstream call.
+        :return: The result; callers that waited get their own copy.
+        :rtype: Any
+        :raises Fault: The fault of the shared call.
+        """
+        loop = asyncio.get_running_loop()
+        flight = (id(loop), key)
+        future = self._async_flights.get(flight)
+        if future is not None:
+            self.coalesced += 1
+            try:
+                return copy.deepcopy(await asyncio.wait_for(asyncio.shield(future), self.wait_timeout))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            except asyncio.TimeoutError:
+                _logger.warning("Call %s took over %ss, calling the service directly", key, self.wait_timeout)
+            # The leader was cancelled or is too slow; make the call instead.
+            self.coalesced -= 1
+            return await call()
+
+        future = self._async_flights[flight] = loop.create_future()
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            self._async_flights.pop(flight, None)
+            future.cancel()
+            raise
+        except BaseException as error:
+            self._async_flights.pop(flight, None)
+            future.set_exception(error)
+            future.exception()  # Waiters are optional; do not warn about it.
+            raise
+        self._async_flights.pop(flight, None)
+        future.set_result(result)
+        return result
+
+    def _run_shared(self, key: str, call: Callable[[], Any]) -> Any:
+        """
+        Runs `call` once across the processes sharing the Redis server.
+        """
+        if self.redis_client is None:
+            return call()
+
+        token = uuid.uuid4().hex
+        try:
+            acquired = self.redis_client.set(key, token, nx=True, px=int(self.lock_timeout * 1000))
+            owner = None if acquired else self.redis_client.get(key)
+        except _REDIS_ERRORS as e:
+            _logger.warning("Could not coalesce %s via Redis, calling the service directly: %s", key, e)
+            return call()
+
+        if acquired:
+            try:
+                result = call()
+            except Fault as error:
+                self._publish(key, token, _FAULT, (str(error.message), error.code, error.actor))
+                raise
+            except BaseException:
+                self._publish(key, token, _FAILED, None)
+                raise
+            self._publish(key, token, _RESULT, result)
+            return result
+
+        outcome = self._wait(key, owner) if owner is not None else None
+        if outcome is None:
+            return call()
+        kind, value = outcome
+        if kind == _FAILED:
+            return call()
+        with self._lock:
+            self.coalesced += 1
+        if kind == _RESULT:
+            return value
+        message, code, actor = value
+        raise Fault(message, code=code, actor=actor)
+
+    def _result_key(self, key: str, token: bytes | str) -> str:
+        if isinstance(token, bytes):
+            token = token.decode("ascii")
+        return f"{key}:result:{token}"
+
+    def _publish(self, key: str, token: str, kind: str, value: Any) -> None:
+        """
+        Publishes the outcome for the callers waiting on `token` and releases the lock.
+        """
+        if self.redis_client is None:
+            return
+        try:
+            payload = pickle.dumps((kind, value), protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, AttributeError, TypeError, RecursionError) as e:
+            _logger.debug("Could not share the %s result of %s: %s", type(value).__name__, key, e)
+            payload = pickle.dumps((_FAILED, None))
+        try:
+            self.redis_client.set(
+                self._result_key(key, token), payload, px=int(self.wait_timeout * 1000)
+            )
+            with self.redis_client.pipeline() as pipe:
+                try:
+                    pipe.watch(key)
+                    if pipe.get(key) == token.encode("ascii"):
+                        pipe.multi()
+                        pipe.delete(key)
+                        pipe.execute()
+                except WatchError:
+                    _logger.debug("Flight lock of %s changed before release", key)
+        except _REDIS_ERRORS as e:
+            _logger.warning("Could not publish the result of %s, waiters call the service: %s", key, e)
+
+    def _wait(self, key: str, owner: bytes) -> tuple[str, Any] | None:
+        """
+        Polls Redis for the outcome published by the lock owner.
+        """
+        result_key = self._result_key(key, owner)
+        deadline = time.monotonic() + self.wait_timeout
+        delay = 0.01
+        while self.redis_client is not None and time.monotonic() < deadline:
+            time.sleep(delay)
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.get(result_key)
+                pipe.get(key)
+                payload, current = pipe.execute()
+            except _REDIS_ERRORS as e:
+                _logger.warning("Could not wait for %s, calling the service directly: %s", key, e)
+                return None
+            if payload:
+                try:
+                    return pickle.loads(payload)  # type: ignore[no-any-return]
+                except _LOAD_ERRORS as e:
+                    _logger.warning("Could not load the result of %s, calling the service directly: %s", key, e)
+                    return None
+            if current != owner:
+                # The leader's lock expired without a result.
+                return None
+            delay = min(delay * 2, 0.2)
+        return None
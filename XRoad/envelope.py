@@ -0,0 +1,140 @@
+import copy
+import uuid
+from typing import Any
+
+from lxml import etree
+from lxml.builder import ElementMaker
+from zeep import plugins, wsa
+from zeep.wsdl.messages.base import SerializedMessage
+
+# Header values that change per call; every other header is rendered once.
+DYNAMIC_HEADERS = ("id", "userId")
+
+
+class EnvelopeTemplate:
+    """
+    A pre-rendered SOAP envelope for one operation of one client.
+
+    zeep renders the X-Road header from the client's default header dicts on every
+    call, validating each value against the schema. A template renders that header
+    once, with placeholders for `id` and `userId`, and each call only copies the
+    rendered header, fills in those two values and renders the body through zeep.
+    The result is the same envelope zeep builds; the egress plugins, WS-Addressing
+    and WSSE are applied as in zeep's binding.
+
+    :ivar static: The headers rendered into the template, i.e. the client's default
+        headers without `id` and `userId`.
+    :type static: Dict
+    """
+
+    def __init__(self, binding: Any, operation: str, headers: dict[str, Any]):
+        """
+        :param binding: The zeep SOAP binding of the service.
+        :param operation: The operation name.
+        :param headers: The client's default SOAP headers.
+        """
+        self.binding = binding
+        self.operation = binding.get(operation)
+        if self.operation is None:
+            raise ValueError(f"Operation {operation!r} not found")
+        self.message = self.operation.input
+        self.static = {key: value for key, value in headers.items() if key not in DYNAMIC_HEADERS}
+
+        self._nsmap = {"soap-env": self.message.nsmap["soap-env"]}
+        self._nsmap.update(self.message.wsdl.types._prefix_map_custom)
+        self._soap = ElementMaker(namespace=self._nsmap["soap-env"], nsmap=self._nsmap)
+
+        self._headers: dict[tuple[str, ...], tuple[etree._Element | None, list[tuple[str, int]]]] = {}
+
+    def _compile(self, present: tuple[str, ...]) -> tuple[etree._Element | None, list[tuple[str, int]]]:
+        """
+        Renders the header with placeholders for the `present` dynamic values, and
+        finds the placeholder positions. zeep numbers namespace prefixes in render
+        order, so each combination of present values gets its own header.
+        """
+        compiled = self._headers.get(present)
+        if compiled is None:
+            markers = {key: f"xroad-{key}-{uuid.uuid4().hex}" for key in present}
+            header = self.message._serialize_header({**self.static, **markers}, self._nsmap)
+            slots: list[tuple[str, int]] = []
+            if header is not None:
+                texts = {marker: key for key, marker in markers.items()}
+                slots = [
+                    (texts[element.text], index)
+                    for index, element in enumerate(header)
+                    if element.text in texts
+                ]
+            compiled = self._headers[present] = (header, slots)
+        return compiled
+
+    def _render_header(self, values: dict[str, Any]) -> etree._Element | None:
+        present = tuple(key for key in DYNAMIC_HEADERS if values.get(key) is not None)
+        template, slots = self._compile(present)
+        if template is None:
+            return None
+        header = copy.deepcopy(template)
+        for key, index in slots:
+            header[index].text = str(values[key])
+        return header
+
+    def serialize(self, values: dict[str, Any], kwargs: dict[str, Any]) -> SerializedMessage:
+        """
+        Builds the envelope of a call, like zeep's `SoapMessage.serialize`.
+
+        :param values: The `id` and `userId` of the call.
+        :param kwargs: The operation arguments.
+        :return: The serialized message.
+        """
+        message = self.message
+        envelope = self._soap.Envelope()
+        header = self._render_header(values)
+        if header is not None:
+            envelope.append(header)
+
+        if message.body:
+            body_value = message.body(**kwargs)
+            if message._is_body_wrapped:
+                message.body.render(envelope, body_value)
+            else:
+                body = self._soap.Body()
+                envelope.append(body)
+                message.body.render(body, body_value)
+        else:
+            envelope.append(self._soap.Body())
+
+        soapaction = self.operation.soapaction
+        headers = {"SOAPAction": f'"{soapaction or ""}"'}
+        return SerializedMessage(path=None, headers=headers, content=envelope)
+
+    def create(
+            self, client: Any, values: dict[str, Any], kwargs: dict[str, Any], options: dict[str, Any]
+    ) -> tuple[etree._Element, dict[str, str]]:
+        """
+        Builds the envelope and HTTP headers of a call, like zeep's
+        `SoapBinding._create`.
+
+        :param client: The calling client.
+        :param values: The `id` and `userId` of the call.
+        :param kwargs: The operation arguments.
+        :param options: The binding options of the service.
+        :return: The (envelope, HTTP headers) pair.
+        :rtype: Tuple
+        """
+        serialized = self.serialize(values, kwargs)
+        self.binding._set_http_headers(serialized, self.operation)
+        envelope, http_headers = serialized.content, serialized.headers
+
+        if self.operation.abstract.wsa_action:
+            envelope, http_headers = wsa.WsAddressingPlugin().egress(
+                envelope, http_headers, self.operation, options
+            )
+        envelope, http_headers = plugins.apply_egress(
+            client, envelope, http_headers, self.operation, options
+        )
+        if client.wsse:
+            for wsse in client.wsse if isinstance(client.wsse, list) else [client.wsse]:
+                envelope, http_headers = wsse.apply(envelope, http_headers)
+
+        if client.settings.extra_http_headers:
+            http_headers.update(client.settings.extra_http_headers)
+        return envelope, http_headers
@@ -0,0 +1,84 @@
+import logging
+import os
+import threading
+import weakref
+from typing import Any
+
+from requests.adapters import HTTPAdapter
+
+_logger = logging.getLogger(__name__)
+
+_objects: "weakref.WeakSet[Any]" = weakref.WeakSet()
+_lock = threading.Lock()
+
+
+def register(obj: Any) -> None:
+    """
+    Registers an object whose `_after_fork()` method runs in every child process
+    forked after this call, e.g. the workers of a pre-fork server.
+
+    pyxroad's clients, caches, coalescers, limiters and registries register
+    themselves. After a fork they drop what must not be shared with the parent:
+    pooled HTTP connections, Redis connections, locks that another parent thread may
+    have held at the time of the fork, and in-flight bookkeeping. Parsed WSDL
+    documents and cached content are kept, so they stay shared copy-on-write.
+
+    :param obj: An object with an `_after_fork()` method; it is held weakly.
+    """
+    with _lock:
+        _objects.add(obj)
+
+
+def _after_fork_in_child() -> None:
+    global _lock
+    # The parent may have forked while another thread held the lock.
+    _lock = threading.Lock()
+    for obj in list(_objects):
+        try:
+            obj._after_fork()
+        except Exception:
+            _logger.exception("Could not reset %r after fork", obj)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def reset_session(session: Any) -> None:
+    """
+    Replaces the connection pools of a `requests.Session`, keeping its adapters,
+    proxies and headers. The parent's pooled sockets are not closed or reused.
+
+    :param session: The session to reset.
+    """
+    for adapter in session.adapters.values():
+        if isinstance(adapter, HTTPAdapter):
+            adapter.init_poolmanager(
+                adapter._pool_connections, adapter._pool_maxsize, block=adapter._pool_block
+            )
+            adapter.proxy_manager = {}
+
+
+def reset_sqlite_cache(cache: Any) -> None:
+    """
+    Replaces the lock of a zeep `SqliteCache`, which another parent thread may have
+    held at the time of the fork. The cache opens a new database connection per call,
+    so nothing else is inherited.
+
+    :param cache: The cache to reset.
+    """
+    # zeep 4.0 - 4.3 keep the lock in the private `_lock` attribute; other versions
+    # are left alone rather than given a lock they would not use.
+    if hasattr(cache, "_lock"):
+        cache._lock = threading.RLock()
+
+
+def reset_redis(client: Any) -> None:
+    """
+    Drops the connections a Redis client inherited from the parent process.
+
+    :param client: A `redis.Redis` client, or None.
+    """
+    pool = getattr(client, "connection_pool", None)
+    if pool is not None:
+        pool.reset()
@@ -0,0 +1,411 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator, Iterator, Mapping
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any
+
+from zeep.exceptions import Fault, TransportError
+
+from . import fork
+from .Members import Members
+
+_logger = logging.getLogger(__name__)
+
+try:
+    from redis import Redis
+    from redis.exceptions import WatchError
+except ImportError:
+    Redis = None  # type: ignore[assignment, misc]
+
+_MAX_POLL = 0.05
+
+
+class LimiterTimeout(TransportError):
+    """
+    Raised when no slot of a service's limiter frees up within the timeout.
+    """
+
+
+class _State:
+    __slots__ = ("decreased", "inflight", "limit", "tokens", "updated")
+
+    def __init__(self, tokens: float, limit: float):
+        self.tokens = tokens
+        self.updated = time.monotonic()
+        self.limit = limit
+        self.decreased = 0.0
+        self.inflight = 0
+
+
+class ServiceLimiter:
+    """
+    Paces the upstream calls of each X-Road service.
+
+    Every service, identified by its `Members` path, has a token bucket (`rate`
+    calls per second with bursts of up to `burst`) and an adaptive concurrency limit.
+    The concurrency limit follows AIMD: it grows by one slot per limit's worth of
+    calls that succeed within `latency_target`, and is multiplied by `decrease`
+    when a call fails (anything but a SOAP `Fault`, e.g. a timeout or a connection
+    error) or is slower than `latency_target`. It decreases at most once per
+    `cooldown` seconds, so one burst of errors counts once.
+
+    The state is kept in memory, or in Redis to share it between worker processes.
+    Slots held in Redis are leased for `lease` seconds, so a crashed worker cannot
+    leak them. The Redis client may decode responses or not. Its calls are blocking,
+    so `aacquire()` and `aslot()` make them in a worker thread.
+
+    :ivar rate: The default calls per second of each service; None disables the
+        bucket.
+    :type rate: Float | None
+    :ivar rates: Calls per second of individual services, by `key()`.
+    :type rates: Mapping
+    :ivar timeout: The default seconds `acquire()` waits for a slot.
+    :type timeout: Float | None
+    """
+
+    def __init__(
+            self,
+            rate: float | None = None,
+            burst: int | None = None,
+            rates: Mapping[str, float] | None = None,
+            max_concurrency: int = 32,
+            min_concurrency: int = 1,
+            initial_concurrency: int | None = None,
+            latency_target: float | None = None,
+            decrease: float = 0.5,
+            cooldown: float = 1.0,
+            timeout: float | None = 30.0,
+            redis: str | Any | None = None,
+            prefix: str = "xroad:limit:",
+            lease: float = 60.0,
+    ):
+        """
+        :param rate: The default calls per second of each service; None disables the
+            bucket.
+        :param burst: The bucket size; defaults to `rate` (at least 1).
+        :param rates: Calls per second of individual services, by `key()`.
+        :param max_concurrency: The upper bound of the concurrency limit.
+        :param min_concurrency: The lower bound of the concurrency limit.
+        :param initial_concurrency: The starting limit; defaults to half of
+            `max_concurrency`.
+        :param latency_target: Calls slower than this many seconds shrink the limit;
+            None only reacts to failures.
+        :param decrease: The factor applied to the limit on failure.
+        :param cooldown: The minimum seconds between two decreases.
+        :param timeout: The default seconds `acquire()` waits; None waits forever.
+        :param redis: A Redis URL or client to share the state between processes.
+        :param prefix: The prefix of the Redis keys.
+        :param lease: Seconds after which a slot held in Redis is freed.
+
+        :raises ValueError: If the concurrency bounds are inconsistent.
+        """
+        if not 1 <= min_concurrency <= max_concurrency:
+            raise ValueError("need 1 <= min_concurrency <= max_concurrency")
+        self.rate = rate
+        self.burst = burst
+        self.rates = dict(rates or {})
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        if initial_concurrency is None:
+            initial_concurrency = max(min_concurrency, max_concurrency // 2)
+        self.initial_concurrency = min(max(initial_concurrency, min_concurrency), max_concurrency)
+        self.latency_target = latency_target
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.timeout = timeout
+        self.prefix = prefix
+        self.lease = lease
+
+        self.redis_client: Any | None = None
+        if redis is not None:
+            if Redis is None:
+                _logger.warning("Redis is not installed, limiter state is kept in-process")
+            elif isinstance(redis, str):
+                self.redis_client = Redis.from_url(redis)
+            else:
+                self.redis_client = redis
+        self._lock = threading.Lock()
+        self._states: dict[str, _State] = {}
+        fork.register(self)
+
+    def _after_fork(self) -> None:
+        # The slots held by the parent are released in the parent, never here.
+        self._lock = threading.Lock()
+        for state in self._states.values():
+            state.inflight = 0
+        fork.reset_redis(self.redis_client)
+
+    @staticmethod
+    def key(service: Members) -> str:
+        """
+        Builds the limiter key of a service: its member path including the version.
+
+        :param service: The SERVICE member.
+        :return: e.g. ``"INSTANCE/GOV/00000000/SUB/Service/v1"``.
+        :rtype: String
+        """
+        return "/".join(
+            value
+            for value in (
+                service.xRoadInstance,
+                service.memberClass,
+                service.memberCode,
+                service.subsystemCode,
+                service.serviceCode,
+                service.serviceVersion,
+            )
+            if value
+        )
+
+    def _bucket(self, key: str) -> tuple[float | None, float]:
+        rate = self.rates.get(key, self.rate)
+        if rate is None:
+            return None, 0.0
+        return rate, float(self.burst if self.burst is not None else max(rate, 1.0))
+
+    def _refill(self, key: str, tokens: float, updated: float, now: float) -> float:
+        rate, burst = self._bucket(key)
+        if rate is None:
+            return burst
+        return min(burst, tokens + max(now - updated, 0.0) * rate)
+
+    def _adjust(
+            self, limit: float, decreased: float, latency: float, failed: bool, now: float
+    ) -> tuple[float, float]:
+        """
+        Applies one AIMD step and returns the new (limit, last decrease time).
+        """
+        slow = self.latency_target is not None and latency > self.latency_target
+        if failed or slow:
+            if now - decreased >= self.cooldown:
+                limit = max(float(self.min_concurrency), limit * self.decrease)
+                _logger.debug("Concurrency limit decreased to %.1f", limit)
+                decreased = now
+            return limit, decreased
+        return min(float(self.max_concurrency), limit + 1.0 / max(limit, 1.0)), decreased
+
+    def limit(self, key: str) -> float:
+        """
+        Returns the current concurrency limit of a service.
+
+        :param key: The service key, see `key()`.
+        :rtype: Float
+        """
+        if self.redis_client is not None:
+            value = self.redis_client.hget(self.prefix + key, "limit")
+            return float(value) if value is not None else float(self.initial_concurrency)
+        with self._lock:
+            state = self._states.get(key)
+            return state.limit if state is not None else float(self.initial_concurrency)
+
+    def try_acquire(self, key: str) -> tuple[str | None, float]:
+        """
+        Takes a slot of the service without waiting.
+
+        :param key: The service key, see `key()`.
+        :return: A (token, wait) pair: the token to pass to `release()`, or None
+            with the seconds to wait before trying again.
+        :rtype: Tuple
+        """
+        if self.redis_client is not None:
+            return self._try_acquire_redis(key)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = _State(
+                    self._bucket(key)[1], float(self.initial_concurrency)
+                )
+            if state.inflight >= int(state.limit):
+                return None, _MAX_POLL
+            now = time.monotonic()
+            state.tokens = self._refill(key, state.tokens, state.updated, now)
+            state.updated = now
+            rate, _ = self._bucket(key)
+            if rate is not None:
+                if state.tokens < 1.0:
+                    return None, (1.0 - state.tokens) / rate
+                state.tokens -= 1.0
+            state.inflight += 1
+            return uuid.uuid4().hex, 0.0
+
+    @staticmethod
+    def _hgetall(pipe: Any, key: str) -> dict[str, Any]:
+        # Clients created with decode_responses=True return str keys, others bytes.
+        return {
+            field.decode() if isinstance(field, bytes) else field: value
+            for field, value in pipe.hgetall(key).items()
+        }
+
+    def _try_acquire_redis(self, key: str) -> tuple[str | None, float]:
+        assert self.redis_client is not None
+        state_key, inflight_key = self.prefix + key, self.prefix + key + ":inflight"
+        rate, burst = self._bucket(key)
+        ttl = max(int(self.lease), 60) * 10
+        with self.redis_client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(state_key, inflight_key)
+                    seconds, micros = pipe.time()
+                    now = seconds + micros / 1e6
+                    state = self._hgetall(pipe, state_key)
+                    limit = float(state.get("limit", self.initial_concurrency))
+                    if pipe.zcount(inflight_key, now - self.lease, "+inf") >= int(limit):
+                        pipe.unwatch()
+                        return None, _MAX_POLL
+                    tokens = self._refill(
+                        key, float(state.get("tokens", burst)), float(state.get("updated", now)), now
+                    )
+                    if rate is not None:
+                        if tokens < 1.0:
+                            pipe.unwatch()
+                            return None, (1.0 - tokens) / rate
+                        tokens -= 1.0
+                    token = uuid.uuid4().hex
+                    pipe.multi()
+                    pipe.zremrangebyscore(inflight_key, "-inf", now - self.lease)
+                    pipe.zadd(inflight_key, {token: now})
+                    pipe.hset(state_key, mapping={"tokens": tokens, "updated": now, "limit": limit})
+                    pipe.expire(state_key, ttl)
+                    pipe.expire(inflight_key, ttl)
+                    pipe.execute()
+                    return token, 0.0
+                except WatchError:
+                    continue
+
+    def acquire(self, key: str, timeout: float | None = None) -> str:
+        """
+        Waits for a slot of the service.
+
+        :param key: The service key, see `key()`.
+        :param timeout: Seconds to wait; defaults to the limiter's `timeout`.
+        :return: The token to pass to `release()`.
+        :rtype: String
+        :raises LimiterTimeout: If no slot frees up in time.
+        """
+        deadline = self._deadline(timeout)
+        while True:
+            token, wait = self.try_acquire(key)
+            if token is not None:
+                return token
+            time.sleep(self._wait(key, wait, deadline))
+
+    async def aacquire(self, key: str, timeout: float | None = None) -> str:
+        """
+        Asynchronous counterpart of `acquire()`.
+        """
+        deadline = self._deadline(timeout)
+        while True:
+            if self.redis_client is not None:
+                token, wait = await asyncio.to_thread(self.try_acquire, key)
+            else:
+                token, wait = self.try_acquire(key)
+            if token is not None:
+                return token
+            await asyncio.sleep(self._wait(key, wait, deadline))
+
+    def _deadline(self, timeout: float | None) -> float | None:
+        timeout = self.timeout if timeout is None else timeout
+        return None if timeout is None else time.monotonic() + timeout
+
+    def _wait(self, key: str, wait: float, deadline: float | None) -> float:
+        wait = min(wait, _MAX_POLL)
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LimiterTimeout(f"No slot for {key} within the timeout")
+            wait = min(wait, remaining)
+        return wait
+
+    def release(self, key: str, token: str, latency: float, failed: bool) -> None:
+        """
+        Frees a slot and feeds the call's outcome into the concurrency limit.
+
+        :param key: The service key, see `key()`.
+        :param token: The token returned by `acquire()`.
+        :param latency: The call's duration in seconds.
+        :param failed: True if the call failed (a SOAP Fault is not a failure).
+        """
+        if self.redis_client is not None:
+            self._release_redis(key, token, latency, failed)
+            return
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return
+            state.inflight = max(state.inflight - 1, 0)
+            state.limit, state.decreased = self._adjust(
+                state.limit, state.decreased, latency, failed, time.monotonic()
+            )
+
+    def _release_redis(self, key: str, token: str, latency: float, failed: bool) -> None:
+        assert self.redis_client is not None
+        state_key, inflight_key = self.prefix + key, self.prefix + key + ":inflight"
+        with self.redis_client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(state_key)
+                    seconds, micros = pipe.time()
+                    now = seconds + micros / 1e6
+                    state = self._hgetall(pipe, state_key)
+                    limit, decreased = self._adjust(
+                        float(state.get("limit", self.initial_concurrency)),
+                        float(state.get("decreased", 0.0)),
+                        latency,
+                        failed,
+                        now,
+                    )
+                    pipe.multi()
+                    pipe.zrem(inflight_key, token)
+                    pipe.hset(state_key, mapping={"limit": limit, "decreased": decreased})
+                    pipe.execute()
+                    return
+                except WatchError:
+                    continue
+
+    @contextmanager
+    def slot(self, key: str, timeout: float | None = None) -> Iterator[None]:
+        """
+        Holds a slot of the service for the duration of the block, timing it and
+        treating any exception but a SOAP `Fault` as a failure.
+
+        :param key: The service key, see `key()`.
+        :param timeout: Seconds to wait for the slot.
+        :raises LimiterTimeout: If no slot frees up in time.
+        """
+        token = self.acquire(key, timeout)
+        started = time.monotonic()
+        failed = False
+        try:
+            yield
+        except Fault:
+            raise
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.release(key, token, time.monotonic() - started, failed)
+
+    @asynccontextmanager
+    async def aslot(self, key: str, timeout: float | None = None) -> AsyncIterator[None]:
+        """
+        Asynchronous counterpart of `slot()`.
+        """
+        token = await self.aacquire(key, timeout)
+        started = time.monotonic()
+        failed = False
+        try:
+            yield
+        except Fault:
+            raise
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            latency = time.monotonic() - started
+            if self.redis_client is not None:
+                await asyncio.to_thread(self.release, key, token, latency, failed)
+            else:
+                self.release(key, token, latency, failed)
@@ -1,11 +1,31 @@
 import datetime
+import gzip
 import logging
+import random
+import re
+import threading
+import time
+import zlib
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Callable, Iterable
 from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
 
-from zeep.plugins import HistoryPlugin
+from zeep.exceptions import Fault
+from zeep.plugins import HistoryPlugin, Plugin
+
+from . import fork
 
 _logger = logging.getLogger(__name__)
 
+PHASES = ("build", "http", "parse", "serialize")
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
 
 class UXPHistoryPlugin(HistoryPlugin):
     """
@@ -53,3 +73,578 @@ class UXPHistoryPlugin(HistoryPlugin):
         except ValueError:
             date = datetime.datetime.now()
         return date
+
+
+class Histogram:
+    """
+    A fixed-bucket histogram in the Prometheus layout: its memory does not grow with
+    the number of observations.
+
+    :ivar bounds: The upper bounds of the buckets, ascending; an implicit +Inf
+        bucket follows.
+    :type bounds: Tuple
+    :ivar counts: The observations per bucket (not cumulative).
+    :type counts: List
+    """
+
+    __slots__ = ("bounds", "count", "counts", "sum")
+
+    def __init__(self, bounds: Iterable[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """
+        :return: The (le, cumulative count) pairs, ending with "+Inf".
+        :rtype: List
+        """
+        total, result = 0, []
+        for bound, count in zip((*map(repr, self.bounds), "+Inf"), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile as the upper bound of the bucket it falls in.
+        """
+        if not self.count:
+            return 0.0
+        rank, total = q * self.count, 0
+        for index, count in enumerate(self.counts):
+            total += count
+            if total >= rank and count:
+                return self.bounds[index] if index < len(self.bounds) else float("inf")
+        return float("inf")
+
+
+class CallTimer:
+    """
+    Collects the phases of one call for a `MetricsPlugin` and a `CallLogPlugin`.
+    """
+
+    __slots__ = (
+        "last",
+        "log",
+        "message_id",
+        "operation",
+        "phases",
+        "plugin",
+        "request_bytes",
+        "response",
+        "response_bytes",
+        "service",
+        "started",
+        "transaction_id",
+    )
+
+    def __init__(
+            self,
+            plugin: "MetricsPlugin | None",
+            service: str,
+            operation: str,
+            log: "CallLogPlugin | None" = None,
+    ):
+        self.plugin = plugin
+        self.log = log
+        self.service = service
+        self.operation = operation
+        self.started = self.last = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.request_bytes: int | None = None
+        self.response_bytes: int | None = None
+        self.transaction_id = ""
+        self.message_id = ""
+        self.response: Any = None
+
+    def mark(self, phase: str) -> None:
+        """
+        Ends `phase`, which started when the previous phase ended.
+        """
+        now = time.perf_counter()
+        self.phases[phase] = now - self.last
+        self.last = now
+
+    def received(self, response: Any, streamed: bool = False) -> None:
+        """
+        Ends the "http" phase and reads the payload sizes and transaction id of the
+        HTTP response. The body of a `streamed` response is not read: its size is
+        taken from ``Content-Length``, which is unknown for chunked responses.
+        """
+        self.mark("http")
+        self.response = None if streamed else response
+        if not streamed:
+            self.response_bytes = len(response.content)
+        elif response.headers.get("Content-Length", "").isdigit():
+            self.response_bytes = int(response.headers["Content-Length"])
+        self.transaction_id = response.headers.get("uxp-transaction-id", "")
+        try:
+            request = response.request
+        except RuntimeError:  # an httpx response built without a request
+            request = None
+        # requests keeps the sent bytes in `body`, httpx in `content`.
+        body = getattr(request, "body", None) or getattr(request, "content", None)
+        if body is not None:
+            self.request_bytes = len(body)
+
+    def finish(self, error: BaseException | None = None) -> None:
+        """
+        Hands the call over to the plugins.
+
+        :param error: The exception the call raised, if any.
+        """
+        if self.plugin is not None:
+            self.plugin.record(self, error)
+        if self.log is not None:
+            self.log.record(self, error)
+
+
+class _NullTimer(CallTimer):
+    """
+    The timer of calls that nothing records: every method is a no-op.
+    """
+
+    __slots__ = ()
+
+    def __init__(self) -> None:
+        pass
+
+    def mark(self, phase: str) -> None:
+        pass
+
+    def received(self, response: Any, streamed: bool = False) -> None:
+        pass
+
+    def finish(self, error: BaseException | None = None) -> None:
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _ServiceMetrics:
+    __slots__ = (
+        "calls",
+        "errors",
+        "faults",
+        "phases",
+        "request_bytes",
+        "response_bytes",
+        "total",
+        "transaction_id",
+    )
+
+    def __init__(self, latency_buckets: tuple[float, ...], size_buckets: tuple[float, ...]):
+        self.phases = {phase: Histogram(latency_buckets) for phase in PHASES}
+        self.total = Histogram(latency_buckets)
+        self.request_bytes = Histogram(size_buckets)
+        self.response_bytes = Histogram(size_buckets)
+        self.calls = 0
+        self.faults: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self.transaction_id = ""
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsPlugin(Plugin):
+    """
+    Records per-service call metrics of the `XClient` instances it is passed to with
+    ``plugins=[...]``.
+
+    Each call is split into phases: "build" (the envelope), "http" (the round trip
+    through the security server), "parse" (XML parsing and zeep's deserialization)
+    and "serialize" (`serialize_object`). Durations and payload sizes go into
+    fixed-bucket histograms, faults are counted by code and other errors by type,
+    and the last `uxp-transaction-id` of each service is kept. Nothing of the
+    envelopes is stored, unlike zeep's `HistoryPlugin`. Request sizes are only known
+    when the transport's response keeps the sent request, as `requests` does.
+
+    Calls slower than `slow_threshold` seconds are logged, with their phases and
+    transaction id, for a `slow_sample` fraction of them, and the latest are kept in
+    `slow_calls`.
+
+    :ivar slow_calls: The latest sampled slow calls as dicts.
+    :type slow_calls: Deque
+    """
+
+    def __init__(
+            self,
+            latency_buckets: Iterable[float] = LATENCY_BUCKETS,
+            size_buckets: Iterable[float] = SIZE_BUCKETS,
+            slow_threshold: float | None = None,
+            slow_sample: float = 1.0,
+            slow_keep: int = 100,
+            max_fault_codes: int = 50,
+    ):
+        """
+        :param latency_buckets: The upper bounds of the duration buckets in seconds.
+        :param size_buckets: The upper bounds of the payload size buckets in bytes.
+        :param slow_threshold: Calls slower than this many seconds are slow; None
+            disables the slow-call log.
+        :param slow_sample: The fraction of slow calls that are logged.
+        :param slow_keep: How many sampled slow calls `slow_calls` keeps.
+        :param max_fault_codes: Distinct fault codes counted per service; the rest are
+            counted as "other".
+        """
+        self.latency_buckets = tuple(sorted(latency_buckets))
+        self.size_buckets = tuple(sorted(size_buckets))
+        self.slow_threshold = slow_threshold
+        self.slow_sample = slow_sample
+        self.max_fault_codes = max_fault_codes
+        self.slow_calls: deque[dict[str, Any]] = deque(maxlen=slow_keep)
+        self._services: dict[str, _ServiceMetrics] = {}
+        self._lock = threading.Lock()
+        fork.register(self)
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+    def timer(self, service: str, operation: str) -> CallTimer:
+        """
+        Starts timing a call.
+
+        :param service: The service label, e.g. the service's member path.
+        :param operation: The operation name.
+        :rtype: CallTimer
+        """
+        return CallTimer(self, service, operation)
+
+    def _service(self, service: str) -> _ServiceMetrics:
+        metrics = self._services.get(service)
+        if metrics is None:
+            metrics = self._services[service] = _ServiceMetrics(
+                self.latency_buckets, self.size_buckets
+            )
+        return metrics
+
+    def record(self, timer: CallTimer, error: BaseException | None = None) -> None:
+        """
+        Adds a finished call to the metrics.
+
+        :param timer: The call's timer.
+        :param error: The exception the call raised, if any.
+        """
+        total = time.perf_counter() - timer.started
+        with self._lock:
+            metrics = self._service(timer.service)
+            metrics.calls += 1
+            metrics.total.observe(total)
+            for phase, seconds in timer.phases.items():
+                histogram = metrics.phases.get(phase)
+                if histogram is not None:
+                    histogram.observe(seconds)
+            if timer.request_bytes is not None:
+                metrics.request_bytes.observe(timer.request_bytes)
+            if timer.response_bytes is not None:
+                metrics.response_bytes.observe(timer.response_bytes)
+            if timer.transaction_id:
+                metrics.transaction_id = timer.transaction_id
+            if isinstance(error, Fault):
+                code = str(error.code or "")
+                if code not in metrics.faults and len(metrics.faults) >= self.max_fault_codes:
+                    code = "other"
+                metrics.faults[code] = metrics.faults.get(code, 0) + 1
+            elif error is not None:
+                name = type(error).__name__
+                metrics.errors[name] = metrics.errors.get(name, 0) + 1
+
+        if (
+                self.slow_threshold is not None
+                and total > self.slow_threshold
+                and random.random() < self.slow_sample
+        ):
+            self._log_slow(timer, total, error)
+
+    def _log_slow(self, timer: CallTimer, total: float, error: BaseException | None) -> None:
+        call = {
+            "service": timer.service,
+            "operation": timer.operation,
+            "seconds": total,
+            "phases": dict(timer.phases),
+            "request_bytes": timer.request_bytes,
+            "response_bytes": timer.response_bytes,
+            "transaction_id": timer.transaction_id,
+            "error": repr(error) if error is not None else None,
+        }
+        self.slow_calls.append(call)
+        _logger.warning(
+            "Slow call %s.%s %.3fs (%s) transaction %s",
+            timer.service,
+            timer.operation,
+            total,
+            ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in timer.phases.items()),
+            timer.transaction_id or "-",
+        )
+
+    def histogram(self, service: str, phase: str = "total") -> Histogram | None:
+        """
+        Returns a histogram of a service: a phase, "total", "request_bytes" or
+        "response_bytes".
+
+        :rtype: Histogram | None
+        """
+        metrics = self._services.get(service)
+        if metrics is None:
+            return None
+        if phase in metrics.phases:
+            return metrics.phases[phase]
+        return getattr(metrics, phase, None) if phase in ("total", "request_bytes", "response_bytes") else None
+
+    def transaction_id(self, service: str) -> str:
+        """
+        Returns the last `uxp-transaction-id` received from a service.
+        """
+        metrics = self._services.get(service)
+        return metrics.transaction_id if metrics is not None else ""
+
+    def prometheus(self) -> str:
+        """
+        Renders the metrics in the Prometheus text exposition format.
+
+        :rtype: String
+        """
+        lines: list[str] = []
+
+        def histogram(name: str, labels: str, value: Histogram) -> None:
+            for bound, count in value.cumulative():
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"{name}_sum{{{labels}}} {value.sum!r}")
+            lines.append(f"{name}_count{{{labels}}} {value.count}")
+
+        with self._lock:
+            services = sorted(self._services.items())
+            lines += [
+                "# HELP xroad_call_seconds Duration of X-Road calls by phase.",
+                "# TYPE xroad_call_seconds histogram",
+            ]
+            for service, metrics in services:
+                label = f'service="{_label(service)}"'
+                histogram("xroad_call_seconds", f'{label},phase="total"', metrics.total)
+                for phase, value in metrics.phases.items():
+                    histogram("xroad_call_seconds", f'{label},phase="{phase}"', value)
+            lines += [
+                "# HELP xroad_payload_bytes Size of X-Road request and response bodies.",
+                "# TYPE xroad_payload_bytes histogram",
+            ]
+            for service, metrics in services:
+                label = f'service="{_label(service)}"'
+                histogram("xroad_payload_bytes", f'{label},direction="request"', metrics.request_bytes)
+                histogram("xroad_payload_bytes", f'{label},direction="response"', metrics.response_bytes)
+            lines += ["# HELP xroad_calls_total X-Road calls.", "# TYPE xroad_calls_total counter"]
+            for service, metrics in services:
+                lines.append(f'xroad_calls_total{{service="{_label(service)}"}} {metrics.calls}')
+            lines += ["# HELP xroad_faults_total SOAP faults by code.", "# TYPE xroad_faults_total counter"]
+            for service, metrics in services:
+                for code, count in sorted(metrics.faults.items()):
+                    lines.append(
+                        f'xroad_faults_total{{service="{_label(service)}",code="{_label(code)}"}} {count}'
+                    )
+            lines += [
+                "# HELP xroad_errors_total Failed X-Road calls by exception type.",
+                "# TYPE xroad_errors_total counter",
+            ]
+            for service, metrics in services:
+                for name, count in sorted(metrics.errors.items()):
+                    lines.append(
+                        f'xroad_errors_total{{service="{_label(service)}",error="{name}"}} {count}'
+                    )
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serves `prometheus()` over HTTP from a daemon thread.
+
+        :param port: The port to listen on; 0 picks a free one.
+        :param host: The address to bind.
+        :return: The running server; call `shutdown()` to stop it.
+        :rtype: ThreadingHTTPServer
+        """
+        plugin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body = plugin.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                _logger.debug(format, *args)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True, name="XRoadMetrics").start()
+        return server
+
+
+def _payload(content: Any, encoding: str | None = None) -> str | None:
+    """
+    Decodes a captured request or response body; None when there is none.
+    """
+    if isinstance(content, str):
+        return content
+    if not isinstance(content, bytes):
+        return None
+    body: bytes = content
+    try:
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "deflate":
+            body = zlib.decompress(body)
+    except (OSError, zlib.error):
+        return None
+    return body.decode("utf-8", "replace")
+
+
+class CallLogPlugin(Plugin):
+    """
+    Logs one compact record per call of the `XClient` instances it is passed to with
+    ``plugins=[...]``: service, operation, message id, transaction id, duration,
+    payload sizes and outcome.
+
+    The logger level is checked before a call starts, so with the logger disabled a
+    call does no logging work at all. The full request and response payloads are
+    added to the record of failed calls (`capture_failed`) and of a `sample`
+    fraction of the others, after redaction: the text of every element named in
+    `redact_elements` is replaced with ``***``, then each `redact` hook rewrites the
+    payload. Captured payloads are cut at `max_payload` characters.
+
+    The record goes out as a single log line, and as a dict in the ``xroad_call``
+    attribute of the `logging.LogRecord` for structured (e.g. JSON) handlers.
+
+        log = CallLogPlugin(sample=0.01, redact_elements=["PasNumber"])
+        client = XClient(ssu, client, service, plugins=[log])
+    """
+
+    def __init__(
+            self,
+            logger: str | logging.Logger = "XRoad.calls",
+            level: int = logging.INFO,
+            failure_level: int = logging.WARNING,
+            sample: float = 0.0,
+            capture_failed: bool = True,
+            redact_elements: Iterable[str] = (),
+            redact: Iterable[Callable[[str], str]] = (),
+            max_payload: int = 65536,
+    ):
+        """
+        :param logger: The logger, or its name.
+        :param level: The level of the records of successful calls.
+        :param failure_level: The level of the records of faults and errors.
+        :param sample: The fraction of successful calls whose payloads are captured.
+        :param capture_failed: Capture the payloads of faults and errors.
+        :param redact_elements: Local names of the elements whose text is masked.
+        :param redact: Functions applied in turn to every captured payload.
+        :param max_payload: The longest captured payload, in characters.
+        """
+        self.logger = logging.getLogger(logger) if isinstance(logger, str) else logger
+        self.level = level
+        self.failure_level = failure_level
+        self.sample = sample
+        self.capture_failed = capture_failed
+        self.redact = tuple(redact)
+        self.max_payload = max_payload
+        names = "|".join(re.escape(name) for name in redact_elements)
+        self._redact_elements = (
+            re.compile(rf"(<(?:[\w.-]+:)?(?:{names})(?:\s[^>]*)?>)[^<]+") if names else None
+        )
+
+    def enabled(self) -> bool:
+        """
+        Tells whether calls are logged at all with the current logger levels.
+        """
+        return self.logger.isEnabledFor(max(self.level, self.failure_level))
+
+    def timer(self, service: str, operation: str) -> CallTimer:
+        """
+        Starts timing a call.
+
+        :param service: The service label, e.g. the service's member path.
+        :param operation: The operation name.
+        :rtype: CallTimer
+        """
+        return CallTimer(None, service, operation, log=self)
+
+    def scrub(self, payload: str) -> str:
+        """
+        Redacts and truncates a payload.
+
+        :param payload: The request or response body.
+        :rtype: String
+        """
+        if self._redact_elements is not None:
+            payload = self._redact_elements.sub(r"\1***", payload)
+        for hook in self.redact:
+            payload = hook(payload)
+        if len(payload) > self.max_payload:
+            payload = f"{payload[:self.max_payload]}... [{len(payload) - self.max_payload} more]"
+        return payload
+
+    def record(self, timer: CallTimer, error: BaseException | None = None) -> None:
+        """
+        Logs a finished call.
+
+        :param timer: The call's timer.
+        :param error: The exception the call raised, if any.
+        """
+        level = self.level if error is None else self.failure_level
+        if not self.logger.isEnabledFor(level):
+            return
+        total = time.perf_counter() - timer.started
+        if isinstance(error, Fault):
+            outcome = f"fault {error.code}"
+        elif error is not None:
+            outcome = f"error {type(error).__name__}"
+        else:
+            outcome = "ok"
+        call: dict[str, Any] = {
+            "service": timer.service,
+            "operation": timer.operation,
+            "id": timer.message_id,
+            "transaction_id": timer.transaction_id,
+            "seconds": total,
+            "request_bytes": timer.request_bytes,
+            "response_bytes": timer.response_bytes,
+            "outcome": outcome,
+        }
+        message = "%s.%s %s %.1fms id=%s transaction=%s bytes=%s/%s"
+        args: tuple[Any, ...] = (
+            timer.service,
+            timer.operation,
+            outcome,
+            total * 1000,
+            timer.message_id or "-",
+            timer.transaction_id or "-",
+            "-" if timer.request_bytes is None else timer.request_bytes,
+            "-" if timer.response_bytes is None else timer.response_bytes,
+        )
+        if (self.capture_failed and error is not None) or (error is None and random.random() < self.sample):
+            request, response = self._payloads(timer.response)
+            call["request"] = self.scrub(request) if request is not None else None
+            call["response"] = self.scrub(response) if response is not None else None
+            message += "\nrequest: %s\nresponse: %s"
+            args += (call["request"], call["response"])
+        self.logger.log(level, message, *args, extra={"xroad_call": call})
+
+    @staticmethod
+    def _payloads(response: Any) -> tuple[str | None, str | None]:
+        if response is None:
+            return None, None
+        try:
+            request = response.request
+        except RuntimeError:  # an httpx response built without a request
+            request = None
+        body = getattr(request, "body", None) or getattr(request, "content", None)
+        headers = getattr(request, "headers", None) or {}
+        return _payload(body, headers.get("Content-Encoding")), _payload(response.content)
@@ -0,0 +1,174 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from . import fork
+from .Members import Members
+
+_logger = logging.getLogger(__name__)
+
+RegistryKey = tuple[str, str, str | None]
+
+
+class WSDLRegistry:
+    """
+    A process-wide store of parsed WSDL documents shared by `XClient` instances.
+
+    Parsing a WSDL and its XSDs is the expensive part of building a zeep client, even
+    when the transport cache saves the download. The registry keeps the parsed zeep
+    `Document` per (security server, service path, service version), so building a
+    client for an already parsed service only costs a dictionary lookup.
+
+    Entries are evicted least-recently-used once `maxsize` is reached and are
+    re-parsed after `ttl` seconds. Concurrent first loads of the same service are
+    serialized, so a burst of clients parses each WSDL only once.
+
+    :ivar maxsize: The maximum number of parsed documents kept.
+    :type maxsize: Int
+    :ivar ttl: Seconds after which an entry is parsed again; `None` keeps it forever.
+    :type ttl: Float | None
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float | None = 3600):
+        """
+        :param maxsize: The maximum number of parsed documents kept.
+        :param ttl: Seconds after which an entry is parsed again; `None` disables expiry.
+
+        :raises ValueError: If `maxsize` is less than 1.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[RegistryKey, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: dict[RegistryKey, threading.Lock] = {}
+        fork.register(self)
+
+    def _after_fork(self) -> None:
+        # The parsed documents are kept: they are what the workers share.
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    @staticmethod
+    def key(ssu: str, service: Members) -> RegistryKey:
+        """
+        Builds the registry key of a service.
+
+        :param ssu: The security server URL.
+        :param service: The SERVICE member.
+        :return: A (ssu, service path without version, version) tuple.
+        """
+        path = "/".join(
+            value
+            for value in (
+                service.xRoadInstance,
+                service.memberClass,
+                service.memberCode,
+                service.subsystemCode,
+                service.serviceCode,
+            )
+            if value
+        )
+        return ssu.rstrip("/"), path, service.serviceVersion
+
+    def _lookup(self, key: RegistryKey) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, document = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                _logger.debug("WSDL registry entry expired: %s", key)
+                return None
+            self._entries.move_to_end(key)
+            return document
+
+    def get_or_load(self, key: RegistryKey, loader: Callable[[], Any]) -> Any:
+        """
+        Returns the parsed document for `key`, calling `loader` once on a miss.
+
+        :param key: The registry key, see `key()`.
+        :param loader: A callable returning a parsed zeep `Document`.
+        :return: The cached or freshly parsed document.
+        """
+        document = self._lookup(key)
+        if document is not None:
+            return document
+
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            document = self._lookup(key)
+            if document is not None:
+                return document
+            _logger.debug("WSDL registry miss, parsing: %s", key)
+            try:
+                document = loader()
+                self.put(key, document)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        return document
+
+    def put(self, key: RegistryKey, document: Any) -> None:
+        """
+        Stores a parsed document, evicting the least recently used entries.
+
+        :param key: The registry key, see `key()`.
+        :param document: The parsed zeep `Document`.
+        """
+        expires = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (expires, document)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                evicted, _ = self._entries.popitem(last=False)
+                _logger.debug("WSDL registry evicted: %s", evicted)
+
+    def invalidate(self, ssu: str | None = None, service: str | None = None) -> int:
+        """
+        Drops entries matching the given security server and/or service path. With no
+        arguments the whole registry is cleared.
+
+        :param ssu: Only drop entries of this security server.
+        :param service: Only drop entries of this service path, e.g.
+            ``"INSTANCE/GOV/00000000/SUB/Service"`` (with or without the version).
+        :return: The number of dropped entries.
+        :rtype: Int
+        """
+        if service is not None:
+            member = Members(objectType="SERVICE", memberPath=service)
+            _, path, version = self.key("", member)
+        with self._lock:
+            dropped = [
+                key
+                for key in self._entries
+                if (ssu is None or key[0] == ssu.rstrip("/"))
+                and (service is None or (key[1] == path and (version is None or key[2] == version)))
+            ]
+            for key in dropped:
+                del self._entries[key]
+        _logger.debug("WSDL registry invalidated %d entries", len(dropped))
+        return len(dropped)
+
+    def clear(self) -> None:
+        """
+        Drops every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+
+wsdl_registry = WSDLRegistry()
@@ -0,0 +1,253 @@
+import io
+from collections.abc import Callable, Generator, Iterator, Mapping
+from typing import IO, TYPE_CHECKING, Any
+
+import requests
+from lxml import etree
+from urllib3.exceptions import HTTPError
+from zeep.exceptions import TransportError
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+RESPONSE_MODES = ("dict", "raw", "lazy", "iter")
+
+_FAULTS = (
+    "{http://schemas.xmlsoap.org/soap/envelope/}Fault",
+    "{http://www.w3.org/2003/05/soap-envelope}Fault",
+)
+
+
+def _local_name(element: etree._Element) -> str:
+    return str(etree.QName(element).localname)
+
+
+def _value(element: etree._Element) -> Any:
+    if len(element):
+        return LazyElement(element)
+    return element.text
+
+
+class LazyElement(Mapping):
+    """
+    A read-only, dict-like view of a response element.
+
+    Child elements are looked up by local name when accessed, so only the parts of a
+    large response that are actually read are ever converted. Leaf elements are
+    returned as text (no XSD type conversion), complex ones as another `LazyElement`.
+    Without the schema a repeated element that occurs once cannot be told from a
+    single one, so use `getlist()` for elements that may repeat.
+
+    :ivar element: The underlying lxml element.
+    :type element: lxml.etree._Element
+    """
+
+    __slots__ = ("_children", "element")
+
+    def __init__(self, element: etree._Element):
+        self.element = element
+        self._children: dict[str, list[etree._Element]] | None = None
+
+    def _index(self) -> dict[str, list[etree._Element]]:
+        if self._children is None:
+            children: dict[str, list[etree._Element]] = {}
+            for child in self.element:
+                if isinstance(child.tag, str):
+                    children.setdefault(_local_name(child), []).append(child)
+            self._children = children
+        return self._children
+
+    def __getitem__(self, key: str) -> Any:
+        found = self._index()[key]
+        if len(found) == 1:
+            return _value(found[0])
+        return [_value(child) for child in found]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index())
+
+    def __len__(self) -> int:
+        return len(self._index())
+
+    def __repr__(self) -> str:
+        return f"<LazyElement {_local_name(self.element)}>"
+
+    def getlist(self, key: str) -> list[Any]:
+        """
+        Returns every occurrence of a child element.
+
+        :param key: The local name of the child.
+        :return: The values, empty when the child is missing.
+        :rtype: List
+        """
+        return [_value(child) for child in self._index().get(key, ())]
+
+    @property
+    def attrib(self) -> dict[str, str]:
+        """
+        The attributes of the element.
+        """
+        return dict(self.element.attrib)
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Converts the whole element eagerly.
+
+        :return: Nested dicts; repeated children become lists.
+        :rtype: Dict
+        """
+        return element_to_dict(self.element)
+
+
+def element_to_dict(element: etree._Element) -> dict[str, Any]:
+    """
+    Converts an element and its children to nested dicts, with the same rules as
+    `LazyElement`.
+
+    :param element: The lxml element.
+    :return: A dict of the children by local name.
+    :rtype: Dict
+    """
+    result: dict[str, Any] = {}
+    for child in element:
+        if not isinstance(child.tag, str):
+            continue
+        value = element_to_dict(child) if len(child) else child.text
+        name = _local_name(child)
+        if name not in result:
+            result[name] = value
+        elif isinstance(result[name], list):
+            result[name].append(value)
+        else:
+            result[name] = [result[name], value]
+    return result
+
+
+def iter_elements(
+        content: bytes | IO[bytes], tag: str, on_fault: Callable[[], None] | None = None
+) -> Iterator[Any]:
+    """
+    Yields every element named `tag` of a response, converted with
+    `element_to_dict` (or as text for leaf elements), while the parsed tree is
+    pruned behind the cursor. Memory stays flat however many elements there are.
+
+    :param content: The raw SOAP response, or a binary file to read it from.
+    :param tag: The local name of the repeated element, e.g. ``"Item"``.
+    :param on_fault: Called when a SOAP Fault is found; expected to raise it.
+    :return: A generator of the converted elements.
+    :rtype: Iterator
+    """
+    return _iter_parsed(
+        io.BytesIO(content) if isinstance(content, bytes) else content,
+        tag,
+        (lambda fault: on_fault()) if on_fault is not None else None,
+    )
+
+
+def _iter_parsed(
+        source: IO[bytes], tag: str, on_fault: Callable[[etree._Element], None] | None
+) -> Generator[Any, None, None]:
+    events = etree.iterparse(
+        source,
+        events=("end",),
+        tag=("{*}" + tag, *_FAULTS),
+        resolve_entities=False,
+        no_network=True,
+        huge_tree=True,
+    )
+    for _, element in events:
+        if element.tag in _FAULTS:
+            if on_fault is not None:
+                on_fault(element)
+            return
+        yield element_to_dict(element) if len(element) else element.text
+        element.clear(keep_tail=True)
+        parent = element.getparent()
+        while parent is not None and element.getprevious() is not None:
+            del parent[0]
+
+
+class ElementStream(Iterator[Any]):
+    """
+    `iter_elements` over a streamed HTTP response: the body is decompressed and
+    parsed as it comes off the socket, so memory is bounded by the parser state
+    rather than by the response size.
+
+    The stream is closed when the last element has been read, when reading fails,
+    or when it is closed early (``close()``, a ``with`` block, or garbage
+    collection). Closing releases the connection, discarding it if data is left
+    unread, and calls `on_done` once with the error that ended it, if any. Errors
+    while reading the body are raised as zeep's `TransportError`.
+
+    The part of the body read so far is gone once a Fault turns up, so the
+    response content is replaced with the parsed envelope before `on_fault` runs.
+    """
+
+    def __init__(
+            self,
+            response: Any,
+            tag: str,
+            on_fault: Callable[[], None] | None = None,
+            on_done: Callable[[BaseException | None], None] | None = None,
+    ):
+        """
+        :param response: A requests response fetched with ``stream=True``.
+        :param tag: The local name of the repeated element.
+        :param on_fault: Called when a SOAP Fault is found; expected to raise it.
+        :param on_done: Called once when the stream is closed.
+        """
+        self._response = response
+        self._on_fault = on_fault
+        self._on_done = on_done
+        self._closed = False
+        response.raw.decode_content = True
+        self._elements = _iter_parsed(response.raw, tag, self._fault)
+
+    def _fault(self, element: etree._Element) -> None:
+        self._response._content = etree.tostring(element.getroottree())
+        if self._on_fault is not None:
+            self._on_fault()
+
+    def __next__(self) -> Any:
+        if self._closed:
+            raise StopIteration
+        try:
+            return next(self._elements)
+        except StopIteration:
+            self.close()
+            raise
+        except (HTTPError, requests.RequestException, OSError) as error:
+            failure = TransportError(f"Could not read the response: {error}")
+            self.close(failure)
+            raise failure from error
+        except BaseException as error:
+            self.close(error)
+            raise
+
+    def close(self, error: BaseException | None = None) -> None:
+        """
+        Stops reading and releases the connection.
+
+        :param error: The error that ended the stream, passed on to `on_done`.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._elements.close()
+            # A connection with unread data must not go back to the pool.
+            self._response.raw.close()
+            self._response.close()
+        finally:
+            if self._on_done is not None:
+                self._on_done(error)
+
+    def __enter__(self) -> "Self":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        if not getattr(self, "_closed", True):
+            self.close()
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import pickle
+import sqlite3
+import time
+from typing import Any
+
+from zeep.cache import Base
+from zeep.exceptions import Fault
+
+_logger = logging.getLogger(__name__)
+
+_REDIS_ERRORS: tuple[type[Exception], ...] = ()
+try:
+    from redis.exceptions import RedisError
+
+    _REDIS_ERRORS = (RedisError,)
+except ImportError:
+    pass
+
+# What the zeep cache backends raise when their store is unavailable.
+_BACKEND_ERRORS: tuple[type[Exception], ...] = (OSError, sqlite3.Error, *_REDIS_ERRORS)
+# What unpickling a damaged or outdated entry can raise.
+_LOAD_ERRORS = (
+    pickle.UnpicklingError,
+    EOFError,
+    AttributeError,
+    ImportError,
+    LookupError,
+    TypeError,
+    ValueError,
+)
+_DUMP_ERRORS = (pickle.PicklingError, AttributeError, TypeError, RecursionError)
+
+_RESULT = "result"
+_FAULT = "fault"
+
+
+def call_digest(client: dict[str, Any], service: dict[str, Any], kwargs: dict[str, Any]) -> str:
+    """
+    Hashes the identity of a call: the client and service member dicts and the
+    operation arguments, serialized as canonical JSON.
+
+    :param client: The client member dict.
+    :param service: The service member dict.
+    :param kwargs: The SOAP operation arguments.
+    :return: A SHA-256 hex digest.
+    :rtype: String
+    """
+    canonical = json.dumps(
+        [client, service, kwargs], sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Memoizes `XClient.request()` results of idempotent X-Road queries.
+
+    Entries are keyed by the client and service identities (`Members.member_dict`)
+    plus a canonical hash of the request arguments, and hold the `serialize_object`
+    result. Any zeep cache backend can store them: `InMemoryCache`, `SqliteCache`,
+    `RedisCache` or `LRUCache`. The expiry is stored with each entry, so clients
+    sharing one cache can use different TTLs per service; the backend's own timeout
+    must not be shorter than the longest of them.
+
+    zeep's `InMemoryCache` is unbounded: it never evicts, keeps expired entries and
+    shares one dict between all its instances, so every distinct call stays in memory
+    for the life of the process. Use `LRUCache` for an in-process cache with a size
+    limit.
+
+    Values are pickled, so the backend must only be writable by trusted processes.
+
+    :ivar backend: The zeep cache backend storing the entries.
+    :type backend: zeep.cache.Base
+    :ivar ttl: The default time-to-live of results in seconds.
+    :type ttl: Int
+    :ivar fault_ttl: The time-to-live of cached `Fault`s in seconds; 0 disables
+        negative caching.
+    :type fault_ttl: Int
+    :ivar hits: The number of lookups answered from the cache.
+    :type hits: Int
+    :ivar misses: The number of lookups that went to the service.
+    :type misses: Int
+    """
+
+    def __init__(self, backend: Base, ttl: int = 300, fault_ttl: int = 0, prefix: str = "xroad:response:"):
+        """
+        :param backend: The zeep cache backend storing the entries.
+        :param ttl: The default time-to-live of results in seconds.
+        :param fault_ttl: The time-to-live of cached `Fault`s in seconds. Keep it short;
+            defaults to 0, which does not cache faults.
+        :param prefix: The prefix of the keys passed to the backend.
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.fault_ttl = fault_ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, client: dict[str, Any], service: dict[str, Any], kwargs: dict[str, Any]) -> str:
+        """
+        Builds the cache key of a call.
+
+        :param client: The client member dict.
+        :param service: The service member dict.
+        :param kwargs: The SOAP operation arguments, without the per-call `xroad_*` keys.
+        :return: The backend key.
+        :rtype: String
+        """
+        return self.prefix + call_digest(client, service, kwargs)
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """
+        Looks up a call.
+
+        :param key: The key built by `key()`.
+        :return: A (found, result) pair.
+        :rtype: Tuple
+        :raises Fault: If the call's `Fault` is cached.
+        """
+        try:
+            payload = self.backend.get(key)
+        except _BACKEND_ERRORS as e:
+            _logger.warning("Could not look up cached response %s, calling the service: %s", key, e)
+            payload = None
+        if payload:
+            try:
+                expires, kind, value = pickle.loads(payload)
+            except _LOAD_ERRORS as e:
+                _logger.warning("Could not load cached response %s, calling the service: %s", key, e)
+            else:
+                if expires > time.time():
+                    self.hits += 1
+                    if kind == _FAULT:
+                        message, code, actor = value
+                        raise Fault(message, code=code, actor=actor)
+                    return True, value
+        self.misses += 1
+        return False, None
+
+    def add(self, key: str, result: Any, ttl: int | None = None) -> None:
+        """
+        Stores the result of a call.
+
+        :param key: The key built by `key()`.
+        :param result: The serialized response.
+        :param ttl: The time-to-live in seconds; defaults to `ttl`.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl > 0:
+            self._store(key, _RESULT, result, ttl)
+
+    def add_fault(self, key: str, fault: Fault) -> None:
+        """
+        Stores the `Fault` of a call for `fault_ttl` seconds, if negative caching is on.
+        Only the message, code and actor are kept.
+
+        :param key: The key built by `key()`.
+        :param fault: The fault returned by the service.
+        """
+        if self.fault_ttl > 0:
+            self._store(key, _FAULT, (str(fault.message), fault.code, fault.actor), self.fault_ttl)
+
+    def _store(self, key: str, kind: str, value: Any, ttl: int) -> None:
+        try:
+            payload = pickle.dumps((time.time() + ttl, kind, value), protocol=pickle.HIGHEST_PROTOCOL)
+        except _DUMP_ERRORS as e:
+            _logger.warning("Could not cache the %s response %s: %s", type(value).__name__, key, e)
+            return
+        try:
+            self.backend.add(key, payload)
+        except _BACKEND_ERRORS as e:
+            _logger.warning("Could not cache response %s: %s", key, e)
@@ -1,9 +1,168 @@
+import gzip
 import logging
+import random
+import threading
+import time
+import weakref
+import zlib
+from collections.abc import Iterable
 
+import requests
 from lxml import etree
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+from zeep.exceptions import TransportError
 from zeep.transports import Transport
+from zeep.wsdl.utils import etree_to_string
+
+from . import fork
 
 _logger = logging.getLogger("DRACTransport")
+_pool_logger = logging.getLogger("PooledTransport")
+
+
+def _has_other_line_breaks(message: bytes) -> bool:
+    """
+    Checks for characters `str.splitlines()` treats as line breaks besides "\n".
+    lxml escapes "\r" in text, so these only show up in unusual payloads. Single
+    bytes are found with a fast scan; the multi-byte sequences are only searched
+    when their UTF-8 lead byte is present at all.
+    """
+    if any(byte in message for byte in (b"\r", b"\x0b", b"\x0c", b"\x1c", b"\x1d", b"\x1e")):
+        return True
+    if b"\xc2" in message and b"\xc2\x85" in message:
+        return True
+    return b"\xe2" in message and (b"\xe2\x80\xa8" in message or b"\xe2\x80\xa9" in message)
+
+
+def _legacy_drac_message(message: str) -> str:
+    """
+    The original line-by-line DRAC formatting, kept as the reference implementation
+    and as the fallback for payloads with line breaks other than "\\n".
+    """
+    drac_message = ""
+    for line in message.splitlines():
+        drac_message += line
+        if "iden:" not in line:
+            drac_message += "\n"
+    return drac_message
+
+
+def drac_message(envelope: etree._Element) -> bytes:
+    """
+    Serializes an envelope in the layout DRAC expects: pretty-printed UTF-8 where
+    every line containing an `iden:` element is joined with the next one.
+
+    The joining is a single pass over the serialized bytes that only cuts out the
+    newlines after `iden:` lines, without decoding to `str`. The output is
+    byte-identical to `_legacy_drac_message`.
+
+    :param envelope: The SOAP envelope.
+    :type envelope: lxml.etree._Element
+    :return: The message body.
+    :rtype: Bytes
+    """
+    message = etree.tostring(envelope, pretty_print=True, xml_declaration=True, encoding="utf-8")
+    if _has_other_line_breaks(message):
+        return _legacy_drac_message(message.decode("utf-8")).encode("utf-8")
+    return _join_iden_lines(message)
+
+
+def _join_iden_lines(message: bytes) -> bytes:
+    """
+    Bytes counterpart of `_legacy_drac_message` for "\n"-only line breaks.
+    """
+    parts = []
+    start = 0
+    found = message.find(b"iden:")
+    while found != -1:
+        end = message.find(b"\n", found)
+        if end == -1:
+            break
+        parts.append(message[start:end])
+        start = end + 1
+        found = message.find(b"iden:", start)
+    tail = message[start:]
+    parts.append(tail)
+    if found == -1 and tail and not tail.endswith(b"\n"):
+        parts.append(b"\n")
+    return b"".join(parts)
+
+
+class RequestCompression:
+    """
+    Compresses large request bodies with gzip or deflate (``Content-Encoding``).
+
+    HTTP/1.1 cannot tell in advance whether a server accepts compressed requests, so
+    this is opt-in and negotiated by trial: when an address answers a compressed
+    request with 415 Unsupported Media Type, the plain body is sent again and every
+    later request to that address is sent plain. Bodies smaller than `min_size`, and
+    bodies that do not get smaller, are always sent plain.
+
+    Responses need no setup: requests (and httpx) advertise ``Accept-Encoding: gzip,
+    deflate`` and decompress transparently.
+
+    :ivar encoding: "gzip" or "deflate".
+    :type encoding: String
+    :ivar min_size: The smallest body in bytes that is compressed.
+    :type min_size: Int
+    """
+
+    def __init__(self, encoding: str = "gzip", min_size: int = 1024, level: int = 6):
+        """
+        :param encoding: "gzip" or "deflate".
+        :param min_size: The smallest body in bytes that is compressed.
+        :param level: The compression level, 1 (fastest) to 9 (smallest).
+
+        :raises ValueError: If `encoding` is unknown.
+        """
+        if encoding not in ("gzip", "deflate"):
+            raise ValueError(f"Unknown request encoding: {encoding}")
+        self.encoding = encoding
+        self.min_size = min_size
+        self.level = level
+        self._lock = threading.Lock()
+        self._plain: set[str] = set()
+        fork.register(self)
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+    def encode(self, address: str, message: bytes, headers: dict[str, str]) -> tuple[bytes, dict[str, str]]:
+        """
+        Compresses a request body if it is worth it.
+
+        :param address: The address the body is posted to.
+        :param message: The request body.
+        :param headers: The HTTP headers; not changed.
+        :return: The body to send and its headers.
+        """
+        if not isinstance(message, bytes) or len(message) < self.min_size or address in self._plain:
+            return message, headers
+        if self.encoding == "gzip":
+            body = gzip.compress(message, self.level, mtime=0)
+        else:
+            body = zlib.compress(message, self.level)
+        if len(body) >= len(message):
+            return message, headers
+        return body, {**headers, "Content-Encoding": self.encoding}
+
+    def rejected(self, address: str, response) -> bool:
+        """
+        Tells whether `address` refused a compressed body, and if so stops
+        compressing for it.
+
+        :param address: The address the compressed body was posted to.
+        :param response: Its HTTP response.
+        :rtype: Bool
+        """
+        if response.status_code != 415:
+            return False
+        with self._lock:
+            self._plain.add(address)
+        _pool_logger.info("%s does not accept %s requests, sending them plain", address, self.encoding)
+        return True
 
 
 class DRACTransport(Transport):
@@ -15,17 +174,369 @@ class DRACTransport(Transport):
     communication mechanisms.
     """
 
+    def __init__(self, *args, compression: RequestCompression | None = None, **kwargs):
+        """
+        :param compression: Compresses large request bodies; None sends them plain.
+        """
+        super().__init__(*args, **kwargs)
+        self.compression = compression
+
     def post_xml(self, address, envelope, headers):
-        message = etree.tostring(
-            envelope, pretty_print=True, xml_declaration=True, encoding="utf-8"
-        ).decode("utf-8")
-
-        _logger.debug(f"Source: \n {message}")
-        drac_message = ""
-        for line in message.splitlines():
-            drac_message += line
-            if "iden:" not in line:
-                drac_message += "\n"
-        _logger.debug(f"Modified: \n {drac_message}")
-
-        return self.post(address, drac_message.encode("utf-8"), headers)
+        message = drac_message(envelope)
+
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug("Modified: \n %s", message.decode("utf-8"))
+
+        return self.post(address, message, headers)
+
+    def post(self, address, message, headers):
+        if self.compression is None:
+            return super().post(address, message, headers)
+        body, body_headers = self.compression.encode(address, message, headers)
+        response = super().post(address, body, body_headers)
+        if body is not message and self.compression.rejected(address, response):
+            response = super().post(address, message, headers)
+        return response
+
+
+class CircuitOpenError(TransportError):
+    """
+    Raised instead of sending a request while the circuit of its service is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures per service and fails fast while a producer is down.
+
+    After `failure_threshold` consecutive failures the circuit of a service opens and
+    requests are rejected without touching the network. Once `recovery_timeout`
+    seconds have passed, a single trial request is let through (half-open): success
+    closes the circuit, failure opens it for another `recovery_timeout`.
+
+    :ivar failure_threshold: Consecutive failures that open a circuit.
+    :type failure_threshold: Int
+    :ivar recovery_timeout: Seconds an open circuit waits before a trial request.
+    :type recovery_timeout: Float
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        """
+        :param failure_threshold: Consecutive failures that open a circuit.
+        :param recovery_timeout: Seconds an open circuit waits before a trial request.
+
+        :raises ValueError: If `failure_threshold` is less than 1.
+        """
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        # service -> [consecutive failures, opened at (monotonic) or None, trial running]
+        self._circuits: dict[str, list] = {}
+        fork.register(self)
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+    def allow(self, service: str) -> bool:
+        """
+        Tells whether a request to `service` may be sent now.
+
+        :param service: The service key, e.g. the member path of the X-Road service.
+        :return: False while the circuit is open.
+        :rtype: Bool
+        """
+        with self._lock:
+            circuit = self._circuits.get(service)
+            if circuit is None or circuit[1] is None:
+                return True
+            if circuit[2] or time.monotonic() - circuit[1] < self.recovery_timeout:
+                return False
+            circuit[2] = True
+            return True
+
+    def success(self, service: str) -> None:
+        """
+        Records a successful request and closes the circuit.
+        """
+        with self._lock:
+            self._circuits.pop(service, None)
+
+    def failure(self, service: str) -> None:
+        """
+        Records a failed request, opening the circuit at the threshold or when the
+        trial request of a half-open circuit failed.
+        """
+        with self._lock:
+            circuit = self._circuits.setdefault(service, [0, None, False])
+            circuit[0] += 1
+            if circuit[2] or circuit[0] >= self.failure_threshold:
+                if circuit[1] is None:
+                    _pool_logger.warning("Circuit opened for %s", service)
+                circuit[1] = time.monotonic()
+                circuit[2] = False
+
+    def state(self, service: str) -> str:
+        """
+        :return: "closed", "open" or "half-open".
+        :rtype: String
+        """
+        with self._lock:
+            circuit = self._circuits.get(service)
+            if circuit is None or circuit[1] is None:
+                return "closed"
+            if circuit[2] or time.monotonic() - circuit[1] >= self.recovery_timeout:
+                return "half-open"
+            return "open"
+
+
+_SERVICE_FIELDS = (
+    "xRoadInstance", "memberClass", "memberCode", "subsystemCode", "serviceCode", "serviceVersion"
+)
+
+
+def _service_name(envelope: etree._Element) -> str | None:
+    """
+    Returns the member path of the X-Road service an envelope calls, from its
+    ``service`` header, e.g. ``"INSTANCE/GOV/00000000/SUB/Service/v1"``.
+    """
+    service = envelope.find("{*}Header/{*}service")
+    if service is None:
+        return None
+    values = {etree.QName(child).localname: child.text for child in service if isinstance(child.tag, str)}
+    return "/".join(values[field] for field in _SERVICE_FIELDS if values.get(field)) or None
+
+
+def _operation_name(envelope: etree._Element) -> str | None:
+    body = envelope.find("{*}Body")
+    if body is None:
+        return None
+    for child in body:
+        if isinstance(child.tag, str):
+            return str(etree.QName(child).localname)
+    return None
+
+
+class _NoDelayAdapter(HTTPAdapter):
+    """
+    An `HTTPAdapter` that keeps TCP_NODELAY on connections to HTTP proxies.
+
+    urllib3 turns Nagle's algorithm back on for proxy connections, and it sends the
+    request headers and body in separate writes. Behind a proxy, i.e. the security
+    server, the body then waits for the ACK of the headers, which costs a
+    delayed-ACK timeout (about 40 ms on Linux) per call.
+    """
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        proxy_kwargs.setdefault("socket_options", HTTPConnection.default_socket_options)
+        return super().proxy_manager_for(proxy, **proxy_kwargs)
+
+
+class PooledTransport(Transport):
+    """
+    A zeep `Transport` tuned for many concurrent X-Road calls.
+
+    Connections are kept alive in a pool of `pool_maxsize` connections per host, so
+    threads sharing a client reuse connections to the security server instead of
+    opening new ones. WSDL and XSD downloads (GET) are retried by urllib3.
+
+    Operation calls (POST) are only retried for the operations listed in
+    `safe_operations` (``"*"`` for all), on connection errors, timeouts and the
+    `retry_status` codes, with full-jitter exponential backoff. SOAP Faults arrive
+    as HTTP 500, so 500 is not retried by default.
+
+    Each X-Road service (the ``service`` header of the envelope, or the address
+    when there is none) has its own circuit in `breaker`: a service that keeps
+    failing is rejected with `CircuitOpenError` right away instead of tying up
+    threads until their timeouts. All calls go through the same security server,
+    so a failing producer must not open the circuit of the others.
+
+    To post a different serialization (as `DRACTransport` does), override
+    `serialize()`.
+    """
+
+    def __init__(
+            self,
+            cache=None,
+            timeout: int = 300,
+            operation_timeout: float | None = None,
+            session: requests.Session | None = None,
+            pool_connections: int = 10,
+            pool_maxsize: int = 32,
+            pool_block: bool = False,
+            keep_alive: bool = True,
+            retries: int = 2,
+            backoff: float = 0.2,
+            backoff_max: float = 5.0,
+            retry_status: Iterable[int] = (502, 503, 504),
+            safe_operations: Iterable[str] = (),
+            breaker: CircuitBreaker | None = None,
+            compression: RequestCompression | None = None,
+            decompress: bool = True,
+    ):
+        """
+        :param cache: The zeep cache used for WSDL and XSD documents.
+        :param timeout: The timeout for loading WSDL and XSD documents.
+        :param operation_timeout: The timeout for operation calls; None waits forever.
+        :param session: A `requests.Session` to configure instead of a new one.
+        :param pool_connections: The number of hosts to keep connection pools for.
+        :param pool_maxsize: The maximum number of kept-alive connections per host.
+        :param pool_block: Wait for a free connection instead of opening a new one
+            beyond `pool_maxsize`.
+        :param keep_alive: Reuse connections; False sends ``Connection: close``.
+        :param retries: Retries after the first attempt.
+        :param backoff: The base of the exponential backoff, in seconds.
+        :param backoff_max: The maximum backoff, in seconds.
+        :param retry_status: HTTP status codes that are retried and count as failures.
+        :param safe_operations: Names of the operations that may be retried, or ``"*"``.
+        :param breaker: The circuit breaker; defaults to a `CircuitBreaker()`. Pass
+            `CircuitBreaker(failure_threshold=...)` to tune it.
+        :param compression: Compresses large request bodies; None sends them plain.
+        :param decompress: Ask for compressed responses (``Accept-Encoding: gzip,
+            deflate``); False asks for plain ones, saving CPU on fast links.
+        """
+        super().__init__(
+            cache=cache, timeout=timeout, operation_timeout=operation_timeout, session=session
+        )
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.retry_status = frozenset(retry_status)
+        self.safe_operations = frozenset(safe_operations)
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.compression = compression
+        # streamed response -> circuit, until its body has been read
+        self._streams: weakref.WeakKeyDictionary[requests.Response, str] = weakref.WeakKeyDictionary()
+
+        adapter = _NoDelayAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=Retry(
+                total=retries,
+                allowed_methods=frozenset({"GET"}),
+                status_forcelist=self.retry_status,
+                backoff_factor=backoff,
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+        self.session.headers["Accept-Encoding"] = "gzip, deflate" if decompress else "identity"
+
+    def serialize(self, envelope: etree._Element) -> bytes:
+        """
+        Serializes the envelope for posting; zeep's format by default.
+        """
+        return etree_to_string(envelope)  # type: ignore[no-any-return]
+
+    def post_xml(self, address, envelope, headers, stream: bool = False):
+        return self.post(
+            address,
+            self.serialize(envelope),
+            headers,
+            operation=_operation_name(envelope),
+            stream=stream,
+            service=_service_name(envelope),
+        )
+
+    def finish_stream(self, response: requests.Response, error: BaseException | None = None) -> None:
+        """
+        Records the outcome of a streamed 200 response in the circuit breaker, once
+        its body has been read, abandoned (no `error`) or failed.
+
+        :param response: A response returned by ``post(..., stream=True)``.
+        :param error: The error that ended reading the body, if any.
+        """
+        circuit = self._streams.pop(response, None)
+        if circuit is None:
+            return
+        if error is None:
+            self.breaker.success(circuit)
+        else:
+            self.breaker.failure(circuit)
+
+    def _retry_safe(self, operation: str | None) -> bool:
+        return "*" in self.safe_operations or operation in self.safe_operations
+
+    def _sleep(self, attempt: int) -> None:
+        time.sleep(random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt)))
+
+    def _send(self, address, message, headers, stream: bool):
+        if not stream:
+            return super().post(address, message, headers)
+        _pool_logger.debug("HTTP Post to %s (streamed response)", address)
+        return self.session.post(
+            address, data=message, headers=headers, timeout=self.operation_timeout, stream=True
+        )
+
+    def post(
+            self,
+            address,
+            message,
+            headers,
+            operation: str | None = None,
+            stream: bool = False,
+            service: str | None = None,
+    ):
+        """
+        Posts a message, retrying safe operations and honouring the circuit breaker.
+
+        :param address: The producer address.
+        :param message: The message body.
+        :param headers: The HTTP headers.
+        :param operation: The operation name, used to decide whether to retry.
+        :param stream: Return as soon as the headers arrive and leave the body to be
+            read from `response.raw`; the caller must close the response and, for a
+            200 response, report how reading it went with `finish_stream()`.
+        :param service: The circuit of the call; defaults to `address`.
+        :return: The HTTP response.
+        :raises CircuitOpenError: If the circuit is open.
+        """
+        circuit = service or address
+        if not self.breaker.allow(circuit):
+            raise CircuitOpenError(f"Circuit open for {circuit}")
+        body, body_headers = message, headers
+        if self.compression is not None:
+            body, body_headers = self.compression.encode(address, message, headers)
+        attempts = 1 + (self.retries if self._retry_safe(operation) else 0)
+        attempt = 0
+        while True:
+            try:
+                response = self._send(address, body, body_headers, stream)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if attempt + 1 >= attempts:
+                    self.breaker.failure(circuit)
+                    raise
+                _pool_logger.warning("Retrying %s (%s) after: %s", operation, address, error)
+            except BaseException:
+                self.breaker.failure(circuit)
+                raise
+            else:
+                if body is not message and self.compression is not None and self.compression.rejected(
+                        address, response
+                ):
+                    if stream:
+                        response.close()
+                    body, body_headers = message, headers
+                    continue
+                failed = response.status_code in self.retry_status
+                if not failed or attempt + 1 >= attempts:
+                    if failed:
+                        self.breaker.failure(circuit)
+                    elif stream and response.status_code == 200:
+                        # Decided by `finish_stream()` once the body has been read.
+                        self._streams[response] = circuit
+                    else:
+                        self.breaker.success(circuit)
+                    return response
+                if stream:
+                    response.close()
+                _pool_logger.warning(
+                    "Retrying %s (%s) after HTTP %d", operation, address, response.status_code
+                )
+            self._sleep(attempt)
+            attempt += 1
@@ -0,0 +1,260 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import pickle
+import sys
+import tempfile
+from importlib import metadata
+from typing import Any
+
+from lxml import etree
+from zeep.exceptions import Error
+from zeep.settings import Settings
+from zeep.transports import Transport
+from zeep.utils import get_version
+from zeep.wsdl import Document
+
+_logger = logging.getLogger(__name__)
+
+_MAGIC = b"PYXROAD-WSDL\n"
+_DYNAMIC_MODULES = ("zeep.objects", "zeep.xsd.dynamic_types")
+# What unpickling a damaged or outdated file can raise.
+_LOAD_ERRORS = (
+    OSError,
+    EOFError,
+    pickle.UnpicklingError,
+    AttributeError,
+    ImportError,
+    LookupError,
+    TypeError,
+    ValueError,
+    etree.LxmlError,
+)
+_DUMP_ERRORS = (pickle.PicklingError, AttributeError, TypeError, RecursionError)
+
+
+def _library_version() -> str:
+    try:
+        return metadata.version("pyxroad")
+    except metadata.PackageNotFoundError:
+        return "0"
+
+
+def _settings(options: dict[str, Any]) -> Settings:
+    return Settings(**options)
+
+
+def _imports(document: Document) -> list[str]:
+    """
+    Returns the locations of the WSDLs and XSDs that `document` imported or
+    included, besides its own.
+    """
+    locations = {location for _, location in document._definitions}
+    locations.update(schema._location for schema in document.types.documents)
+    locations.discard(document.location)
+    locations.discard(None)
+    return sorted(locations)
+
+
+class _DocumentPickler(pickle.Pickler):
+    """
+    Pickles a parsed zeep `Document`.
+
+    zeep builds a class per XSD type at parse time; those classes are recreated
+    from their name, bases and attributes. The transport is stored as a reference
+    and replaced with the loading client's transport.
+    """
+
+    def persistent_id(self, obj: Any) -> str | None:
+        if isinstance(obj, Transport):
+            return "transport"
+        return None
+
+    def reducer_override(self, obj: Any) -> Any:
+        if isinstance(obj, type) and obj.__module__ in _DYNAMIC_MODULES:
+            attributes = {
+                key: value
+                for key, value in vars(obj).items()
+                if key not in ("__dict__", "__weakref__")
+            }
+            return type, (obj.__name__, obj.__bases__, attributes)
+        if isinstance(obj, Settings):
+            options = {
+                field.name: getattr(obj, field.name)
+                for field in Settings.__attrs_attrs__  # type: ignore[attr-defined]
+                if field.name != "_tls"
+            }
+            return _settings, (options,)
+        if isinstance(obj, etree.QName):
+            return etree.QName, (obj.text,)
+        if isinstance(obj, etree._Element):
+            return etree.fromstring, (etree.tostring(obj),)
+        return NotImplemented
+
+
+class _DocumentUnpickler(pickle.Unpickler):
+    def __init__(self, file: Any, transport: Any):
+        super().__init__(file)
+        self.transport = transport
+
+    def persistent_load(self, pid: Any) -> Any:
+        if pid != "transport":
+            raise pickle.UnpicklingError(f"unknown persistent id {pid!r}")
+        return self.transport
+
+
+class CompiledWSDLCache:
+    """
+    An on-disk cache of fully parsed WSDL documents.
+
+    The transport caches only keep raw WSDL bytes, so every new worker process still
+    parses each WSDL and its XSDs. This cache stores the parsed zeep `Document`
+    (operations, types, bindings) in a versioned file keyed by the SHA-256 of the
+    WSDL content and the pyxroad, zeep and Python versions. The file also lists the
+    SHA-256 of every imported or included WSDL and XSD; they are fetched through the
+    transport (and its cache) on load, and a changed one makes the entry stale. A
+    fresh process loads it instead of parsing. Files in an unknown format, stale or
+    damaged ones are ignored and overwritten with a freshly parsed document.
+
+    The files are pickles, so the directory must only be writable by trusted users.
+
+    :ivar path: The directory holding the cache files.
+    :type path: String
+    """
+
+    format_version = 2
+
+    def __init__(self, path: str | os.PathLike | None = None):
+        """
+        :param path: The cache directory. Defaults to ``$XDG_CACHE_HOME/pyxroad/wsdl``
+            (``~/.cache/pyxroad/wsdl``). It is created when missing.
+        """
+        if path is None:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+                os.path.expanduser("~"), ".cache"
+            )
+            path = os.path.join(base, "pyxroad", "wsdl")
+        self.path = os.fspath(path)
+        os.makedirs(self.path, exist_ok=True)
+        self._meta = {
+            "format": self.format_version,
+            "pyxroad": _library_version(),
+            "zeep": get_version(),
+            "python": f"{sys.version_info.major}.{sys.version_info.minor}",
+        }
+        self._header = _MAGIC + json.dumps(self._meta, sort_keys=True).encode("utf-8") + b"\n"
+
+    def key(self, content: bytes) -> str:
+        """
+        Returns the cache key for the given WSDL content.
+
+        :param content: The raw WSDL bytes.
+        :return: A hex digest of the content and library versions.
+        :rtype: String
+        """
+        return hashlib.sha256(self._header + content).hexdigest()
+
+    def _file(self, content: bytes) -> str:
+        return os.path.join(self.path, f"{self.key(content)}.wsdl.pickle")
+
+    def load(self, content: bytes, transport: Any) -> Document | None:
+        """
+        Loads the parsed document stored for `content`.
+
+        :param content: The raw WSDL bytes.
+        :param transport: The transport the loaded document should use.
+        :return: The parsed document, or None when there is no usable entry.
+        """
+        filename = self._file(content)
+        try:
+            with open(filename, "rb") as fh:
+                if fh.readline() != _MAGIC or fh.readline() != self._header[len(_MAGIC):]:
+                    _logger.info("Ignoring compiled WSDL in another format: %s", filename)
+                    return None
+                imports = json.loads(fh.readline())
+                if not self._current(imports, transport):
+                    _logger.info("Ignoring compiled WSDL with changed imports: %s", filename)
+                    return None
+                document = _DocumentUnpickler(fh, transport).load()
+        except FileNotFoundError:
+            return None
+        except _LOAD_ERRORS as error:
+            _logger.warning("Could not load compiled WSDL %s: %s", filename, error)
+            return None
+        if not isinstance(document, Document):
+            return None
+        _logger.debug("Compiled WSDL HIT for %s", document.location)
+        return document
+
+    def store(self, content: bytes, document: Document) -> None:
+        """
+        Writes the parsed document for `content`. The file is replaced atomically, so
+        concurrent readers never see a partial entry. Write errors are logged only.
+
+        :param content: The raw WSDL bytes the document was parsed from.
+        :param document: The parsed zeep `Document`.
+        """
+        buffer = io.BytesIO()
+        buffer.write(self._header)
+        try:
+            transport: Any = document.transport
+            imports = {
+                location: hashlib.sha256(transport.load(location)).hexdigest()
+                for location in _imports(document)
+            }
+            buffer.write(json.dumps(imports, sort_keys=True).encode("utf-8") + b"\n")
+            _DocumentPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(document)
+        except (OSError, Error, *_DUMP_ERRORS) as error:
+            _logger.warning("Could not compile WSDL %s: %s", document.location, error)
+            return
+        filename = self._file(content)
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(buffer.getvalue())
+            os.replace(tmp, filename)
+        except OSError as error:
+            _logger.warning("Could not write compiled WSDL %s: %s", filename, error)
+
+    @staticmethod
+    def _current(imports: dict[str, str], transport: Any) -> bool:
+        """
+        Checks that the imported documents still have the recorded digests.
+        """
+        try:
+            return all(
+                hashlib.sha256(transport.load(location)).hexdigest() == digest
+                for location, digest in imports.items()
+            )
+        except (OSError, Error) as error:
+            _logger.info("Could not check the imports of a compiled WSDL: %s", error)
+            return False
+
+    def document(self, url: str, transport: Any, settings: Settings | None = None) -> Document:
+        """
+        Returns the parsed document of `url`, from disk when possible.
+
+        The raw WSDL is fetched through `transport` (and therefore its cache) to
+        compute the key; only the parsing is skipped on a hit.
+
+        :param url: The WSDL URL.
+        :param transport: The transport used to fetch the WSDL and its imports.
+        :param settings: zeep settings used when the WSDL has to be parsed.
+        :return: The parsed zeep `Document`.
+        """
+        content = transport.load(url)
+        document = self.load(content, transport)
+        if document is None:
+            document = Document(io.BytesIO(content), transport, base=url, settings=settings)
+            self.store(content, document)
+        return document
+
+    def clear(self) -> None:
+        """
+        Removes every cache file in the directory.
+        """
+        for name in os.listdir(self.path):
+            if name.endswith(".wsdl.pickle"):
+                os.remove(os.path.join(self.path, name))
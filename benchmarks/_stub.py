@@ -0,0 +1,463 @@
+"""
+Offline fixtures shared by the tests and the benchmarks: a minimal X-Road WSDL,
+transports that answer WSDL loads and SOAP posts without any network I/O, a local
+HTTP stub of a security server, and a DRAC-style request envelope.
+"""
+import gzip
+import re
+import threading
+import time
+import zlib
+from collections.abc import Sequence
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+import requests
+from lxml import etree
+from zeep.transports import Transport
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+SSU = "http://security-server"
+CLIENT = "TEST/GOV/00000001/CLIENT"
+SERVICE = "TEST/GOV/00000002/PRODUCER/CheckPassportStatus/v1"
+
+WSDL = b"""<?xml version="1.0" encoding="utf-8"?>
+<wsdl:definitions
+    xmlns:wsdl="http://schemas.xmlsoap.org/wsdl/"
+    xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:xsd="http://www.w3.org/2001/XMLSchema"
+    xmlns:xrd="http://x-road.eu/xsd/xroad.xsd"
+    xmlns:tns="http://example.org/passport"
+    targetNamespace="http://example.org/passport">
+  <wsdl:types>
+    <xsd:schema targetNamespace="http://x-road.eu/xsd/xroad.xsd" elementFormDefault="qualified">
+      <xsd:complexType name="XRoadIdentifierType">
+        <xsd:sequence>
+          <xsd:element name="xRoadInstance" type="xsd:string" minOccurs="0"/>
+          <xsd:element name="memberClass" type="xsd:string" minOccurs="0"/>
+          <xsd:element name="memberCode" type="xsd:string" minOccurs="0"/>
+          <xsd:element name="subsystemCode" type="xsd:string" minOccurs="0"/>
+          <xsd:element name="serviceCode" type="xsd:string" minOccurs="0"/>
+          <xsd:element name="serviceVersion" type="xsd:string" minOccurs="0"/>
+        </xsd:sequence>
+        <xsd:attribute name="objectType" type="xsd:string"/>
+      </xsd:complexType>
+      <xsd:element name="client" type="xrd:XRoadIdentifierType"/>
+      <xsd:element name="service" type="xrd:XRoadIdentifierType"/>
+      <xsd:element name="id" type="xsd:string"/>
+      <xsd:element name="userId" type="xsd:string"/>
+      <xsd:element name="issue" type="xsd:string"/>
+      <xsd:element name="protocolVersion" type="xsd:string"/>
+    </xsd:schema>
+    <xsd:schema targetNamespace="http://example.org/passport" elementFormDefault="qualified">
+      <xsd:element name="CheckPassportStatus">
+        <xsd:complexType>
+          <xsd:sequence>
+            <xsd:element name="PasNumber" type="xsd:string"/>
+            <xsd:element name="PasSerial" type="xsd:string" minOccurs="0"/>
+          </xsd:sequence>
+        </xsd:complexType>
+      </xsd:element>
+      <xsd:element name="CheckPassportStatusResponse">
+        <xsd:complexType>
+          <xsd:sequence>
+            <xsd:element name="Status" type="xsd:string"/>
+            <xsd:element name="PasNumber" type="xsd:string"/>
+            <xsd:element name="RequestId" type="xsd:string" minOccurs="0"/>
+            <xsd:element name="UserId" type="xsd:string" minOccurs="0"/>
+            <xsd:element name="Item" type="xsd:string" minOccurs="0" maxOccurs="unbounded"/>
+          </xsd:sequence>
+        </xsd:complexType>
+      </xsd:element>
+    </xsd:schema>
+  </wsdl:types>
+  <wsdl:message name="requestheader">
+    <wsdl:part name="client" element="xrd:client"/>
+    <wsdl:part name="service" element="xrd:service"/>
+    <wsdl:part name="id" element="xrd:id"/>
+    <wsdl:part name="userId" element="xrd:userId"/>
+    <wsdl:part name="issue" element="xrd:issue"/>
+    <wsdl:part name="protocolVersion" element="xrd:protocolVersion"/>
+  </wsdl:message>
+  <wsdl:message name="CheckPassportStatus">
+    <wsdl:part name="body" element="tns:CheckPassportStatus"/>
+  </wsdl:message>
+  <wsdl:message name="CheckPassportStatusResponse">
+    <wsdl:part name="body" element="tns:CheckPassportStatusResponse"/>
+  </wsdl:message>
+  <wsdl:portType name="PassportPortType">
+    <wsdl:operation name="CheckPassportStatus">
+      <wsdl:input message="tns:CheckPassportStatus"/>
+      <wsdl:output message="tns:CheckPassportStatusResponse"/>
+    </wsdl:operation>
+  </wsdl:portType>
+  <wsdl:binding name="PassportBinding" type="tns:PassportPortType">
+    <soap:binding style="document" transport="http://schemas.xmlsoap.org/soap/http"/>
+    <wsdl:operation name="CheckPassportStatus">
+      <soap:operation soapAction=""/>
+      <wsdl:input>
+        <soap:body use="literal"/>
+        <soap:header message="tns:requestheader" part="client" use="literal"/>
+        <soap:header message="tns:requestheader" part="service" use="literal"/>
+        <soap:header message="tns:requestheader" part="id" use="literal"/>
+        <soap:header message="tns:requestheader" part="userId" use="literal"/>
+        <soap:header message="tns:requestheader" part="issue" use="literal"/>
+        <soap:header message="tns:requestheader" part="protocolVersion" use="literal"/>
+      </wsdl:input>
+      <wsdl:output>
+        <soap:body use="literal"/>
+      </wsdl:output>
+    </wsdl:operation>
+  </wsdl:binding>
+  <wsdl:service name="PassportService">
+    <wsdl:port name="PassportPort" binding="tns:PassportBinding">
+      <soap:address location="http://producer.example.org/passport"/>
+    </wsdl:port>
+  </wsdl:service>
+</wsdl:definitions>
+"""
+
+RESPONSE = """<?xml version="1.0" encoding="utf-8"?>
+<SOAP-ENV:Envelope xmlns:SOAP-ENV="http://schemas.xmlsoap.org/soap/envelope/">
+  <SOAP-ENV:Body>
+    <ns1:CheckPassportStatusResponse xmlns:ns1="http://example.org/passport">
+      <ns1:Status>{status}</ns1:Status>
+      <ns1:PasNumber>{pas_number}</ns1:PasNumber>
+      <ns1:RequestId>{request_id}</ns1:RequestId>
+      <ns1:UserId>{user_id}</ns1:UserId>{items}
+    </ns1:CheckPassportStatusResponse>
+  </SOAP-ENV:Body>
+</SOAP-ENV:Envelope>
+"""
+
+FAULT = """<?xml version="1.0" encoding="utf-8"?>
+<SOAP-ENV:Envelope xmlns:SOAP-ENV="http://schemas.xmlsoap.org/soap/envelope/">
+  <SOAP-ENV:Body>
+    <SOAP-ENV:Fault>
+      <faultcode>Server.ServerProxy.ServiceFailed</faultcode>
+      <faultstring>Passport {pas_number} not found</faultstring>
+    </SOAP-ENV:Fault>
+  </SOAP-ENV:Body>
+</SOAP-ENV:Envelope>
+"""
+
+FAULT_PREFIX = "FAULT"
+
+
+def _text(message: str, tag: str) -> str:
+    found = re.search(rf"<(?:\w+:)?{tag}(?:\s[^>]*)?>([^<]*)</(?:\w+:)?{tag}>", message)
+    return found.group(1) if found else ""
+
+
+def respond(message: bytes | str, items: int = 0) -> tuple[int, bytes]:
+    """
+    Builds the stub producer answer for a SOAP request envelope.
+
+    The answer echoes `PasNumber`, `id` and `userId` back, so callers can check
+    which headers went into which envelope. A `PasNumber` starting with
+    `FAULT` yields a SOAP Fault.
+    """
+    if isinstance(message, bytes):
+        message = message.decode("utf-8")
+    if "listMethods" in message or "allowedMethods" in message:
+        return respond_meta(message)
+    pas_number = _text(message, "PasNumber")
+    if pas_number.startswith(FAULT_PREFIX):
+        return 500, FAULT.format(pas_number=pas_number).encode("utf-8")
+    body = RESPONSE.format(
+        status="VALID",
+        pas_number=pas_number,
+        request_id=_text(message, "id"),
+        user_id=_text(message, "userId"),
+        items="".join(f"\n      <ns1:Item>item-{i}</ns1:Item>" for i in range(items)),
+    )
+    return 200, body.encode("utf-8")
+
+
+# Provider subsystem -> (listMethods, allowedMethods) as (serviceCode, serviceVersion).
+METHODS = {
+    "TEST/GOV/00000001/CLIENT": ([], []),
+    "TEST/GOV/00000002/PRODUCER": (
+        [("CheckPassportStatus", "v1"), ("CheckPassportStatus", "v2"), ("listMethods", None)],
+        [("CheckPassportStatus", "v1")],
+    ),
+    "TEST/GOV/00000003/OTHER": ([("CheckPassportStatus", "v1"), ("GetAddress", None)], []),
+}
+CLIENTS = [
+    ("SUBSYSTEM", "TEST/GOV/00000001/CLIENT", "Client"),
+    ("MEMBER", "TEST/GOV/00000002", "Producer Agency"),
+    ("SUBSYSTEM", "TEST/GOV/00000002/PRODUCER", "Passports"),
+    ("SUBSYSTEM", "TEST/GOV/00000003/OTHER", "Other"),
+    ("SUBSYSTEM", "TEST/GOV/00000004/BROKEN", None),
+]
+_PARTS = ("xRoadInstance", "memberClass", "memberCode", "subsystemCode", "serviceCode", "serviceVersion")
+
+
+def _identifier(tag: str, object_type: str, parts: Sequence[str | None]) -> str:
+    children = "".join(f"<id:{name}>{value}</id:{name}>" for name, value in zip(_PARTS, parts) if value)
+    return f'<{tag} id:objectType="{object_type}">{children}</{tag}>'
+
+
+def list_clients() -> bytes:
+    """
+    Builds the `listClients` answer listing `CLIENTS`.
+    """
+    members = "".join(
+        f"<xrd:member>{_identifier('xrd:id', object_type, path.split('/'))}"
+        + (f"<xrd:name>{name}</xrd:name>" if name else "")
+        + "</xrd:member>"
+        for object_type, path, name in CLIENTS
+    )
+    return (
+        '<xrd:clientList xmlns:xrd="http://x-road.eu/xsd/xroad.xsd" '
+        f'xmlns:id="http://x-road.eu/xsd/identifiers">{members}</xrd:clientList>'
+    ).encode()
+
+
+def respond_meta(message: str) -> tuple[int, bytes]:
+    """
+    Answers `listMethods` and `allowedMethods` with the services in `METHODS`.
+    """
+    method = "allowedMethods" if "allowedMethods" in message else "listMethods"
+    header = re.search(r"<(?:\w+:)?service\b.*?</(?:\w+:)?service>", message, re.DOTALL)
+    provider = "/".join(
+        _text(header.group(0) if header else "", name) for name in _PARTS[:4]
+    )
+    if provider not in METHODS:
+        fault = FAULT.replace("Server.ServerProxy.ServiceFailed", "Server.ServerProxy.UnknownMember")
+        return 500, fault.format(pas_number=provider).encode("utf-8")
+    services = "".join(
+        _identifier("xrd:service", "SERVICE", [*provider.split("/"), code, version])
+        for code, version in METHODS[provider][method == "allowedMethods"]
+    )
+    body = (
+        '<SOAP-ENV:Envelope xmlns:SOAP-ENV="http://schemas.xmlsoap.org/soap/envelope/" '
+        'xmlns:xrd="http://x-road.eu/xsd/xroad.xsd" xmlns:id="http://x-road.eu/xsd/identifiers">'
+        f"<SOAP-ENV:Body><xrd:{method}Response>{services}</xrd:{method}Response></SOAP-ENV:Body>"
+        "</SOAP-ENV:Envelope>"
+    )
+    return 200, body.encode("utf-8")
+
+
+def make_response(status: int, content: bytes, url: str = "") -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = content
+    response.headers["Content-Type"] = "text/xml; charset=utf-8"
+    response.headers["uxp-transaction-id"] = "TX-0001"
+    response.url = url
+    return response
+
+
+class StubTransport(Transport):
+    """
+    A zeep Transport that serves the stub WSDL and answers posts in-process.
+    """
+
+    def __init__(self, *args, items: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.items = items
+        self.loads: list[str] = []
+        self.posts: list[bytes] = []
+
+    def _load_remote_data(self, url):
+        self.loads.append(url)
+        return WSDL
+
+    def post(self, address, message, headers):
+        self.posts.append(message)
+        status, content = respond(message, self.items)
+        return make_response(status, content, address)
+
+
+def async_stub_transport(delay: float = 0.0, stats: dict | None = None):
+    """
+    Builds a zeep `AsyncTransport` whose httpx clients are served by the stub.
+
+    `stats`, when given, receives the number of posts and the peak number of
+    posts in flight at once.
+    """
+    import asyncio
+
+    import httpx
+    from zeep.transports import AsyncTransport
+
+    stats = stats if stats is not None else {}
+    stats.update(posts=0, active=0, peak=0)
+
+    def load(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=WSDL)
+
+    async def post(request: httpx.Request) -> httpx.Response:
+        stats["posts"] += 1
+        stats["active"] += 1
+        stats["peak"] = max(stats["peak"], stats["active"])
+        try:
+            await asyncio.sleep(delay)
+            status, content = respond(request.content)
+        finally:
+            stats["active"] -= 1
+        return httpx.Response(status, content=content, headers={"Content-Type": "text/xml"})
+
+    return AsyncTransport(
+        client=httpx.AsyncClient(transport=httpx.MockTransport(post)),
+        wsdl_client=httpx.Client(transport=httpx.MockTransport(load)),
+    )
+
+
+class StubSecurityServer:
+    """
+    An in-process HTTP stub of a security server on a free local port.
+
+    It answers ``GET .../wsdl?...`` with the stub WSDL, ``GET .../listClients`` with
+    `CLIENTS` and SOAP posts with the stub producer answer (see `respond()`), either
+    directly or as the HTTP proxy that `XClient` routes producer addresses through.
+    `latency` delays every SOAP answer and `items` sets the number of repeated
+    elements, i.e. the response size; both can be changed while the server runs.
+    With `gzip` set, answers are gzip-compressed for clients that accept it.
+    Compressed requests are decoded, or refused with 415 unless `accept_compressed`
+    is set; `encodings` records the ``Content-Encoding`` of every post. With
+    `truncate` set, SOAP answers stop halfway and the connection is closed.
+    `connections` counts the TCP connections accepted so far.
+
+        with StubSecurityServer(latency=0.005, items=100) as server:
+            client = XClient(server.url, CLIENT, SERVICE)
+    """
+
+    def __init__(self, latency: float = 0.0, items: int = 0, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.items = items
+        self.host = host
+        self.wsdl_loads = 0
+        self.posts = 0
+        self.connections = 0
+        self.gzip = False
+        self.accept_compressed = True
+        self.truncate = False
+        self.encodings: list[str | None] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self._server.server_port}"
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self) -> None:
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self) -> None:
+                if urlsplit(self.path).path.endswith("/listClients"):
+                    self.reply(200, list_clients(), "text/xml")
+                    return
+                if not urlsplit(self.path).path.endswith("/wsdl"):
+                    self.reply(404, b"", "text/plain")
+                    return
+                with stub._lock:
+                    stub.wsdl_loads += 1
+                self.reply(200, WSDL, "text/xml")
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                encoding = self.headers.get("Content-Encoding")
+                with stub._lock:
+                    stub.posts += 1
+                    stub.encodings.append(encoding)
+                if encoding and not stub.accept_compressed:
+                    self.reply(415, b"", "text/plain")
+                    return
+                if encoding == "gzip":
+                    body = gzip.decompress(body)
+                elif encoding == "deflate":
+                    body = zlib.decompress(body)
+                if stub.latency:
+                    time.sleep(stub.latency)
+                status, content = respond(body, stub.items)
+                self.reply(status, content, "text/xml; charset=utf-8", truncate=stub.truncate)
+
+            def reply(self, status: int, content: bytes, content_type: str, truncate: bool = False) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                if stub.gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    content = gzip.compress(content)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(content)))
+                self.send_header("uxp-transaction-id", "TX-0001")
+                self.end_headers()
+                if truncate:
+                    self.wfile.write(content[:len(content) // 2])
+                    self.close_connection = True
+                    return
+                try:
+                    self.wfile.write(content)
+                except ConnectionError:
+                    # The client stopped reading a streamed answer.
+                    self.close_connection = True
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        return Handler
+
+    def start(self) -> "Self":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            daemon=True,
+            name="StubSecurityServer",
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "Self":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+SOAP_ENV = "http://schemas.xmlsoap.org/soap/envelope/"
+XRO = "http://x-road.eu/xsd/xroad.xsd"
+IDEN = "http://x-road.eu/xsd/identifiers"
+NSMAP = {"SOAP-ENV": SOAP_ENV, "xro": XRO, "iden": IDEN}
+
+
+def envelope(body_text="AA123456", items=1, attribute=None):
+    """
+    Builds a SOAP request envelope with X-Road headers and `items` body elements,
+    as `DRACTransport` receives it from zeep.
+    """
+    root = etree.Element(f"{{{SOAP_ENV}}}Envelope", nsmap=NSMAP)
+    header = etree.SubElement(root, f"{{{SOAP_ENV}}}Header")
+    for name, object_type in (("client", "SUBSYSTEM"), ("service", "SERVICE")):
+        member = etree.SubElement(header, f"{{{XRO}}}{name}")
+        member.set(f"{{{IDEN}}}objectType", object_type)
+        for field in ("xRoadInstance", "memberClass", "memberCode", "subsystemCode"):
+            etree.SubElement(member, f"{{{IDEN}}}{field}").text = f"{field}-value"
+    etree.SubElement(header, f"{{{XRO}}}id").text = "ID-1"
+    body = etree.SubElement(root, f"{{{SOAP_ENV}}}Body")
+    request = etree.SubElement(body, "{http://example.org/drac}GetActRecords")
+    for i in range(items):
+        item = etree.SubElement(request, "{http://example.org/drac}Item")
+        item.text = body_text
+        if attribute is not None:
+            item.set("note", attribute)
+        etree.SubElement(item, "{http://example.org/drac}Empty")
+    return root
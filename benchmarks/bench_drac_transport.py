@@ -0,0 +1,51 @@
+"""
+Compares the DRAC envelope formatting of `DRACTransport.post_xml` with the original
+line-by-line implementation.
+
+    python -m benchmarks.bench_drac_transport [items ...]
+"""
+import sys
+import timeit
+import tracemalloc
+
+from lxml import etree
+
+from benchmarks._stub import envelope
+from XRoad.transport import _legacy_drac_message, drac_message
+
+
+def legacy(root):
+    message = etree.tostring(
+        root, pretty_print=True, xml_declaration=True, encoding="utf-8"
+    ).decode("utf-8")
+    return _legacy_drac_message(message).encode("utf-8")
+
+
+def peak_memory(func, root):
+    tracemalloc.start()
+    func(root)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main(sizes):
+    print(
+        f"{'items':>8} {'bytes':>10} {'legacy ms':>10} {'fast ms':>10} {'speedup':>8}"
+        f" {'legacy peak KiB':>16} {'fast peak KiB':>14}"
+    )
+    for items in sizes:
+        root = envelope("Шевченко Тарас Григорович", items=items)
+        assert drac_message(root) == legacy(root)
+        number = max(1, 2000 // max(items, 1))
+        old = min(timeit.repeat(lambda root=root: legacy(root), number=number, repeat=5)) / number
+        new = min(timeit.repeat(lambda root=root: drac_message(root), number=number, repeat=5)) / number
+        size = len(drac_message(root))
+        print(
+            f"{items:>8} {size:>10} {old * 1000:>10.3f} {new * 1000:>10.3f} {old / new:>7.1f}x"
+            f" {peak_memory(legacy, root) / 1024:>16.0f} {peak_memory(drac_message, root) / 1024:>14.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1, 100, 1000, 10000])
@@ -0,0 +1,40 @@
+"""
+Compares the per-call envelope serialization of zeep with a precompiled
+`EnvelopeTemplate`: building the envelope with the X-Road headers and body, and
+rendering it to the bytes the transport sends.
+
+    python -m benchmarks.bench_envelope [calls]
+"""
+import sys
+import timeit
+import uuid
+
+from zeep.wsdl.utils import etree_to_string
+
+from benchmarks._stub import CLIENT, SERVICE, SSU, StubTransport
+from XRoad.client import XClient
+from XRoad.registry import WSDLRegistry
+
+OPERATION = "CheckPassportStatus"
+
+
+def main(calls):
+    plain = XClient(SSU, CLIENT, SERVICE, transport=StubTransport(), registry=WSDLRegistry())
+    fast = XClient(
+        SSU, CLIENT, SERVICE, transport=StubTransport(), registry=WSDLRegistry(), precompiled=True
+    )
+
+    def build(client):
+        kwargs = {"PasNumber": "AA123456", "PasSerial": "654321"}
+        kwargs["_soapheaders"] = {"id": uuid.uuid4().hex, "userId": "0123456789"}
+        _, envelope, _ = client._envelope(OPERATION, kwargs)
+        return etree_to_string(envelope)
+
+    old = min(timeit.repeat(lambda: build(plain), number=calls, repeat=5)) / calls
+    new = min(timeit.repeat(lambda: build(fast), number=calls, repeat=5)) / calls
+    print(f"{'zeep us':>10} {'precompiled us':>15} {'speedup':>8}")
+    print(f"{old * 1e6:>10.1f} {new * 1e6:>15.1f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
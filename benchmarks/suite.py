@@ -0,0 +1,319 @@
+"""
+Benchmarks of the client hot paths against a local stub security server: client
+construction, WSDL loading through each cache backend, `request()` latency,
+`DRACTransport.post_xml` and throughput under concurrency.
+
+Every benchmark runs a fixed number of warm-up and measured iterations, and the
+results are written as JSON together with the interpreter, library versions and
+git commit, so runs of different releases can be compared:
+
+    python -m benchmarks.suite -o before.json
+    python -m benchmarks.suite -o after.json --compare before.json
+
+With ``--compare`` a benchmark whose median got slower (or whose throughput got
+lower) by more than ``--threshold`` is reported as a regression, and the exit
+status is 1.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from functools import partial
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any
+
+from zeep.cache import InMemoryCache, SqliteCache
+
+from benchmarks._stub import CLIENT, SERVICE, StubSecurityServer, envelope
+from XRoad.cache import LRUCache, RedisCache
+from XRoad.client import XClient
+from XRoad.registry import WSDLRegistry
+from XRoad.transport import DRACTransport, PooledTransport
+from XRoad.wsdl_cache import CompiledWSDLCache
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None  # type: ignore[assignment]
+
+FORMAT = 1
+
+
+def measure(func: Callable[[], Any], iterations: int, warmup: int) -> dict[str, Any]:
+    """
+    Times `iterations` calls of `func` after `warmup` untimed ones.
+
+    :return: The sample statistics in seconds.
+    """
+    for _ in range(warmup):
+        func()
+    gc.collect()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        "unit": "s",
+        "n": len(samples),
+        "min": samples[0],
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max": samples[-1],
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def cache_backends(directory: str, redis_url: str | None) -> dict[str, Any]:
+    backends: dict[str, Any] = {
+        "none": lambda: None,
+        "memory": lambda: InMemoryCache(timeout=3600),
+        "lru": lambda: LRUCache(),
+        "sqlite": lambda: SqliteCache(path=os.path.join(directory, "wsdl.sqlite"), timeout=3600),
+    }
+    if redis_url is not None:
+        backends["redis"] = lambda: RedisCache(redis_url, timeout=3600)
+    elif fakeredis is not None:
+        server = fakeredis.FakeServer()
+        backends["redis"] = lambda: RedisCache(fakeredis.FakeRedis(server=server), timeout=3600)
+    return backends
+
+
+def bench_wsdl_loading(server: StubSecurityServer, args: argparse.Namespace) -> dict[str, Any]:
+    """
+    XClient construction without the registry, loading the WSDL through each cache
+    backend and, last, through the compiled cache.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, factory in cache_backends(directory, args.redis).items():
+            cache = factory()
+
+            def construct(cache=cache):
+                XClient(server.url, CLIENT, SERVICE, transport=PooledTransport(cache), registry=None)
+
+            results[f"wsdl_load[{name}]"] = measure(construct, args.iterations // 4, 2)
+
+        compiled = CompiledWSDLCache(os.path.join(directory, "compiled"))
+
+        def construct_compiled():
+            XClient(
+                server.url,
+                CLIENT,
+                SERVICE,
+                transport=PooledTransport(InMemoryCache(timeout=3600)),
+                registry=None,
+                compiled_cache=compiled,
+            )
+
+        results["wsdl_load[compiled]"] = measure(construct_compiled, args.iterations // 4, 2)
+    return results
+
+
+def bench_construction(server: StubSecurityServer, args: argparse.Namespace) -> dict[str, Any]:
+    """
+    XClient construction with the WSDL already in the registry.
+    """
+    registry = WSDLRegistry()
+    transport = PooledTransport(InMemoryCache(timeout=3600))
+
+    def construct():
+        XClient(server.url, CLIENT, SERVICE, transport=transport, registry=registry)
+
+    return {"construct[registry]": measure(construct, args.iterations, 5)}
+
+
+def bench_request(server: StubSecurityServer, args: argparse.Namespace) -> dict[str, Any]:
+    """
+    `request()` latency for small and large responses, per response mode, and with
+    precompiled envelopes.
+    """
+    results = {}
+    registry = WSDLRegistry()
+    transport = PooledTransport(InMemoryCache(timeout=3600))
+    plain = XClient(server.url, CLIENT, SERVICE, transport=transport, registry=registry)
+    fast = XClient(server.url, CLIENT, SERVICE, transport=transport, registry=registry, precompiled=True)
+    for items in (0, args.large_items):
+        server.items = items
+        size = "small" if not items else f"items={items}"
+        for mode in ("dict", "lazy", "raw"):
+            results[f"request[{mode},{size}]"] = measure(
+                partial(plain.request, PasNumber="AA123456", xroad_response=mode),
+                args.iterations,
+                5,
+            )
+        results[f"request[precompiled,{size}]"] = measure(
+            lambda: fast.request(PasNumber="AA123456"), args.iterations, 5
+        )
+    server.items = 0
+    return results
+
+
+def bench_drac(server: StubSecurityServer, args: argparse.Namespace) -> dict[str, Any]:
+    """
+    `DRACTransport.post_xml` round trips of small and large envelopes.
+    """
+    transport = DRACTransport()
+    results = {}
+    for items in (1, args.large_items):
+        root = envelope("Шевченко Тарас Григорович", items=items)
+        results[f"drac_post_xml[items={items}]"] = measure(
+            partial(transport.post_xml, server.url + "/", root, {"Content-Type": "text/xml"}),
+            args.iterations,
+            5,
+        )
+    return results
+
+
+def bench_throughput(server: StubSecurityServer, args: argparse.Namespace) -> dict[str, Any]:
+    """
+    Calls per second of `request_many` while the server adds `--latency` per call.
+    """
+    results = {}
+    client = XClient(
+        server.url, CLIENT, SERVICE, transport=PooledTransport(InMemoryCache(timeout=3600)), registry=WSDLRegistry()
+    )
+    server.latency = args.latency
+    try:
+        for workers in (1, args.workers):
+            calls = [{"PasNumber": f"AA{i:06d}"} for i in range(args.calls)]
+            started = time.perf_counter()
+            failed = sum(
+                isinstance(outcome, Exception)
+                for _, outcome in client.request_many(calls, max_workers=workers)
+            )
+            elapsed = time.perf_counter() - started
+            results[f"throughput[workers={workers}]"] = {
+                "unit": "calls/s",
+                "n": len(calls),
+                "value": len(calls) / elapsed,
+                "seconds": elapsed,
+                "errors": failed,
+            }
+    finally:
+        server.latency = 0.0
+    return results
+
+
+BENCHMARKS = {
+    "construction": bench_construction,
+    "wsdl": bench_wsdl_loading,
+    "request": bench_request,
+    "drac": bench_drac,
+    "throughput": bench_throughput,
+}
+
+
+def _version(package: str) -> str | None:
+    try:
+        return version(package)
+    except PackageNotFoundError:
+        return None
+
+
+def metadata(args: argparse.Namespace) -> dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "format": FORMAT,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "versions": {name: _version(name) for name in ("pyxroad", "zeep", "lxml", "requests")},
+        "options": {
+            key: value for key, value in vars(args).items() if key not in ("output", "compare")
+        },
+    }
+
+
+def _score(result: dict[str, Any]) -> tuple[float, bool]:
+    """
+    Returns the compared value of a result and whether higher is better.
+    """
+    if "value" in result:
+        return result["value"], True
+    return result["median"], False
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """
+    Prints the change of every benchmark against `baseline`.
+
+    :return: The names of the regressed benchmarks.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<36} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        new, higher_is_better = _score(result)
+        old, _ = _score(before)
+        change = new / old - 1 if old else 0.0
+        regressed = -change > threshold if higher_is_better else change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<36} {old:>12.6g} {new:>12.6g} {change:>+7.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-o", "--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="A previous results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Regression threshold (0.10 = 10%%)")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="Run only these groups")
+    parser.add_argument("--iterations", type=int, default=200, help="Measured iterations per benchmark")
+    parser.add_argument("--large-items", type=int, default=1000, help="Repeated elements of large payloads")
+    parser.add_argument("--calls", type=int, default=400, help="Calls per throughput run")
+    parser.add_argument("--workers", type=int, default=16, help="Workers of the concurrent throughput run")
+    parser.add_argument("--latency", type=float, default=0.005, help="Server latency of throughput runs")
+    parser.add_argument("--redis", help="A Redis URL for the redis cache backend (default: fakeredis)")
+    args = parser.parse_args(argv)
+    random.seed(0)
+
+    results: dict[str, Any] = {}
+    with StubSecurityServer() as server:
+        for name in args.only or BENCHMARKS:
+            group = BENCHMARKS[name](server, args)
+            for key, result in group.items():
+                shown = (
+                    f"{result['value']:.1f} calls/s"
+                    if "value" in result
+                    else f"median {result['median'] * 1e6:.1f} us, p95 {result['p95'] * 1e6:.1f} us"
+                )
+                print(f"{key:<36} {shown}")
+            results.update(group)
+
+    report = {"meta": metadata(args), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
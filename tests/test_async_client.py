@@ -0,0 +1,83 @@
+import asyncio
+import unittest
+
+from zeep.exceptions import Fault
+
+from benchmarks._stub import CLIENT, SERVICE, SSU, async_stub_transport
+from XRoad.client import AsyncXClient, gather
+from XRoad.registry import WSDLRegistry
+
+try:
+    import httpx
+except ImportError:
+    httpx = None  # type: ignore[assignment]
+
+
+@unittest.skipIf(httpx is None, "httpx is not installed")
+class TestAsyncXClient(unittest.TestCase):
+    def _client(self, **kwargs):
+        self.stats = {}
+        return AsyncXClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=async_stub_transport(stats=self.stats, **kwargs),
+            registry=WSDLRegistry(),
+        )
+
+    def test_request(self):
+        client = self._client()
+        response = asyncio.run(client.request(PasNumber="AA123456", xroad_id="ID-1"))
+
+        self.assertEqual(response["Status"], "VALID")
+        self.assertEqual(response["PasNumber"], "AA123456")
+        self.assertEqual(response["RequestId"], "ID-1")
+        self.assertEqual(response["UserId"], "CLIENT")
+
+    def test_request_fault(self):
+        client = self._client()
+        with self.assertRaises(Fault):
+            asyncio.run(client.request(PasNumber="FAULT-1"))
+
+    def test_default_transport_is_async(self):
+        client = AsyncXClient.__new__(AsyncXClient)
+        transport = client._create_transport(SSU)
+        self.assertIsInstance(transport.client, httpx.AsyncClient)
+
+    def test_gather_caps_concurrency(self):
+        client = self._client(delay=0.01)
+        numbers = [f"AA{i:06d}" for i in range(20)]
+
+        async def run():
+            return await gather(*(client.request(PasNumber=n) for n in numbers), limit=4)
+
+        results = asyncio.run(run())
+
+        self.assertEqual([r["PasNumber"] for r in results], numbers)
+        self.assertEqual(self.stats["posts"], 20)
+        self.assertLessEqual(self.stats["peak"], 4)
+        self.assertGreater(self.stats["peak"], 1)
+
+    def test_gather_return_exceptions(self):
+        client = self._client()
+
+        async def run():
+            return await gather(
+                client.request(PasNumber="AA000001"),
+                client.request(PasNumber="FAULT-2"),
+                limit=2,
+                return_exceptions=True,
+            )
+
+        ok, failed = asyncio.run(run())
+
+        self.assertEqual(ok["PasNumber"], "AA000001")
+        self.assertIsInstance(failed, Fault)
+
+    def test_gather_invalid_limit(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(gather(limit=0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from benchmarks._stub import CLIENT, SERVICE, StubSecurityServer
+from XRoad.__main__ import main
+from XRoad.batch import BatchStats, checkpoint, read_calls
+
+
+def _die(index, kwargs):
+    os._exit(1)
+
+
+class TestReadCalls(unittest.TestCase):
+    def test_jsonl(self):
+        calls = list(read_calls(io.StringIO('{"PasNumber": "A"}\n\n{"PasNumber": "B"}\n'), "jsonl"))
+
+        self.assertEqual(calls, [{"PasNumber": "A"}, {"PasNumber": "B"}])
+
+    def test_csv_skips_empty_cells(self):
+        calls = list(read_calls(io.StringIO("PasNumber,PasSerial\nA,\nB,CC\n"), "csv"))
+
+        self.assertEqual(calls, [{"PasNumber": "A"}, {"PasNumber": "B", "PasSerial": "CC"}])
+
+    def test_not_an_object(self):
+        with self.assertRaises(TypeError):
+            list(read_calls(io.StringIO("[1, 2]\n"), "jsonl"))
+
+
+class TestCheckpoint(unittest.TestCase):
+    def test_done_and_cut_line(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "out.jsonl")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write('{"index": 0, "status": "ok"}\n')
+                file.write('{"index": 1, "status": "error"}\n')
+                file.write('{"index": 2, "status": "fault"}\n')
+                file.write('{"index": 3, "sta')
+
+            self.assertEqual(checkpoint(path), {0, 2})
+            with open(path, encoding="utf-8") as file:
+                self.assertTrue(file.read().endswith('"fault"}\n'))
+
+    def test_missing_file(self):
+        self.assertEqual(checkpoint("/nonexistent/out.jsonl"), set())
+
+
+class TestBatchStats(unittest.TestCase):
+    def test_report(self):
+        stats = BatchStats(skipped=3)
+        for status in ("ok", "ok", "fault", "error"):
+            stats.add(status)
+
+        self.assertIn("4 done (2 ok, 1 faults, 1 errors), 3 skipped", stats.report())
+
+
+class TestBatchCommand(unittest.TestCase):
+    def setUp(self):
+        self.server = StubSecurityServer().start()
+        self.addCleanup(self.server.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.input = os.path.join(directory.name, "calls.jsonl")
+        self.output = os.path.join(directory.name, "results.jsonl")
+
+    def write_input(self, calls):
+        with open(self.input, "w", encoding="utf-8") as file:
+            file.writelines(json.dumps(call) + "\n" for call in calls)
+
+    def run_batch(self, *extra):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            status = main([
+                "batch", self.input, "-o", self.output,
+                "--ssu", self.server.url, "--client", CLIENT, "--service", SERVICE,
+                "--workers", "2", *extra,
+            ])
+        return status, stderr.getvalue()
+
+    def read_output(self):
+        with open(self.output, encoding="utf-8") as file:
+            return {record["index"]: record for record in map(json.loads, file)}
+
+    def test_outcomes(self):
+        self.write_input([{"PasNumber": f"AA{i}"} for i in range(10)] + [{"PasNumber": "FAULT-1"}, {"Unknown": 1}])
+
+        status, stderr = self.run_batch()
+
+        self.assertEqual(status, 1)
+        self.assertIn("12 done (10 ok, 1 faults, 1 errors)", stderr)
+        records = self.read_output()
+        self.assertEqual(records[3]["result"]["PasNumber"], "AA3")
+        self.assertEqual(records[3]["transaction_id"], "TX-0001")
+        self.assertEqual(records[10]["fault"]["code"], "Server.ServerProxy.ServiceFailed")
+        self.assertEqual(records[11]["error"]["type"], "TypeError")
+        self.assertEqual(self.server.wsdl_loads, 1)
+
+    def test_resume(self):
+        self.write_input([{"PasNumber": f"AA{i}"} for i in range(6)])
+        with open(self.output, "w", encoding="utf-8") as file:
+            file.write('{"index": 0, "status": "ok"}\n{"index": 1, "status": "error"}\n{"index": 2, "st')
+
+        self.assertEqual(self.run_batch()[0], 2)
+        status, stderr = self.run_batch("--resume")
+
+        self.assertEqual(status, 0)
+        self.assertIn("1 skipped", stderr)
+        self.assertEqual(self.server.posts, 5)
+        records = self.read_output()
+        self.assertEqual(sorted(records), list(range(6)))
+        self.assertEqual(records[1]["status"], "ok")
+
+    def test_rate(self):
+        # A burst of 20 calls, then 20 calls per second.
+        self.write_input([{"PasNumber": f"AA{i}"} for i in range(30)])
+
+        started = time.monotonic()
+        status, stderr = self.run_batch("--rate", "20", "--stats-interval", "0.1")
+
+        self.assertEqual(status, 0)
+        self.assertGreaterEqual(time.monotonic() - started, 0.45)
+        self.assertGreaterEqual(stderr.count("calls/s now"), 3)
+
+    def test_bad_input(self):
+        with open(self.input, "w", encoding="utf-8") as file:
+            file.write("not json\n")
+
+        self.assertEqual(self.run_batch()[0], 2)
+
+    def test_missing_input(self):
+        status, stderr = self.run_batch()
+
+        self.assertEqual(status, 3)
+        self.assertIn("No such file or directory", stderr)
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_worker_died(self):
+        self.write_input([{"PasNumber": f"AA{i}"} for i in range(4)])
+
+        with mock.patch("XRoad.batch._call", _die):
+            status, stderr = self.run_batch()
+
+        self.assertEqual(status, 3)
+        self.assertIn("A worker process died", stderr)
+        self.assertIn("--resume", stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
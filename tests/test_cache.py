@@ -0,0 +1,281 @@
+import threading
+import time
+import unittest
+import zlib
+from unittest import mock
+
+from zeep.cache import InMemoryCache
+
+from XRoad.cache import LRUCache, RedisCache
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None  # type: ignore[assignment]
+
+URL = "http://security-server/wsdl?serviceCode=CheckPassportStatus"
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_add_get(self):
+        cache = LRUCache(maxsize=2)
+        cache.add(URL, b"wsdl")
+
+        self.assertEqual(cache.get(URL), b"wsdl")
+        self.assertIsNone(cache.get("http://other"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_empty_cache_is_used_by_zeep(self):
+        self.assertTrue(LRUCache())
+
+    def test_maxsize(self):
+        cache = LRUCache(maxsize=2)
+        cache.add("a", b"1")
+        cache.add("b", b"2")
+        cache.get("a")
+        cache.add("c", b"3")
+
+        self.assertEqual(cache.get("a"), b"1")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+    def test_maxbytes(self):
+        cache = LRUCache(maxsize=10, maxbytes=10)
+        cache.add("a", b"12345")
+        cache.add("b", b"12345")
+        cache.add("c", b"123")
+        cache.add("huge", b"x" * 11)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNone(cache.get("huge"))
+        self.assertEqual(cache.size, 8)
+
+    def test_expiry(self):
+        cache = LRUCache(timeout=10)
+        cache.add("a", b"1")
+        cache.add("b", b"2", timeout=100)
+
+        with mock.patch("XRoad.cache.time.monotonic", return_value=time.monotonic() + 11):
+            self.assertIsNone(cache.get("a"))
+            self.assertEqual(cache.get("b"), b"2")
+        self.assertEqual(cache.size, 1)
+
+
+class TestRedisCacheFallback(unittest.TestCase):
+    def test_unavailable_redis_falls_back(self):
+        cache = RedisCache("redis://127.0.0.1:1/0", timeout=10, local_size=10)
+        self.assertIsInstance(cache, InMemoryCache)
+
+    def test_positional_arguments_fall_back(self):
+        cache = RedisCache("redis://127.0.0.1:1/0", 10, 10)
+        self.assertIsInstance(cache, InMemoryCache)
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class TestRedisCache(unittest.TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+
+    def test_positional_arguments(self):
+        cache = RedisCache(self.redis, 3600, 10)
+
+        self.assertEqual(cache.ttl, 3600)
+        self.assertEqual(cache.local.maxsize, 10)
+
+    def test_add_get(self):
+        cache = RedisCache(self.redis, timeout=60)
+        cache.add(URL, b"wsdl")
+
+        self.assertEqual(cache.get(URL), b"wsdl")
+        self.assertIsNone(cache.get("http://other"))
+        self.assertEqual(cache.stats["redis"], {"hits": 1, "misses": 1, "stale": 0})
+        self.assertLessEqual(self.redis.ttl(cache._key(URL)), 60)
+
+    def test_local_tier_serves_hits(self):
+        writer = RedisCache(self.redis, timeout=60)
+        writer.add(URL, b"wsdl")
+        cache = RedisCache(self.redis, timeout=60, local_size=10)
+
+        for _ in range(5):
+            self.assertEqual(cache.get(URL), b"wsdl")
+
+        self.assertEqual(cache.stats, {
+            "local": {"hits": 4, "misses": 1},
+            "redis": {"hits": 1, "misses": 0, "stale": 0},
+        })
+
+    def test_local_ttl_is_capped(self):
+        cache = RedisCache(self.redis, timeout=60, local_size=10, local_ttl=600)
+        self.assertEqual(cache.local.timeout, 60)
+
+        self.redis.set(cache._key(URL), b"wsdl", ex=5)
+        cache.get(URL)
+        with mock.patch("XRoad.cache.time.monotonic", return_value=time.monotonic() + 6):
+            self.assertIsNone(cache.local.get(URL))
+
+    def test_local_tier_disabled_by_default(self):
+        cache = RedisCache(self.redis)
+        self.assertIsNone(cache.local)
+        self.assertEqual(cache.stats["local"], {"hits": 0, "misses": 0})
+
+    def test_compression(self):
+        cache = RedisCache(self.redis, compression="zlib", compress_min_size=10)
+        content = b"<xsd:schema/>" * 100
+        cache.add(URL, content)
+        cache.add("http://small", b"<a/>")
+
+        stored = self.redis.get(cache._key(URL))
+        self.assertTrue(stored.startswith(b"$XROAD:zlib$"))
+        self.assertLess(len(stored), len(content))
+        self.assertEqual(zlib.decompress(stored[len(b"$XROAD:zlib$"):]), content)
+        self.assertEqual(self.redis.get(cache._key("http://small")), b"<a/>")
+        self.assertEqual(cache.get(URL), content)
+
+    def test_reads_entries_of_other_settings(self):
+        plain = RedisCache(self.redis)
+        compressed = RedisCache(self.redis, compression="zlib", compress_min_size=0)
+
+        plain.add("http://plain", b"<old/>")
+        compressed.add("http://compressed", b"<new/>")
+
+        self.assertEqual(compressed.get("http://plain"), b"<old/>")
+        self.assertEqual(plain.get("http://compressed"), b"<new/>")
+
+    def test_corrupt_compressed_entry_is_a_miss(self):
+        cache = RedisCache(self.redis, compression="zlib")
+        self.redis.set(cache._key(URL), b"$XROAD:zlib$not zlib")
+        self.assertIsNone(cache.get(URL))
+
+    def test_invalid_compression(self):
+        with self.assertRaises(ValueError):
+            RedisCache(self.redis, compression="lz4")
+
+    def test_get_many_add_many_use_one_round_trip(self):
+        cache = RedisCache(self.redis, compression="zlib", compress_min_size=0, local_size=10)
+        urls = [f"http://security-server/xsd/{i}.xsd" for i in range(20)]
+
+        with mock.patch.object(self.redis, "pipeline", wraps=self.redis.pipeline) as pipeline:
+            cache.add_many((url, url.encode("ascii")) for url in urls)
+            self.assertEqual(pipeline.call_count, 1)
+
+        reader = RedisCache(self.redis, local_size=10)
+        with mock.patch.object(self.redis, "pipeline", wraps=self.redis.pipeline) as pipeline:
+            found = reader.get_many(urls + ["http://missing"])
+            self.assertEqual(pipeline.call_count, 1)
+
+        self.assertEqual(found["http://missing"], None)
+        for url in urls:
+            self.assertEqual(found[url], url.encode("ascii"))
+        self.assertEqual(reader.local.get(urls[-1]), urls[-1].encode("ascii"))
+        self.assertEqual(reader.stats["redis"]["hits"], 20)
+
+    def test_get_many_skips_stale_entries(self):
+        cache = RedisCache(self.redis, stale_ttl=60)
+        cache.add(URL, b"wsdl")
+        self.redis.delete(cache._fresh_key(cache._key(URL)))
+
+        self.assertEqual(cache.get_many([URL]), {URL: None})
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class TestRedisCacheStampede(unittest.TestCase):
+    def setUp(self):
+        server = fakeredis.FakeServer()
+        self.workers = [fakeredis.FakeRedis(server=server) for _ in range(2)]
+
+    def _caches(self, **kwargs):
+        return [RedisCache(redis, timeout=60, **kwargs) for redis in self.workers]
+
+    def test_single_flight_miss(self):
+        first, second = self._caches(single_flight=True, wait_timeout=2)
+
+        self.assertIsNone(first.get(URL))
+        timer = threading.Timer(0.1, first.add, args=(URL, b"wsdl"))
+        timer.start()
+        self.assertEqual(second.get(URL), b"wsdl")
+        timer.join()
+        self.assertFalse(self.workers[0].exists(first._lock_key(first._key(URL))))
+
+    def test_single_flight_wait_timeout(self):
+        first, second = self._caches(single_flight=True, wait_timeout=0.05)
+
+        self.assertIsNone(first.get(URL))
+        self.assertIsNone(second.get(URL))
+
+    def test_without_single_flight_every_worker_misses(self):
+        first, second = self._caches()
+        self.assertIsNone(first.get(URL))
+        self.assertIsNone(second.get(URL))
+
+    def test_stale_entry_refreshed_by_one_worker(self):
+        first, second = self._caches(stale_ttl=600)
+        first.add(URL, b"old")
+        key = first._key(URL)
+        self.assertGreater(self.workers[0].ttl(key), 600)
+
+        self.workers[0].delete(first._fresh_key(key))
+
+        self.assertIsNone(first.get(URL))
+        self.assertEqual(second.get(URL), b"old")
+        self.assertEqual(second.stats["redis"]["stale"], 1)
+
+        first.add(URL, b"new")
+        self.assertEqual(second.get(URL), b"new")
+        self.assertFalse(self.workers[0].exists(first._lock_key(key)))
+
+    def test_stale_entry_refreshed_in_background(self):
+        fetched = threading.Event()
+
+        def fetch(url):
+            fetched.set()
+            return b"new"
+
+        cache = RedisCache(self.workers[0], timeout=60, stale_ttl=600, fetch=fetch)
+        cache.add(URL, b"old")
+        self.workers[0].delete(cache._fresh_key(cache._key(URL)))
+
+        self.assertEqual(cache.get(URL), b"old")
+        self.assertTrue(fetched.wait(2))
+        for _ in range(100):
+            if cache.get(URL) == b"new":
+                break
+            time.sleep(0.01)
+        self.assertEqual(cache.get(URL), b"new")
+
+    def test_failed_background_refresh_releases_lock(self):
+        def fetch(url):
+            raise OSError("security server down")
+
+        cache = RedisCache(self.workers[0], timeout=60, stale_ttl=600, fetch=fetch)
+        cache.add(URL, b"old")
+        key = cache._key(URL)
+        self.workers[0].delete(cache._fresh_key(key))
+
+        self.assertEqual(cache.get(URL), b"old")
+        for _ in range(100):
+            if not self.workers[0].exists(cache._lock_key(key)):
+                break
+            time.sleep(0.01)
+        self.assertFalse(self.workers[0].exists(cache._lock_key(key)))
+
+    def test_unexpected_refresh_error_releases_lock(self):
+        def fetch(url):
+            raise ValueError("not a WSDL")
+
+        cache = RedisCache(self.workers[0], timeout=60, stale_ttl=600, fetch=fetch)
+        cache.add(URL, b"old")
+        key = cache._key(URL)
+        self.workers[0].delete(cache._fresh_key(key))
+
+        with mock.patch("threading.excepthook"):
+            self.assertEqual(cache.get(URL), b"old")
+            for _ in range(100):
+                if not self.workers[0].exists(cache._lock_key(key)):
+                    break
+                time.sleep(0.01)
+        self.assertFalse(self.workers[0].exists(cache._lock_key(key)))
+        self.assertEqual(cache._locks, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
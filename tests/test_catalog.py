@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+
+from lxml import etree
+from zeep.exceptions import Fault
+
+from benchmarks import _stub
+from benchmarks._stub import CLIENT, SERVICE, StubSecurityServer
+from XRoad.catalog import ServiceCatalog, UnknownServiceError
+from XRoad.client import XClient
+from XRoad.registry import WSDLRegistry
+
+PRODUCER = "TEST/GOV/00000002/PRODUCER"
+OTHER = "TEST/GOV/00000003/OTHER"
+BROKEN = "TEST/GOV/00000004/BROKEN"
+
+
+class TestServiceCatalog(unittest.TestCase):
+    def setUp(self):
+        self.server = StubSecurityServer().start()
+        self.addCleanup(self.server.stop)
+        self.catalog = ServiceCatalog(self.server.url, CLIENT)
+
+    def test_refresh(self):
+        failures = self.catalog.refresh()
+
+        self.assertEqual(list(failures), [BROKEN])
+        self.assertIsInstance(failures[BROKEN], Fault)
+        self.assertEqual(len(self.catalog), 4)
+        self.assertIn(SERVICE, self.catalog)
+        self.assertEqual(
+            [m.memberPath for m in self.catalog.find("CheckPassportStatus")],
+            [SERVICE, f"{PRODUCER}/CheckPassportStatus/v2", f"{OTHER}/CheckPassportStatus/v1"],
+        )
+        self.assertEqual(len(self.catalog.services("TEST/GOV/00000002")), 2)
+        self.assertEqual(self.catalog.services(OTHER)[1].serviceVersion, None)
+        names = {member.memberPath: name for member, name in self.catalog.clients()}
+        self.assertEqual(names["TEST/GOV/00000002"], "Producer Agency")
+
+    def test_listed_services_are_interned(self):
+        self.catalog.refresh()
+
+        member = self.catalog.get(SERVICE)
+
+        client = XClient(self.server.url, CLIENT, SERVICE, registry=WSDLRegistry(), catalog=self.catalog)
+        self.assertEqual(client._default_soapheaders["service"], member.member_dict)
+
+    def test_allowed_methods(self):
+        catalog = ServiceCatalog(self.server.url, CLIENT, allowed=True)
+        catalog.refresh()
+
+        self.assertEqual([m.memberPath for m in catalog.services()], [SERVICE])
+
+    def test_unknown_service_is_rejected_before_loading(self):
+        self.catalog.refresh()
+
+        with self.assertRaises(UnknownServiceError) as raised:
+            XClient(self.server.url, CLIENT, f"{PRODUCER}/CheckPassportStatus/v9", catalog=self.catalog)
+
+        self.assertIn("known versions", str(raised.exception))
+        self.assertEqual(self.server.wsdl_loads, 0)
+
+    def test_incremental_refresh(self):
+        self.catalog.refresh()
+        posts = self.server.posts
+
+        self.catalog.refresh(max_age=60)
+        self.assertEqual(self.server.posts, posts + 1)  # only the failed provider
+
+        self.catalog.refresh(providers=[OTHER])
+        self.assertEqual(self.server.posts, posts + 2)
+        self.assertEqual(len(self.catalog), 4)
+
+    def test_failed_provider_keeps_its_services(self):
+        self.catalog.refresh()
+        methods = _stub.METHODS.pop(PRODUCER)
+        self.addCleanup(_stub.METHODS.__setitem__, PRODUCER, methods)
+
+        failures = self.catalog.refresh(providers=[PRODUCER])
+
+        self.assertEqual(list(failures), [PRODUCER])
+        self.assertIn(SERVICE, self.catalog)
+
+    def test_save_and_load(self):
+        self.catalog.refresh()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "catalog.json")
+            self.catalog.save(path)
+
+            loaded = ServiceCatalog(self.server.url, CLIENT).load(path)
+
+            with self.assertRaises(ValueError):
+                ServiceCatalog(self.server.url, "TEST/GOV/00000009/ELSE").load(path)
+
+        self.assertIs(loaded.get(SERVICE), self.catalog.get(SERVICE))
+        self.assertEqual(len(loaded.clients()), 5)
+
+    def test_envelope_headers(self):
+        envelope = self.catalog._envelope(self.catalog.client, "listMethods")
+
+        text = etree.tostring(envelope).decode("utf-8")
+        self.assertIn('id:objectType="SERVICE"', text)
+        self.assertIn("<id:serviceCode>listMethods</id:serviceCode>", text)
+        self.assertIn("<xrd:userId>CLIENT</xrd:userId>", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from zeep.exceptions import Fault
+
+from benchmarks._stub import CLIENT, SERVICE, SSU, StubTransport
+from XRoad.client import XClient
+from XRoad.registry import WSDLRegistry
+
+
+class TestXClient(unittest.TestCase):
+    def setUp(self):
+        self.transport = StubTransport()
+        self.client = XClient(
+            SSU, CLIENT, SERVICE, transport=self.transport, registry=WSDLRegistry()
+        )
+
+    def test_request(self):
+        response = self.client.request(PasNumber="AA123456", PasSerial="654321")
+
+        self.assertEqual(response["Status"], "VALID")
+        self.assertEqual(response["PasNumber"], "AA123456")
+        self.assertEqual(response["UserId"], "CLIENT")
+
+    def test_response_debug_log(self):
+        with self.assertLogs("XRoad", "DEBUG") as logs:
+            self.client.request(PasNumber="AA123456")
+
+        self.assertTrue(any("Response (" in line and "AA123456" in line for line in logs.output))
+
+    def test_request_fault(self):
+        with self.assertRaises(Fault):
+            self.client.request(PasNumber="FAULT-1")
+
+    def test_fresh_id_per_call(self):
+        first = self.client.request(PasNumber="AA000001")
+        second = self.client.request(PasNumber="AA000002")
+
+        self.assertTrue(first["RequestId"])
+        self.assertNotEqual(first["RequestId"], second["RequestId"])
+
+    def test_per_call_headers_do_not_change_client(self):
+        defaults = dict(self.client._default_soapheaders)
+
+        response = self.client.request(
+            PasNumber="AA000001",
+            xroad_id="ID-1",
+            xroad_user_id="1234567890",
+            xroad_headers={"issue": "ISSUE-7"},
+        )
+
+        self.assertEqual(response["RequestId"], "ID-1")
+        self.assertEqual(response["UserId"], "1234567890")
+        self.assertIn(b"ISSUE-7", self.transport.posts[-1])
+        self.assertEqual(self.client._default_soapheaders, defaults)
+
+        response = self.client.request(PasNumber="AA000002")
+        self.assertNotEqual(response["RequestId"], "ID-1")
+        self.assertEqual(response["UserId"], "CLIENT")
+        self.assertNotIn(b"ISSUE-7", self.transport.posts[-1])
+
+    def test_pinned_id_and_user_id(self):
+        self.client.id = "PINNED"
+        self.client.userId = "0123456789"
+
+        response = self.client.request(PasNumber="AA000001")
+        self.assertEqual(response["RequestId"], "PINNED")
+        self.assertEqual(response["UserId"], "0123456789")
+
+        response = self.client.request(PasNumber="AA000001", xroad_id="OWN")
+        self.assertEqual(response["RequestId"], "OWN")
+
+    def test_shared_client_across_threads(self):
+        def call(i):
+            own_id = i % 2 == 0
+            kwargs = {"PasNumber": f"AA{i:06d}", "xroad_user_id": f"user-{i}"}
+            if own_id:
+                kwargs["xroad_id"] = f"ID-{i}"
+            return i, own_id, self.client.request(**kwargs)
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(call, range(400)))
+
+        generated = set()
+        for i, own_id, response in results:
+            self.assertEqual(response["PasNumber"], f"AA{i:06d}")
+            self.assertEqual(response["UserId"], f"user-{i}")
+            if own_id:
+                self.assertEqual(response["RequestId"], f"ID-{i}")
+            else:
+                generated.add(response["RequestId"])
+        self.assertEqual(len(generated), 200)
+        self.assertEqual(len(self.transport.loads), 1)
+
+    def test_request_many_ordered(self):
+        calls = [{"PasNumber": f"AA{i:06d}"} for i in range(50)]
+        calls[7] = {"PasNumber": "FAULT-7"}
+
+        results = list(self.client.request_many(calls, max_workers=4))
+
+        self.assertEqual([call for call, _ in results], calls)
+        for call, outcome in results:
+            if call["PasNumber"].startswith("FAULT"):
+                self.assertIsInstance(outcome, Fault)
+            else:
+                self.assertEqual(outcome["PasNumber"], call["PasNumber"])
+
+    def test_request_many_unordered(self):
+        calls = [{"PasNumber": f"AA{i:06d}"} for i in range(50)]
+
+        results = list(self.client.request_many(calls, max_workers=4, ordered=False))
+
+        self.assertCountEqual([call["PasNumber"] for call, _ in results], [c["PasNumber"] for c in calls])
+        for call, outcome in results:
+            self.assertEqual(outcome["PasNumber"], call["PasNumber"])
+
+    def test_request_many_reads_input_lazily(self):
+        consumed = []
+
+        def calls():
+            for i in range(1000):
+                consumed.append(i)
+                yield {"PasNumber": f"AA{i:06d}"}
+
+        results = self.client.request_many(calls(), max_workers=2, in_flight=4)
+        for _ in range(3):
+            next(results)
+        self.assertLessEqual(len(consumed), 3 + 4)
+        results.close()
+        self.assertLess(len(self.transport.posts), 1000)
+
+    def test_request_many_none_is_not_the_end(self):
+        calls = [{"PasNumber": "AA000001"}, None, {"PasNumber": "AA000002"}]
+
+        results = list(self.client.request_many(calls, max_workers=2))
+
+        self.assertEqual([call for call, _ in results], calls)
+        self.assertIsInstance(results[1][1], TypeError)
+        self.assertEqual(results[2][1]["PasNumber"], "AA000002")
+
+    def test_request_many_invalid_workers(self):
+        with self.assertRaises(ValueError):
+            self.client.request_many([], max_workers=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
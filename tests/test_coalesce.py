@@ -0,0 +1,236 @@
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from zeep.exceptions import Fault
+
+from benchmarks._stub import CLIENT, SERVICE, SSU, StubTransport, async_stub_transport
+from XRoad.client import AsyncXClient, XClient, gather
+from XRoad.coalesce import RequestCoalescer
+from XRoad.registry import WSDLRegistry
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None  # type: ignore[assignment]
+
+
+class GatedTransport(StubTransport):
+    """
+    Holds every post until `release` is set, so concurrent calls overlap.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def post(self, address, message, headers):
+        self.entered.set()
+        self.release.wait(5)
+        return super().post(address, message, headers)
+
+
+def run_concurrently(func, calls, release):
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        futures = [executor.submit(func, **call) for call in calls]
+        threading.Timer(0.2, release.set).start()
+        outcomes = []
+        for future in futures:
+            error = future.exception()
+            outcomes.append(error if error is not None else future.result())
+    return outcomes
+
+
+class TestXClientCoalescing(unittest.TestCase):
+    def setUp(self):
+        self.transport = GatedTransport()
+        self.coalescer = RequestCoalescer()
+        self.client = XClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=self.transport,
+            registry=WSDLRegistry(),
+            coalescer=self.coalescer,
+        )
+
+    def test_identical_calls_share_one_post(self):
+        outcomes = run_concurrently(
+            self.client.request, [{"PasNumber": "AA123456"}] * 8, self.transport.release
+        )
+
+        self.assertEqual(len(self.transport.posts), 1)
+        self.assertEqual(self.coalescer.coalesced, 7)
+        self.assertTrue(all(outcome == outcomes[0] for outcome in outcomes))
+        self.assertEqual(outcomes[0]["PasNumber"], "AA123456")
+
+    def test_waiters_get_their_own_copy(self):
+        first, second = run_concurrently(
+            self.client.request, [{"PasNumber": "AA123456"}] * 2, self.transport.release
+        )
+
+        self.assertIsNot(first, second)
+
+    def test_different_calls_are_not_coalesced(self):
+        run_concurrently(
+            self.client.request,
+            [{"PasNumber": "AA000001"}, {"PasNumber": "AA000002"}],
+            self.transport.release,
+        )
+
+        self.assertEqual(len(self.transport.posts), 2)
+
+    def test_fault_is_shared(self):
+        outcomes = run_concurrently(
+            self.client.request, [{"PasNumber": "FAULT-1"}] * 4, self.transport.release
+        )
+
+        self.assertEqual(len(self.transport.posts), 1)
+        self.assertTrue(all(isinstance(outcome, Fault) for outcome in outcomes))
+
+    def test_slow_leader_is_not_waited_for(self):
+        self.coalescer.wait_timeout = 0.05
+
+        outcomes = run_concurrently(
+            self.client.request, [{"PasNumber": "AA123456"}] * 3, self.transport.release
+        )
+
+        self.assertEqual(len(self.transport.posts), 3)
+        self.assertEqual(self.coalescer.coalesced, 0)
+        self.assertTrue(all(outcome["PasNumber"] == "AA123456" for outcome in outcomes))
+
+    def test_finished_calls_are_not_reused(self):
+        self.transport.release.set()
+
+        self.client.request(PasNumber="AA123456")
+        self.client.request(PasNumber="AA123456")
+
+        self.assertEqual(len(self.transport.posts), 2)
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class TestRedisCoalescing(unittest.TestCase):
+    def setUp(self):
+        server = fakeredis.FakeServer()
+        self.transports = []
+        self.clients = []
+        self.coalescers = []
+        # One client per "process": separate coalescers sharing one Redis server.
+        for _ in range(2):
+            transport = GatedTransport()
+            coalescer = RequestCoalescer(fakeredis.FakeRedis(server=server), wait_timeout=5)
+            self.transports.append(transport)
+            self.coalescers.append(coalescer)
+            self.clients.append(
+                XClient(
+                    SSU,
+                    CLIENT,
+                    SERVICE,
+                    transport=transport,
+                    registry=WSDLRegistry(),
+                    coalescer=coalescer,
+                )
+            )
+        self.release = threading.Event()
+        for transport in self.transports:
+            transport.release = self.release
+
+    def request_from_both(self, **kwargs):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(self.clients[0].request, **kwargs)
+            self.transports[0].entered.wait(5)
+            follower = executor.submit(self.clients[1].request, **kwargs)
+            threading.Timer(0.2, self.release.set).start()
+            return [future.exception() or future.result() for future in (leader, follower)]
+
+    def test_result_is_shared_across_processes(self):
+        leader, follower = self.request_from_both(PasNumber="AA123456")
+
+        self.assertEqual(leader, follower)
+        self.assertEqual(len(self.transports[0].posts), 1)
+        self.assertEqual(len(self.transports[1].posts), 0)
+        self.assertEqual(self.coalescers[1].coalesced, 1)
+
+    def test_fault_is_shared_across_processes(self):
+        leader, follower = self.request_from_both(PasNumber="FAULT-1")
+
+        self.assertIsInstance(leader, Fault)
+        self.assertIsInstance(follower, Fault)
+        self.assertEqual(str(follower.message), str(leader.message))
+        self.assertEqual(len(self.transports[1].posts), 0)
+
+    def test_lock_is_released(self):
+        self.release.set()
+
+        self.clients[0].request(PasNumber="AA123456")
+        self.clients[1].request(PasNumber="AA123456")
+
+        self.assertEqual(len(self.transports[0].posts), 1)
+        self.assertEqual(len(self.transports[1].posts), 1)
+
+
+class TestAsyncXClientCoalescing(unittest.TestCase):
+    def test_identical_calls_share_one_post(self):
+        stats: dict = {}
+        coalescer = RequestCoalescer()
+        client = AsyncXClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=async_stub_transport(delay=0.05, stats=stats),
+            registry=WSDLRegistry(),
+            coalescer=coalescer,
+        )
+
+        results = asyncio.run(
+            gather(*(client.request(PasNumber="AA123456") for _ in range(5)), limit=5)
+        )
+
+        self.assertEqual(stats["posts"], 1)
+        self.assertEqual(coalescer.coalesced, 4)
+        self.assertTrue(all(result == results[0] for result in results))
+
+    def test_slow_leader_is_not_waited_for(self):
+        stats: dict = {}
+        coalescer = RequestCoalescer(wait_timeout=0.05)
+        client = AsyncXClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=async_stub_transport(delay=0.2, stats=stats),
+            registry=WSDLRegistry(),
+            coalescer=coalescer,
+        )
+
+        asyncio.run(gather(*(client.request(PasNumber="AA123456") for _ in range(3)), limit=3))
+
+        self.assertEqual(stats["posts"], 3)
+        self.assertEqual(coalescer.coalesced, 0)
+
+    def test_fault_is_shared(self):
+        stats: dict = {}
+        client = AsyncXClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=async_stub_transport(delay=0.05, stats=stats),
+            registry=WSDLRegistry(),
+            coalescer=RequestCoalescer(),
+        )
+
+        results = asyncio.run(
+            gather(
+                *(client.request(PasNumber="FAULT-1") for _ in range(3)),
+                limit=3,
+                return_exceptions=True,
+            )
+        )
+
+        self.assertEqual(stats["posts"], 1)
+        self.assertTrue(all(isinstance(result, Fault) for result in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+
+from lxml import etree
+
+from benchmarks._stub import CLIENT, SERVICE, SSU, StubTransport
+from XRoad.client import XClient
+from XRoad.envelope import EnvelopeTemplate
+from XRoad.registry import WSDLRegistry
+
+OPERATION = "CheckPassportStatus"
+
+
+def zeep_envelope(client, headers, **kwargs):
+    kwargs["_soapheaders"] = client.service[OPERATION]._merge_soap_headers(headers)
+    envelope, http_headers = client.service._binding._create(
+        OPERATION, (), kwargs, client=client, options=client.service._binding_options
+    )
+    return etree.tostring(envelope), http_headers
+
+
+def template_envelope(client, values, **kwargs):
+    template = EnvelopeTemplate(client.service._binding, OPERATION, client._default_soapheaders)
+    envelope, http_headers = template.create(
+        client, values, kwargs, client.service._binding_options
+    )
+    return etree.tostring(envelope), http_headers
+
+
+class TestEnvelopeTemplate(unittest.TestCase):
+    def setUp(self):
+        self.transport = StubTransport()
+        self.client = XClient(
+            SSU, CLIENT, SERVICE, transport=self.transport, registry=WSDLRegistry()
+        )
+
+    def test_equivalent_to_zeep(self):
+        cases = [
+            ({"id": "ID-1"}, {"PasNumber": "AA123456"}),
+            ({"id": "ID-2", "userId": "0123456789"}, {"PasNumber": "AA123456", "PasSerial": "12"}),
+            ({"id": "<&>"}, {"PasNumber": "Шевченко & <Co>"}),
+        ]
+        for headers, kwargs in cases:
+            with self.subTest(headers=headers):
+                values = {"userId": self.client.userId, **headers}
+                self.assertEqual(
+                    template_envelope(self.client, values, **kwargs),
+                    zeep_envelope(self.client, headers, **kwargs),
+                )
+
+    def test_missing_user_id(self):
+        self.client.userId = None
+
+        self.assertEqual(
+            template_envelope(self.client, {"id": "ID-1", "userId": None}, PasNumber="AA1"),
+            zeep_envelope(self.client, {"id": "ID-1"}, PasNumber="AA1"),
+        )
+
+    def test_unknown_operation(self):
+        with self.assertRaises(ValueError):
+            EnvelopeTemplate(self.client.service._binding, "Missing", {})
+
+
+class TestPrecompiledXClient(unittest.TestCase):
+    def make_client(self, precompiled):
+        transport = StubTransport()
+        client = XClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=transport,
+            registry=WSDLRegistry(),
+            precompiled=precompiled,
+        )
+        return client, transport
+
+    def test_same_posts_as_zeep(self):
+        plain, plain_transport = self.make_client(False)
+        fast, fast_transport = self.make_client(True)
+
+        for client in (plain, fast):
+            client.request(PasNumber="AA000001", xroad_id="ID-1")
+            client.request(PasNumber="AA000002", xroad_id="ID-2", xroad_user_id="0123456789")
+            client.request(PasNumber="AA000003", xroad_id="ID-3", xroad_response="raw")
+
+        self.assertEqual(fast_transport.posts, plain_transport.posts)
+        self.assertEqual(len(fast._templates), 1)
+
+    def test_response(self):
+        client, _ = self.make_client(True)
+
+        response = client.request(PasNumber="AA123456", xroad_user_id="0123456789")
+
+        self.assertEqual(response["PasNumber"], "AA123456")
+        self.assertEqual(response["UserId"], "0123456789")
+        self.assertTrue(response["RequestId"])
+
+    def test_other_headers_fall_back_to_zeep(self):
+        client, transport = self.make_client(True)
+
+        client.request(PasNumber="AA123456", xroad_headers={"issue": "ISSUE-7"})
+
+        self.assertIn(b"ISSUE-7", transport.posts[-1])
+        self.assertEqual(client._templates, {})
+
+    def test_template_follows_default_headers(self):
+        client, transport = self.make_client(True)
+        client.request(PasNumber="AA123456")
+
+        client.set_default_soapheaders({**client._default_soapheaders, "protocolVersion": "4.1"})
+        client.request(PasNumber="AA123456")
+
+        self.assertRegex(transport.posts[0], rb"protocolVersion[^>]*>4\.0<")
+        self.assertRegex(transport.posts[1], rb"protocolVersion[^>]*>4\.1<")
+
+
+if __name__ == "__main__":
+    unittest.main()
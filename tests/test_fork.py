@@ -0,0 +1,181 @@
+import gc
+import os
+import tempfile
+import unittest
+import weakref
+
+import fakeredis
+from zeep.cache import InMemoryCache, SqliteCache
+
+from benchmarks._stub import CLIENT, SERVICE, SSU, StubSecurityServer, StubTransport
+from tests.test_lazy import FlakyTransport
+from XRoad import fork
+from XRoad.cache import LRUCache, RedisCache
+from XRoad.client import XClient, preload
+from XRoad.coalesce import RequestCoalescer
+from XRoad.limiter import ServiceLimiter
+from XRoad.registry import WSDLRegistry
+from XRoad.transport import PooledTransport
+
+
+class TestAfterFork(unittest.TestCase):
+    """
+    Runs the after-fork hooks in the test process, as if it were a forked child.
+    """
+
+    def setUp(self):
+        self.server = StubSecurityServer().start()
+        self.addCleanup(self.server.stop)
+
+    def make_client(self, registry):
+        return XClient(
+            self.server.url,
+            CLIENT,
+            SERVICE,
+            transport=PooledTransport(InMemoryCache(timeout=0)),
+            registry=registry,
+        )
+
+    def test_client_keeps_wsdl_and_drops_connections(self):
+        registry = WSDLRegistry()
+        client = self.make_client(registry)
+        client.request(PasNumber="AA123456")
+        adapter = client.transport.session.get_adapter(self.server.url)
+        pool_manager = adapter.poolmanager
+        self.assertTrue(adapter.proxy_manager)  # calls go through the security server proxy
+        document = client.wsdl
+
+        fork._after_fork_in_child()
+
+        self.assertIsNot(adapter.poolmanager, pool_manager)
+        self.assertEqual(adapter.proxy_manager, {})
+        self.assertIs(client.wsdl, document)
+        self.assertIs(self.make_client(registry).wsdl, document)
+        self.assertEqual(client.request(PasNumber="AA123456")["PasNumber"], "AA123456")
+        self.assertEqual(self.server.wsdl_loads, 1)
+
+    def test_pool_settings_are_kept(self):
+        transport = PooledTransport(pool_connections=3, pool_maxsize=7, pool_block=True)
+        XClient(SSU, CLIENT, SERVICE, transport=transport, registry=WSDLRegistry(), lazy=True)
+
+        fork._after_fork_in_child()
+
+        adapter = transport.session.get_adapter(SSU)
+        self.assertEqual(adapter.poolmanager.connection_pool_kw["maxsize"], 7)
+        self.assertTrue(adapter.poolmanager.connection_pool_kw["block"])
+
+
+class TestStateReset(unittest.TestCase):
+    def test_limiter_releases_parent_slots(self):
+        limiter = ServiceLimiter(max_concurrency=1, initial_concurrency=1, timeout=0)
+        limiter.acquire("S")
+
+        fork._after_fork_in_child()
+
+        token, _ = limiter.try_acquire("S")
+        self.assertIsNotNone(token)
+
+    def test_coalescer_forgets_parent_flights(self):
+        coalescer = RequestCoalescer()
+        coalescer._flights["key"] = object()
+
+        fork._after_fork_in_child()
+
+        self.assertEqual(coalescer._flights, {})
+
+    def test_redis_connections_are_reset(self):
+        redis = fakeredis.FakeRedis()
+        cache = RedisCache(redis, local_size=4)
+        cache.add("http://a", b"content")
+        connections = list(redis.connection_pool._available_connections)
+
+        fork._after_fork_in_child()
+
+        self.assertTrue(connections)
+        self.assertFalse(set(connections) & set(redis.connection_pool._available_connections))
+        self.assertEqual(cache.get("http://a"), b"content")
+
+    def test_sqlite_cache_lock_is_replaced(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = SqliteCache(path=os.path.join(directory.name, "cache.db"))
+        XClient(SSU, CLIENT, SERVICE, transport=StubTransport(cache=cache), registry=WSDLRegistry(), lazy=True)
+        lock = cache._lock
+
+        fork._after_fork_in_child()
+
+        self.assertIsNot(cache._lock, lock)
+        fork.reset_sqlite_cache(object())  # no private lock, nothing to replace
+
+    def test_objects_are_held_weakly(self):
+        cache = LRUCache()
+        self.assertIn(cache, fork._objects)
+        ref = weakref.ref(cache)
+
+        del cache
+        gc.collect()
+
+        self.assertIsNone(ref())
+
+    def test_failing_hook_is_logged(self):
+        class Broken:
+            def _after_fork(self):
+                raise RuntimeError("broken")
+
+        broken = Broken()
+        fork.register(broken)
+        self.addCleanup(fork._objects.discard, broken)
+
+        with self.assertLogs("XRoad.fork", "ERROR"):
+            fork._after_fork_in_child()
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "needs os.fork")
+class TestRealFork(unittest.TestCase):
+    def test_child_calls_with_parent_client(self):
+        with StubSecurityServer() as server:
+            registry = WSDLRegistry()
+            client = XClient(
+                server.url, CLIENT, SERVICE, transport=PooledTransport(), registry=registry, lazy=True
+            )
+            self.assertEqual(preload([client], freeze=False), {})
+            client.request(PasNumber="AA123456")
+
+            pid = os.fork()
+            if pid == 0:
+                ok = False
+                try:
+                    ok = client.request(PasNumber="CHILD")["PasNumber"] == "CHILD"
+                finally:
+                    os._exit(0 if ok else 1)
+            _, status = os.waitpid(pid, 0)
+
+            self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+            self.assertEqual((server.wsdl_loads, server.posts), (1, 2))
+
+
+class TestPreload(unittest.TestCase):
+    def test_loads_and_freezes(self):
+        self.addCleanup(gc.unfreeze)
+        client = XClient(SSU, CLIENT, SERVICE, transport=StubTransport(), registry=WSDLRegistry(), lazy=True)
+
+        self.assertEqual(preload([client], freeze=True), {})
+
+        self.assertTrue(client.loaded)
+        self.assertGreater(gc.get_freeze_count(), 0)
+
+    def test_reports_failures(self):
+        transport = FlakyTransport()
+        transport.down = True
+        client = XClient(SSU, CLIENT, SERVICE, transport=transport, registry=WSDLRegistry(), lazy=True)
+
+        failures = preload([client], freeze=False)
+
+        self.assertEqual(list(failures), [SERVICE])
+        self.assertFalse(client.loaded)
+        with self.assertRaises(ValueError):
+            preload([client], max_workers=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from zeep import Settings
+from zeep.exceptions import TransportError
+
+from benchmarks._stub import CLIENT, SERVICE, SSU, StubTransport, async_stub_transport
+from XRoad.client import AsyncXClient, XClient, prewarm
+from XRoad.registry import WSDLRegistry
+
+OTHER = "TEST/GOV/00000003/OTHER/CheckPassportStatus/v1"
+
+
+class FlakyTransport(StubTransport):
+    """
+    Fails WSDL loads while `down` is set, and holds them until `release` is set.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.down = False
+        self.release = threading.Event()
+        self.release.set()
+
+    def _load_remote_data(self, url):
+        self.release.wait(5)
+        if self.down:
+            raise TransportError("WSDL unreachable")
+        return super()._load_remote_data(url)
+
+
+class TestLazyXClient(unittest.TestCase):
+    def make_client(self, service=SERVICE, transport=None, **kwargs):
+        return XClient(
+            SSU,
+            CLIENT,
+            service,
+            transport=transport or StubTransport(),
+            registry=WSDLRegistry(),
+            lazy=True,
+            **kwargs,
+        )
+
+    def test_loads_on_first_request(self):
+        transport = StubTransport()
+        client = self.make_client(transport=transport)
+
+        self.assertFalse(client.loaded)
+        self.assertEqual(transport.loads, [])
+
+        self.assertEqual(client.request(PasNumber="AA123456")["PasNumber"], "AA123456")
+        self.assertTrue(client.loaded)
+        self.assertEqual(len(transport.loads), 1)
+
+    def test_unreachable_wsdl(self):
+        transport = FlakyTransport()
+        transport.down = True
+        client = self.make_client(transport=transport)
+
+        with self.assertRaises(TransportError):
+            client.request(PasNumber="AA123456")
+        self.assertFalse(client.loaded)
+
+        transport.down = False
+        self.assertEqual(client.request(PasNumber="AA123456")["PasNumber"], "AA123456")
+
+    def test_concurrent_first_calls_load_once(self):
+        transport = StubTransport()
+        client = XClient(SSU, CLIENT, SERVICE, transport=transport, registry=None, lazy=True)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda i: client.request(PasNumber=f"AA{i}"), range(8)))
+
+        self.assertEqual(len(transport.loads), 1)
+
+    def test_custom_settings(self):
+        client = self.make_client(settings=Settings(strict=False))
+
+        self.assertEqual(client.load().request(PasNumber="AA123456")["PasNumber"], "AA123456")
+
+    def test_namespace_prefixes(self):
+        client = self.make_client()
+
+        self.assertEqual(client.namespaces["xro"], "https://x-road.eu/xsd/xroad.xsd")
+
+    def test_async(self):
+        client = AsyncXClient(
+            SSU, CLIENT, SERVICE, transport=async_stub_transport(), registry=WSDLRegistry(), lazy=True
+        )
+
+        self.assertFalse(client.loaded)
+        response = asyncio.run(client.request(PasNumber="AA123456"))
+        self.assertEqual(response["PasNumber"], "AA123456")
+
+
+class TestPrewarm(unittest.TestCase):
+    def test_reports_failures(self):
+        broken = FlakyTransport()
+        broken.down = True
+        good = XClient(SSU, CLIENT, SERVICE, transport=StubTransport(), registry=WSDLRegistry(), lazy=True)
+        bad = XClient(SSU, CLIENT, OTHER, transport=broken, registry=WSDLRegistry(), lazy=True)
+
+        failures = prewarm([good, bad], max_workers=2).result(5)
+
+        self.assertTrue(good.loaded)
+        self.assertFalse(bad.loaded)
+        self.assertEqual(list(failures), [OTHER])
+        self.assertIsInstance(failures[OTHER], TransportError)
+
+    def test_does_not_block(self):
+        transport = FlakyTransport()
+        transport.release.clear()
+        client = XClient(SSU, CLIENT, SERVICE, transport=transport, registry=WSDLRegistry(), lazy=True)
+
+        future = prewarm([client])
+        self.assertFalse(future.done())
+
+        transport.release.set()
+        self.assertEqual(future.result(5), {})
+        self.assertTrue(client.loaded)
+
+    def test_nothing_to_load(self):
+        client = XClient(SSU, CLIENT, SERVICE, transport=StubTransport(), registry=WSDLRegistry())
+
+        self.assertEqual(prewarm([client]).result(0), {})
+        with self.assertRaises(ValueError):
+            prewarm([client], max_workers=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
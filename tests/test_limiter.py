@@ -0,0 +1,244 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from zeep.exceptions import Fault
+
+from benchmarks._stub import CLIENT, SERVICE, SSU, StubTransport, async_stub_transport
+from XRoad.client import AsyncXClient, XClient
+from XRoad.limiter import LimiterTimeout, ServiceLimiter
+from XRoad.Members import Members
+from XRoad.registry import WSDLRegistry
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None  # type: ignore[assignment]
+
+KEY = "TEST/GOV/00000002/PRODUCER/CheckPassportStatus/v1"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestServiceLimiter(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("XRoad.limiter.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_key(self):
+        self.assertEqual(ServiceLimiter.key(Members(objectType="SERVICE", memberPath=SERVICE)), KEY)
+
+    def test_token_bucket(self):
+        limiter = ServiceLimiter(rate=2, burst=2)
+
+        self.assertIsNotNone(limiter.try_acquire(KEY)[0])
+        self.assertIsNotNone(limiter.try_acquire(KEY)[0])
+        token, wait = limiter.try_acquire(KEY)
+        self.assertIsNone(token)
+        self.assertAlmostEqual(wait, 0.5)
+
+        self.clock.now += 0.5
+        self.assertIsNotNone(limiter.try_acquire(KEY)[0])
+        self.assertIsNotNone(limiter.try_acquire("OTHER")[0])
+
+    def test_per_service_rate(self):
+        limiter = ServiceLimiter(rate=100, rates={KEY: 1})
+
+        self.assertIsNotNone(limiter.try_acquire(KEY)[0])
+        self.assertIsNone(limiter.try_acquire(KEY)[0])
+
+    def test_concurrency_limit(self):
+        limiter = ServiceLimiter(initial_concurrency=2)
+
+        first, _ = limiter.try_acquire(KEY)
+        self.assertIsNotNone(limiter.try_acquire(KEY)[0])
+        self.assertIsNone(limiter.try_acquire(KEY)[0])
+
+        limiter.release(KEY, first, 0.1, False)
+        self.assertIsNotNone(limiter.try_acquire(KEY)[0])
+
+    def test_additive_increase(self):
+        limiter = ServiceLimiter(max_concurrency=5, initial_concurrency=4)
+
+        for _ in range(4):
+            limiter.release(KEY, limiter.acquire(KEY), 0.1, False)
+        self.assertAlmostEqual(limiter.limit(KEY), 5.0, places=0)
+
+        for _ in range(20):
+            limiter.release(KEY, limiter.acquire(KEY), 0.1, False)
+        self.assertEqual(limiter.limit(KEY), 5.0)
+
+    def test_multiplicative_decrease(self):
+        limiter = ServiceLimiter(initial_concurrency=16, cooldown=1.0)
+
+        for _ in range(3):
+            limiter.release(KEY, limiter.acquire(KEY), 0.1, True)
+        self.assertEqual(limiter.limit(KEY), 8.0)
+
+        self.clock.now += 1.0
+        limiter.release(KEY, limiter.acquire(KEY), 0.1, True)
+        self.assertEqual(limiter.limit(KEY), 4.0)
+
+    def test_latency_target(self):
+        limiter = ServiceLimiter(initial_concurrency=8, min_concurrency=6, latency_target=1.0)
+
+        limiter.release(KEY, limiter.acquire(KEY), 2.0, False)
+
+        self.assertEqual(limiter.limit(KEY), 6.0)
+
+    def test_slot_outcome(self):
+        limiter = ServiceLimiter(initial_concurrency=8, cooldown=0)
+
+        with self.assertRaises(Fault), limiter.slot(KEY):
+            raise Fault("rejected")
+        self.assertGreater(limiter.limit(KEY), 8.0)
+
+        with self.assertRaises(ConnectionError), limiter.slot(KEY):
+            raise ConnectionError()
+        self.assertLess(limiter.limit(KEY), 8.0)
+
+    def test_acquire_timeout(self):
+        limiter = ServiceLimiter(initial_concurrency=1, timeout=0)
+        limiter.acquire(KEY)
+
+        with self.assertRaises(LimiterTimeout):
+            limiter.acquire(KEY)
+
+    def test_invalid_bounds(self):
+        with self.assertRaises(ValueError):
+            ServiceLimiter(min_concurrency=4, max_concurrency=2)
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class TestRedisServiceLimiter(unittest.TestCase):
+    def setUp(self):
+        server = fakeredis.FakeServer()
+        # Two limiters on one server behave like two worker processes.
+        self.first = ServiceLimiter(
+            rate=1, burst=2, initial_concurrency=2, redis=fakeredis.FakeRedis(server=server)
+        )
+        self.second = ServiceLimiter(
+            rate=1, burst=2, initial_concurrency=2, redis=fakeredis.FakeRedis(server=server)
+        )
+
+    def test_shared_bucket(self):
+        self.assertIsNotNone(self.first.try_acquire(KEY)[0])
+        self.assertIsNotNone(self.second.try_acquire(KEY)[0])
+
+        token, wait = self.first.try_acquire(KEY)
+        self.assertIsNone(token)
+        self.assertGreater(wait, 0)
+
+    def test_shared_concurrency(self):
+        for limiter in (self.first, self.second):
+            limiter.rate, limiter.burst = 100, 10
+        tokens = [self.first.try_acquire(KEY)[0], self.first.try_acquire(KEY)[0]]
+        self.assertIsNone(self.second.try_acquire(KEY)[0])
+
+        self.first.release(KEY, tokens[0], 0.1, False)
+        self.assertIsNotNone(self.second.try_acquire(KEY)[0])
+
+    def test_shared_limit(self):
+        self.first.release(KEY, self.first.acquire(KEY), 0.1, True)
+
+        self.assertEqual(self.second.limit(KEY), 1.0)
+
+    def test_lease_expires(self):
+        for limiter in (self.first, self.second):
+            limiter.rate, limiter.burst, limiter.lease = 100, 10, 0.05
+        self.first.try_acquire(KEY)
+        self.first.try_acquire(KEY)
+
+        time.sleep(0.1)
+
+        self.assertIsNotNone(self.second.try_acquire(KEY)[0])
+
+    def test_decoded_responses(self):
+        server = fakeredis.FakeServer()
+        decoded = ServiceLimiter(
+            initial_concurrency=4, cooldown=0, redis=fakeredis.FakeRedis(server=server, decode_responses=True)
+        )
+        decoded.release(KEY, decoded.acquire(KEY), 0.1, True)
+        decoded.release(KEY, decoded.acquire(KEY), 0.1, True)
+
+        # The stored limit is read back, not replaced by initial_concurrency.
+        self.assertEqual(decoded.limit(KEY), 1.0)
+
+    def test_async_uses_a_worker_thread(self):
+        async def call():
+            async with self.first.aslot(KEY):
+                pass
+
+        with mock.patch("XRoad.limiter.asyncio.to_thread", wraps=asyncio.to_thread) as to_thread:
+            asyncio.run(call())
+
+        self.assertEqual(
+            [c.args[0] for c in to_thread.call_args_list], [self.first.try_acquire, self.first.release]
+        )
+
+
+class TestXClientLimiter(unittest.TestCase):
+    def make_client(self, limiter, **kwargs):
+        return XClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=StubTransport(),
+            registry=WSDLRegistry(),
+            limiter=limiter,
+            **kwargs,
+        )
+
+    def test_calls_take_a_token(self):
+        client = self.make_client(ServiceLimiter(rate=1, burst=1, timeout=0))
+
+        self.assertEqual(client.request(PasNumber="AA123456")["PasNumber"], "AA123456")
+        with self.assertRaises(LimiterTimeout):
+            client.request(PasNumber="AA123457")
+
+    def test_fault_is_not_a_failure(self):
+        limiter = ServiceLimiter(initial_concurrency=4)
+        client = self.make_client(limiter)
+
+        with self.assertRaises(Fault):
+            client.request(PasNumber="FAULT-1")
+
+        self.assertGreater(limiter.limit(KEY), 4.0)
+
+    def test_raw_mode(self):
+        client = self.make_client(ServiceLimiter(rate=1, burst=1, timeout=0))
+
+        client.request(PasNumber="AA123456", xroad_response="raw")
+        with self.assertRaises(LimiterTimeout):
+            client.request(PasNumber="AA123456", xroad_response="raw")
+
+    def test_async(self):
+        limiter = ServiceLimiter(rate=1, burst=1, timeout=0)
+        client = AsyncXClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=async_stub_transport(),
+            registry=WSDLRegistry(),
+            limiter=limiter,
+        )
+
+        async def calls():
+            await client.request(PasNumber="AA123456")
+            await client.request(PasNumber="AA123457")
+
+        with self.assertRaises(LimiterTimeout):
+            asyncio.run(calls())
+
+
+if __name__ == "__main__":
+    unittest.main()
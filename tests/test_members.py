@@ -1,3 +1,5 @@
+import dataclasses
+import pickle
 import unittest
 
 from XRoad.Members import Members
@@ -75,6 +77,40 @@ class TestMembers(unittest.TestCase):
             str(ctx.exception), "wsdl_path is only available for SERVICE objectType"
         )
 
+    def test_interned_and_immutable(self):
+        member = Members(objectType="SERVICE", memberPath="instance/class/code/subsystem/service/v1")
+
+        self.assertIs(Members("SERVICE", "instance/class/code/subsystem/service/v1"), member)
+        self.assertIsNot(Members("SUBSYSTEM", "instance/class/code/subsystem/service/v1"), member)
+        self.assertIs(pickle.loads(pickle.dumps(member)), member)
+        with self.assertRaises(AttributeError):
+            member.serviceCode = "other"
+        self.assertFalse(hasattr(member, "__dict__"))
+
+    def test_member_dict_is_a_copy(self):
+        member = Members(objectType="SERVICE", memberPath="instance/class/code/subsystem/service/v1")
+
+        member.member_dict["serviceCode"] = "changed"
+
+        self.assertEqual(member.member_dict["serviceCode"], "service")
+
+    def test_member_without_subsystem(self):
+        member = Members(objectType="SERVICE", memberPath="instance/class/code//service")
+
+        self.assertEqual(member.wsdl_path, "xRoadInstance=instance&memberClass=class&memberCode=code&serviceCode=service")
+        self.assertNotIn("subsystemCode", member.member_dict)
+
+    def test_dataclass_api(self):
+        member = Members(objectType="SERVICE", memberPath="instance/class/code/subsystem/service/v1")
+
+        self.assertEqual(dataclasses.asdict(member)["serviceVersion"], "v1")
+        self.assertIs(dataclasses.replace(member), member)
+        self.assertEqual(
+            dataclasses.replace(member, memberPath="instance/class/code/subsystem/service/v2").serviceVersion, "v2"
+        )
+        self.assertEqual(Members("SUBSYSTEM", "instance/class", memberCode="code").memberCode, "code")
+        self.assertEqual(Members("SUBSYSTEM", "instance/class", memberClass="other").memberClass, "class")
+
 
 if __name__ == "__main__":
     unittest.main()
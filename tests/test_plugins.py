@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import unittest
+import urllib.request
+from unittest import mock
+
+from zeep.exceptions import Fault
+
+from benchmarks._stub import (
+    CLIENT,
+    SERVICE,
+    SSU,
+    StubSecurityServer,
+    StubTransport,
+    async_stub_transport,
+)
+from XRoad.client import AsyncXClient, XClient
+from XRoad.plugins import NULL_TIMER, PHASES, CallLogPlugin, Histogram, MetricsPlugin
+from XRoad.registry import WSDLRegistry
+from XRoad.transport import PooledTransport, RequestCompression
+
+KEY = "TEST/GOV/00000002/PRODUCER/CheckPassportStatus/v1"
+
+
+class TestHistogram(unittest.TestCase):
+    def test_buckets(self):
+        histogram = Histogram((1, 5, 10))
+        for value in (0.5, 1, 3, 7, 100):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [2, 1, 1, 1])
+        self.assertEqual(histogram.cumulative(), [("1", 2), ("5", 3), ("10", 4), ("+Inf", 5)])
+        self.assertEqual(histogram.sum, 111.5)
+        self.assertEqual(histogram.quantile(0.5), 5)
+        self.assertEqual(histogram.quantile(1.0), float("inf"))
+
+
+class TestMetricsPlugin(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsPlugin()
+        self.client = XClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=StubTransport(),
+            registry=WSDLRegistry(),
+            plugins=[self.metrics],
+        )
+
+    def test_phases(self):
+        self.client.request(PasNumber="AA123456")
+
+        for phase in (*PHASES, "total", "response_bytes"):
+            with self.subTest(phase=phase):
+                self.assertEqual(self.metrics.histogram(KEY, phase).count, 1)
+        self.assertEqual(self.metrics.transaction_id(KEY), "TX-0001")
+        self.assertIsNone(self.metrics.histogram("OTHER"))
+
+    def test_precompiled(self):
+        client = XClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=StubTransport(),
+            registry=WSDLRegistry(),
+            plugins=[self.metrics],
+            precompiled=True,
+        )
+
+        client.request(PasNumber="AA123456")
+
+        self.assertEqual(self.metrics.histogram(KEY, "build").count, 1)
+
+    def test_response_modes(self):
+        self.client.request(PasNumber="AA123456", xroad_response="raw")
+        self.client.request(PasNumber="AA123456", xroad_response="lazy")
+
+        self.assertEqual(self.metrics.histogram(KEY, "http").count, 2)
+        self.assertEqual(self.metrics.histogram(KEY, "parse").count, 1)
+
+    def test_faults(self):
+        with self.assertRaises(Fault):
+            self.client.request(PasNumber="FAULT-1")
+
+        text = self.metrics.prometheus()
+        self.assertIn(f'xroad_faults_total{{service="{KEY}",code="Server.ServerProxy.ServiceFailed"}} 1', text)
+        self.assertEqual(self.metrics.histogram(KEY, "serialize").count, 0)
+
+    def test_max_fault_codes(self):
+        metrics = MetricsPlugin(max_fault_codes=1)
+        for code in ("A", "B", "C"):
+            metrics.timer("S", "op").finish(Fault("error", code=code))
+
+        self.assertIn('xroad_faults_total{service="S",code="other"} 2', metrics.prometheus())
+
+    def test_errors(self):
+        self.metrics.timer("S", "op").finish(ConnectionError())
+
+        self.assertIn('xroad_errors_total{service="S",error="ConnectionError"} 1', self.metrics.prometheus())
+
+    def test_prometheus(self):
+        self.client.request(PasNumber="AA123456")
+
+        text = self.metrics.prometheus()
+
+        self.assertIn("# TYPE xroad_call_seconds histogram", text)
+        self.assertIn(f'xroad_call_seconds_count{{service="{KEY}",phase="http"}} 1', text)
+        self.assertIn(f'xroad_call_seconds_bucket{{service="{KEY}",phase="total",le="+Inf"}} 1', text)
+        self.assertIn(f'xroad_calls_total{{service="{KEY}"}} 1', text)
+        self.assertIn(f'xroad_payload_bytes_count{{service="{KEY}",direction="response"}} 1', text)
+
+    def test_label_escaping(self):
+        self.metrics.timer('a"b\\c', "op").finish()
+
+        self.assertIn('xroad_calls_total{service="a\\"b\\\\c"} 1', self.metrics.prometheus())
+
+    def test_slow_calls(self):
+        metrics = MetricsPlugin(slow_threshold=0, slow_keep=2)
+        client = XClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=StubTransport(),
+            registry=WSDLRegistry(),
+            plugins=[metrics],
+        )
+
+        with self.assertLogs("XRoad.plugins", "WARNING"):
+            for _ in range(3):
+                client.request(PasNumber="AA123456")
+
+        self.assertEqual(len(metrics.slow_calls), 2)
+        call = metrics.slow_calls[-1]
+        self.assertEqual(call["transaction_id"], "TX-0001")
+        self.assertEqual(set(call["phases"]), set(PHASES))
+
+    def test_slow_sample(self):
+        metrics = MetricsPlugin(slow_threshold=0, slow_sample=0)
+        metrics.timer("S", "op").finish()
+
+        self.assertEqual(len(metrics.slow_calls), 0)
+
+    def test_serve(self):
+        self.client.request(PasNumber="AA123456")
+        server = self.metrics.serve(0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            body = response.read().decode("utf-8")
+
+        self.assertEqual(body, self.metrics.prometheus())
+
+
+class TestCallLogPlugin(unittest.TestCase):
+    def setUp(self):
+        self.server = StubSecurityServer().start()
+        self.addCleanup(self.server.stop)
+
+    def make_client(self, log, transport=None, plugins=()):
+        return XClient(
+            self.server.url,
+            CLIENT,
+            SERVICE,
+            transport=transport or PooledTransport(),
+            registry=WSDLRegistry(),
+            plugins=[log, *plugins],
+        )
+
+    def test_one_record_per_call(self):
+        client = self.make_client(CallLogPlugin())
+
+        with self.assertLogs("XRoad.calls", "INFO") as logs:
+            client.request(PasNumber="AA123456", xroad_id="ID-1")
+
+        self.assertEqual(len(logs.records), 1)
+        call = logs.records[0].xroad_call
+        self.assertEqual(call["service"], KEY)
+        self.assertEqual(call["operation"], "CheckPassportStatus")
+        self.assertEqual((call["id"], call["transaction_id"], call["outcome"]), ("ID-1", "TX-0001", "ok"))
+        self.assertGreater(call["request_bytes"], 0)
+        self.assertGreater(call["response_bytes"], 0)
+        self.assertNotIn("request", call)
+        self.assertIn("id=ID-1 transaction=TX-0001", logs.output[0])
+
+    def test_disabled_logger_costs_nothing(self):
+        log = CallLogPlugin(logger=logging.getLogger("XRoad.calls.off"))
+        log.logger.setLevel(logging.ERROR)
+        self.addCleanup(log.logger.setLevel, logging.NOTSET)
+        client = self.make_client(log)
+
+        self.assertIs(client._timer("CheckPassportStatus", {}), NULL_TIMER)
+        with mock.patch.object(CallLogPlugin, "record") as record:
+            client.request(PasNumber="AA123456")
+        record.assert_not_called()
+
+        # A `MetricsPlugin` still gets its timer.
+        client = self.make_client(log, plugins=[MetricsPlugin()])
+        self.assertIsNone(client._timer("CheckPassportStatus", {}).log)
+
+    def test_failed_call_payloads_are_redacted(self):
+        log = CallLogPlugin(redact_elements=["PasNumber"], redact=[lambda text: text.replace("CLIENT", "?")])
+        client = self.make_client(log)
+
+        with self.assertLogs("XRoad.calls", "WARNING") as logs, self.assertRaises(Fault):
+            client.request(PasNumber="FAULT-1")
+
+        call = logs.records[0].xroad_call
+        self.assertEqual(call["outcome"], "fault Server.ServerProxy.ServiceFailed")
+        self.assertRegex(call["request"], r"<\w+:PasNumber>\*\*\*</")
+        self.assertNotIn("FAULT-1", call["request"])
+        self.assertNotIn("CLIENT", call["request"])
+        self.assertIn("Passport FAULT-1 not found", call["response"])
+        self.assertIn("\nrequest: ", logs.output[0])
+
+    def test_sampled_payloads(self):
+        log = CallLogPlugin(sample=1.0, max_payload=100)
+        client = self.make_client(log, transport=PooledTransport(compression=RequestCompression(min_size=0)))
+
+        with self.assertLogs("XRoad.calls", "INFO") as logs:
+            client.request(PasNumber="AA123456")
+
+        call = logs.records[0].xroad_call
+        self.assertEqual(self.server.encodings, ["gzip"])
+        self.assertTrue(call["request"].startswith("<?xml"))  # decompressed
+        self.assertRegex(call["response"], r"(?s)^.{100}\.\.\. \[\d+ more\]$")
+
+
+class TestAsyncMetricsPlugin(unittest.TestCase):
+    def test_phases(self):
+        metrics = MetricsPlugin()
+        client = AsyncXClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=async_stub_transport(),
+            registry=WSDLRegistry(),
+            plugins=[metrics],
+        )
+
+        asyncio.run(client.request(PasNumber="AA123456"))
+
+        self.assertEqual(metrics.histogram(KEY, "http").count, 1)
+        self.assertEqual(metrics.histogram(KEY, "response_bytes").count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from zeep.settings import Settings
+
+from benchmarks._stub import CLIENT, SERVICE, SSU, StubTransport
+from XRoad.client import XClient
+from XRoad.Members import Members
+from XRoad.registry import WSDLRegistry
+
+OTHER_SERVICE = "TEST/GOV/00000002/PRODUCER/CheckPassportStatus/v2"
+
+
+class TestWSDLRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = WSDLRegistry(maxsize=2, ttl=60)
+
+    def _client(self, service=SERVICE, **kwargs):
+        transport = StubTransport()
+        client = XClient(SSU, CLIENT, service, transport=transport, registry=self.registry, **kwargs)
+        return client, transport
+
+    def test_key(self):
+        member = Members(objectType="SERVICE", memberPath=SERVICE)
+        self.assertEqual(
+            WSDLRegistry.key(SSU + "/", member),
+            (SSU, "TEST/GOV/00000002/PRODUCER/CheckPassportStatus", "v1"),
+        )
+
+    def test_clients_share_parsed_document(self):
+        first, first_transport = self._client()
+        second, second_transport = self._client()
+
+        self.assertIs(first.wsdl, second.wsdl)
+        self.assertEqual(len(first_transport.loads), 1)
+        self.assertEqual(second_transport.loads, [])
+        self.assertEqual(second.request(PasNumber="AA000001")["PasNumber"], "AA000001")
+        self.assertEqual(len(second_transport.posts), 1)
+        self.assertEqual(first_transport.posts, [])
+
+    def test_ttl_expiry(self):
+        first, _ = self._client()
+        with mock.patch("XRoad.registry.time.monotonic", return_value=time.monotonic() + 61):
+            second, transport = self._client()
+
+        self.assertIsNot(first.wsdl, second.wsdl)
+        self.assertEqual(len(transport.loads), 1)
+
+    def test_maxsize_evicts_least_recently_used(self):
+        self._client(SERVICE)
+        self._client(OTHER_SERVICE)
+        self._client(SERVICE)
+        self._client("TEST/GOV/00000002/PRODUCER/CheckPassportStatus/v3")
+
+        keys = [key[2] for key in self.registry._entries]
+        self.assertEqual(keys, ["v1", "v3"])
+
+    def test_invalidate(self):
+        self._client(SERVICE)
+        self._client(OTHER_SERVICE)
+
+        self.assertEqual(self.registry.invalidate(service=SERVICE), 1)
+        self.assertEqual(len(self.registry), 1)
+        self.assertEqual(self.registry.invalidate(ssu="http://other"), 0)
+        self.assertEqual(self.registry.invalidate(), 1)
+        self.assertEqual(len(self.registry), 0)
+
+    def test_concurrent_first_load_parses_once(self):
+        transports = []
+
+        def build(_):
+            client, transport = self._client()
+            transports.append(transport)
+            return client.wsdl
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            documents = list(pool.map(build, range(16)))
+
+        self.assertEqual(len({id(d) for d in documents}), 1)
+        self.assertEqual(sum(len(t.loads) for t in transports), 1)
+
+    def test_custom_settings_bypass_registry(self):
+        self._client()
+        _, transport = self._client(settings=Settings(strict=False))
+
+        self.assertEqual(len(transport.loads), 1)
+        self.assertEqual(len(self.registry), 1)
+
+    def test_disabled_registry(self):
+        client = XClient(SSU, CLIENT, SERVICE, transport=StubTransport(), registry=None)
+        self.assertEqual(client.request(PasNumber="AA000001")["PasNumber"], "AA000001")
+
+    def test_registry_is_opt_in(self):
+        first = XClient(SSU, CLIENT, SERVICE, transport=StubTransport())
+        second = XClient(SSU, CLIENT, SERVICE, transport=StubTransport())
+
+        self.assertIsNot(first.wsdl, second.wsdl)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,245 @@
+import asyncio
+import io
+import unittest
+
+from lxml import etree
+from urllib3.exceptions import ProtocolError
+from zeep.exceptions import Fault, TransportError
+
+from benchmarks._stub import (
+    CLIENT,
+    FAULT,
+    SERVICE,
+    SSU,
+    StubTransport,
+    async_stub_transport,
+    make_response,
+)
+from XRoad.client import AsyncXClient, XClient
+from XRoad.registry import WSDLRegistry
+from XRoad.response import ElementStream, LazyElement, element_to_dict, iter_elements
+
+RESULT = b"""<ns1:Result xmlns:ns1="http://example.org/passport" kind="full">
+  <ns1:Status>VALID</ns1:Status>
+  <ns1:Person><ns1:Name>Taras</ns1:Name><ns1:Born>1814</ns1:Born></ns1:Person>
+  <!-- a comment -->
+  <ns1:Item>a</ns1:Item>
+  <ns1:Item>b</ns1:Item>
+  <ns1:Empty/>
+</ns1:Result>"""
+
+
+class TestLazyElement(unittest.TestCase):
+    def setUp(self):
+        self.view = LazyElement(etree.fromstring(RESULT))
+
+    def test_mapping(self):
+        self.assertEqual(list(self.view), ["Status", "Person", "Item", "Empty"])
+        self.assertEqual(len(self.view), 4)
+        self.assertEqual(self.view["Status"], "VALID")
+        self.assertIsNone(self.view["Empty"])
+        self.assertEqual(self.view["Item"], ["a", "b"])
+        self.assertNotIn("Missing", self.view)
+        self.assertEqual(self.view.attrib, {"kind": "full"})
+
+    def test_nested(self):
+        person = self.view["Person"]
+
+        self.assertIsInstance(person, LazyElement)
+        self.assertEqual(person["Name"], "Taras")
+
+    def test_getlist(self):
+        self.assertEqual(self.view.getlist("Status"), ["VALID"])
+        self.assertEqual(self.view.getlist("Missing"), [])
+
+    def test_to_dict(self):
+        self.assertEqual(
+            self.view.to_dict(),
+            {
+                "Status": "VALID",
+                "Person": {"Name": "Taras", "Born": "1814"},
+                "Item": ["a", "b"],
+                "Empty": None,
+            },
+        )
+        self.assertEqual(element_to_dict(self.view.element), self.view.to_dict())
+
+
+class TestIterElements(unittest.TestCase):
+    def test_yields_matches(self):
+        self.assertEqual(list(iter_elements(RESULT, "Item")), ["a", "b"])
+        self.assertEqual(
+            list(iter_elements(RESULT, "Person")), [{"Name": "Taras", "Born": "1814"}]
+        )
+
+    def test_prunes_the_tree(self):
+        content = b"<List>" + b"".join(b"<Row><N>%d</N></Row>" % i for i in range(1000)) + b"</List>"
+        rows = iter_elements(content, "Row")
+
+        for _ in range(500):
+            next(rows)
+        current = rows.gi_frame.f_locals["element"]
+        self.assertEqual(len(list(current.itersiblings(preceding=True))), 1)
+        self.assertEqual(len(list(rows)), 500)
+
+    def test_fault(self):
+        calls = []
+
+        list(iter_elements(FAULT.format(pas_number="X").encode(), "Item", on_fault=lambda: calls.append(1)))
+
+        self.assertEqual(calls, [1])
+
+
+class BrokenBody(io.BytesIO):
+    """A response body whose connection drops once `content` has been read."""
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        if not chunk:
+            raise ProtocolError("Connection broken: IncompleteRead")
+        return chunk
+
+
+class TestElementStream(unittest.TestCase):
+    def make_response(self, content, status=200):
+        response = make_response(status, b"")
+        response._content = False
+        response._content_consumed = False
+        response.raw = io.BytesIO(content)
+        return response
+
+    def test_reads_the_body_as_it_goes(self):
+        response = self.make_response(RESULT)
+
+        items = ElementStream(response, "Item")
+
+        self.assertEqual(next(items), "a")
+        self.assertFalse(response.raw.closed)
+        self.assertEqual(list(items), ["b"])
+        self.assertTrue(response.raw.closed)
+
+    def test_fault_content_is_kept(self):
+        response = self.make_response(FAULT.format(pas_number="X").encode())
+        seen = []
+
+        list(ElementStream(response, "Item", on_fault=lambda: seen.append(response.content)))
+
+        self.assertIn(b"Passport X not found", seen[0])
+        self.assertTrue(response.raw.closed)
+
+    def test_read_error_is_a_transport_error(self):
+        response = self.make_response(b"")
+        response.raw = BrokenBody(RESULT[:200])
+        done = []
+
+        items = ElementStream(response, "Item", on_done=done.append)
+
+        with self.assertRaises(TransportError):
+            list(items)
+        self.assertIsInstance(done[0], TransportError)
+        self.assertTrue(response.raw.closed)
+
+    def test_close_reports_once(self):
+        response = self.make_response(RESULT)
+        done = []
+
+        with ElementStream(response, "Item", on_done=done.append) as items:
+            next(items)
+        items.close()
+
+        self.assertEqual(done, [None])
+        self.assertTrue(response.raw.closed)
+
+
+class TestResponseModes(unittest.TestCase):
+    def setUp(self):
+        self.transport = StubTransport(items=3)
+        self.client = XClient(
+            SSU, CLIENT, SERVICE, transport=self.transport, registry=WSDLRegistry()
+        )
+
+    def test_default_is_dict(self):
+        response = self.client.request(PasNumber="AA123456")
+
+        self.assertEqual(response["Item"], ["item-0", "item-1", "item-2"])
+
+    def test_raw(self):
+        response = self.client.request(PasNumber="AA123456", xroad_response="raw")
+
+        self.assertIsInstance(response, bytes)
+        self.assertIn(b"<ns1:PasNumber>AA123456</ns1:PasNumber>", response)
+
+    def test_lazy(self):
+        response = self.client.request(PasNumber="AA123456", xroad_response="lazy")
+
+        self.assertIsInstance(response, LazyElement)
+        self.assertEqual(response["PasNumber"], "AA123456")
+        self.assertEqual(response["UserId"], "CLIENT")
+        self.assertEqual(response.getlist("Item"), ["item-0", "item-1", "item-2"])
+
+    def test_iter(self):
+        response = self.client.request(
+            PasNumber="AA123456", xroad_response="iter", xroad_items="Item"
+        )
+
+        self.assertEqual(list(response), ["item-0", "item-1", "item-2"])
+
+    def test_headers_are_sent(self):
+        self.client.request(PasNumber="AA123456", xroad_response="raw", xroad_id="ID-7")
+
+        self.assertIn(b"ID-7", self.transport.posts[-1])
+        self.assertIn(b"CheckPassportStatus", self.transport.posts[-1])
+
+    def test_client_default_mode(self):
+        client = XClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=self.transport,
+            registry=WSDLRegistry(),
+            response_mode="lazy",
+        )
+
+        self.assertIsInstance(client.request(PasNumber="AA123456"), LazyElement)
+        self.assertIsInstance(
+            client.request(PasNumber="AA123456", xroad_response="dict"), dict
+        )
+
+    def test_fault(self):
+        for mode in ("raw", "lazy", "iter"):
+            with self.subTest(mode=mode), self.assertRaises(Fault):
+                list(
+                    self.client.request(
+                        PasNumber="FAULT-1", xroad_response=mode, xroad_items="Item"
+                    ) or ()
+                )
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            self.client.request(PasNumber="AA123456", xroad_response="xml")
+        with self.assertRaises(ValueError):
+            self.client.request(PasNumber="AA123456", xroad_response="iter")
+        with self.assertRaises(ValueError):
+            XClient(
+                SSU,
+                CLIENT,
+                SERVICE,
+                transport=self.transport,
+                registry=WSDLRegistry(),
+                response_mode="xml",
+            )
+
+
+class TestAsyncResponseModes(unittest.TestCase):
+    def test_lazy(self):
+        client = AsyncXClient(
+            SSU, CLIENT, SERVICE, transport=async_stub_transport(), registry=WSDLRegistry()
+        )
+
+        response = asyncio.run(client.request(PasNumber="AA123456", xroad_response="lazy"))
+
+        self.assertEqual(response["PasNumber"], "AA123456")
+
+
+if __name__ == "__main__":
+    unittest.main()
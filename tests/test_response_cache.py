@@ -0,0 +1,202 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from zeep.cache import InMemoryCache, SqliteCache
+from zeep.exceptions import Fault
+
+from benchmarks._stub import CLIENT, SERVICE, SSU, StubTransport, async_stub_transport
+from XRoad.cache import LRUCache, RedisCache
+from XRoad.client import AsyncXClient, XClient
+from XRoad.registry import WSDLRegistry
+from XRoad.response_cache import ResponseCache
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None  # type: ignore[assignment]
+
+
+# zeep's InMemoryCache is shared by all instances, so every test uses its own prefix.
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ResponseCache(InMemoryCache(), ttl=10, fault_ttl=5, prefix=self.id())
+        self.key = self.id() + ":key"
+
+    def test_key_is_canonical(self):
+        client = {"memberCode": "1"}
+        service = {"serviceCode": "Check"}
+
+        first = self.cache.key(client, service, {"a": 1, "b": [1, 2]})
+        second = self.cache.key(client, service, {"b": [1, 2], "a": 1})
+
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith(self.id()))
+        self.assertNotEqual(first, self.cache.key(client, {"serviceCode": "Other"}, {"a": 1, "b": [1, 2]}))
+        self.assertNotEqual(first, self.cache.key(client, service, {"a": 2, "b": [1, 2]}))
+
+    def test_add_get(self):
+        self.cache.add(self.key, {"Status": "VALID"})
+
+        self.assertEqual(self.cache.get(self.key), (True, {"Status": "VALID"}))
+        self.assertEqual(self.cache.get(self.key + "other"), (False, None))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_ttl(self):
+        self.cache.add(self.key + "default", "a")
+        self.cache.add(self.key + "long", "b", ttl=100)
+
+        with mock.patch("XRoad.response_cache.time.time", return_value=time.time() + 11):
+            self.assertEqual(self.cache.get(self.key + "default"), (False, None))
+            self.assertEqual(self.cache.get(self.key + "long"), (True, "b"))
+
+    def test_fault(self):
+        self.cache.add_fault(self.key, Fault("Not found", code="Server"))
+
+        with self.assertRaises(Fault) as raised:
+            self.cache.get(self.key)
+        self.assertEqual((raised.exception.message, raised.exception.code), ("Not found", "Server"))
+
+        with mock.patch("XRoad.response_cache.time.time", return_value=time.time() + 6):
+            self.assertEqual(self.cache.get(self.key), (False, None))
+
+    def test_fault_not_cached_by_default(self):
+        cache = ResponseCache(InMemoryCache(), prefix=self.id())
+        cache.add_fault(self.key, Fault("Not found"))
+
+        self.assertEqual(cache.get(self.key), (False, None))
+
+    def test_corrupt_entry_is_a_miss(self):
+        self.cache.backend.add(self.key, b"not a pickle")
+
+        self.assertEqual(self.cache.get(self.key), (False, None))
+
+    def test_unavailable_backend_is_a_miss(self):
+        backend = mock.Mock(spec=InMemoryCache)
+        backend.get.side_effect = backend.add.side_effect = ConnectionError("store down")
+        cache = ResponseCache(backend)
+
+        cache.add(self.key, {"Status": "VALID"})
+
+        self.assertEqual(cache.get(self.key), (False, None))
+
+    def test_unpicklable_result_is_not_cached(self):
+        self.cache.add(self.key, {"Status": lambda: None})
+
+        self.assertEqual(self.cache.get(self.key), (False, None))
+
+
+class TestXClientResponseCache(unittest.TestCase):
+    def make_client(self, backend, **kwargs):
+        self.transport = StubTransport()
+        return XClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=self.transport,
+            registry=WSDLRegistry(),
+            response_cache=ResponseCache(backend, fault_ttl=5, prefix=self.id()),
+            **kwargs,
+        )
+
+    def check_backend(self, backend):
+        client = self.make_client(backend)
+
+        first = client.request(PasNumber="AA123456")
+        second = client.request(PasNumber="AA123456")
+        client.request(PasNumber="AA654321")
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.transport.posts), 2)
+        self.assertEqual(client.response_cache.hits, 1)
+
+    def test_in_memory(self):
+        self.check_backend(InMemoryCache())
+
+    def test_lru(self):
+        self.check_backend(LRUCache())
+
+    def test_sqlite(self):
+        with tempfile.TemporaryDirectory() as path:
+            self.check_backend(SqliteCache(path=os.path.join(path, "responses.db")))
+
+    @unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+    def test_redis(self):
+        self.check_backend(RedisCache(fakeredis.FakeRedis(), timeout=60))
+
+    def test_bypass(self):
+        client = self.make_client(InMemoryCache())
+
+        client.request(PasNumber="AA123456", xroad_cache=False)
+        client.request(PasNumber="AA123456")
+        client.request(PasNumber="AA123456", xroad_cache=False)
+
+        self.assertEqual(len(self.transport.posts), 3)
+        self.assertEqual(client.response_cache.hits, 0)
+
+    def test_per_call_id_is_not_part_of_the_key(self):
+        client = self.make_client(InMemoryCache())
+
+        client.request(PasNumber="AA123456", xroad_id="first")
+        response = client.request(PasNumber="AA123456", xroad_id="second")
+
+        self.assertEqual(response["RequestId"], "first")
+        self.assertEqual(len(self.transport.posts), 1)
+
+    def test_user_id_is_part_of_the_key(self):
+        client = self.make_client(InMemoryCache())
+
+        client.request(PasNumber="AA123456", xroad_user_id="alice")
+        response = client.request(PasNumber="AA123456", xroad_user_id="bob")
+
+        self.assertEqual(response["UserId"], "bob")
+        self.assertEqual(len(self.transport.posts), 2)
+
+    def test_response_ttl(self):
+        client = self.make_client(InMemoryCache(), response_ttl=0)
+
+        client.request(PasNumber="AA123456")
+        client.request(PasNumber="AA123456")
+
+        self.assertEqual(len(self.transport.posts), 2)
+
+    def test_fault(self):
+        client = self.make_client(InMemoryCache())
+
+        for _ in range(2):
+            with self.assertRaises(Fault):
+                client.request(PasNumber="FAULT-1")
+
+        self.assertEqual(len(self.transport.posts), 1)
+
+
+class TestAsyncXClientResponseCache(unittest.TestCase):
+    def test_request(self):
+        stats: dict = {}
+        client = AsyncXClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=async_stub_transport(stats=stats),
+            registry=WSDLRegistry(),
+            response_cache=ResponseCache(InMemoryCache(), prefix=self.id()),
+        )
+
+        async def run():
+            first = await client.request(PasNumber="AA123456")
+            second = await client.request(PasNumber="AA123456")
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        self.assertEqual(first, second)
+        self.assertEqual(stats["posts"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
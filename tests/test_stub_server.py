@@ -0,0 +1,141 @@
+import time
+import unittest
+from unittest import mock
+
+import requests
+from zeep.cache import InMemoryCache
+from zeep.exceptions import Fault, TransportError
+
+from benchmarks._stub import CLIENT, SERVICE, StubSecurityServer
+from XRoad.client import XClient
+from XRoad.limiter import LimiterTimeout, ServiceLimiter
+from XRoad.plugins import MetricsPlugin
+from XRoad.registry import WSDLRegistry
+from XRoad.transport import CircuitBreaker, PooledTransport
+
+KEY = "TEST/GOV/00000002/PRODUCER/CheckPassportStatus/v1"
+
+
+class TestStubSecurityServer(unittest.TestCase):
+    def setUp(self):
+        self.server = StubSecurityServer().start()
+        self.addCleanup(self.server.stop)
+
+    def make_client(self, limiter=None, plugins=(), **kwargs):
+        return XClient(
+            self.server.url,
+            CLIENT,
+            SERVICE,
+            transport=PooledTransport(InMemoryCache(timeout=0), **kwargs),
+            registry=WSDLRegistry(),
+            limiter=limiter,
+            plugins=list(plugins),
+        )
+
+    def test_request(self):
+        response = self.make_client().request(PasNumber="AA123456", xroad_id="ID-1")
+
+        self.assertEqual(response["PasNumber"], "AA123456")
+        self.assertEqual(response["RequestId"], "ID-1")
+        self.assertEqual((self.server.wsdl_loads, self.server.posts), (1, 1))
+
+    def test_fault(self):
+        with self.assertRaises(Fault):
+            self.make_client().request(PasNumber="FAULT-1")
+
+    def test_response_size(self):
+        client = self.make_client()
+        self.server.items = 50
+
+        response = client.request(PasNumber="AA123456", xroad_response="raw")
+
+        self.assertEqual(response.count(b"<ns1:Item>"), 50)
+
+    def test_compressed_response(self):
+        self.server.gzip = True
+
+        for decompress in (True, False):
+            with self.subTest(decompress=decompress):
+                client = self.make_client(decompress=decompress)
+                response = client.transport.session.get(f"{self.server.url}/listClients")
+
+                self.assertEqual(response.headers.get("Content-Encoding") == "gzip", decompress)
+                self.assertIn(b"Producer Agency", response.content)
+                self.assertEqual(client.request(PasNumber="AA123456")["PasNumber"], "AA123456")
+
+    def test_streamed_iter(self):
+        client = self.make_client()
+        self.server.gzip = True
+        self.server.items = 100000
+
+        # The body is parsed off the socket and never held as a whole.
+        with mock.patch.object(requests.Response, "content", new_callable=mock.PropertyMock) as content:
+            items = client.request(PasNumber="AA123456", xroad_response="iter", xroad_items="Item")
+            self.assertEqual(next(items), "item-0")
+            self.assertEqual(sum(1 for _ in items), 99999)
+
+        content.assert_not_called()
+
+    def test_streamed_iter_fault(self):
+        with self.assertRaises(Fault):
+            list(self.make_client().request(PasNumber="FAULT-1", xroad_response="iter", xroad_items="Item"))
+
+    def test_stream_holds_slot_and_timer(self):
+        metrics = MetricsPlugin()
+        limiter = ServiceLimiter(max_concurrency=1, initial_concurrency=1, timeout=0)
+        client = self.make_client(limiter=limiter, plugins=[metrics])
+        self.server.items = 1000
+
+        items = client.request(PasNumber="AA123456", xroad_response="iter", xroad_items="Item")
+        next(items)
+        with self.assertRaises(LimiterTimeout):
+            client.request(PasNumber="AA123456")
+        self.assertIsNone(metrics.histogram(KEY))
+
+        self.assertEqual(sum(1 for _ in items), 999)
+        self.assertEqual(metrics.histogram(KEY, "parse").count, 1)
+        self.assertEqual(client.request(PasNumber="AA123456")["PasNumber"], "AA123456")
+
+    def test_abandoned_stream_closes_the_connection(self):
+        client = self.make_client()
+        self.server.items = 10000
+        client.request(PasNumber="AA123456")
+        connections = self.server.connections
+        client.request(PasNumber="AA123456")
+        self.assertEqual(self.server.connections, connections)
+
+        with client.request(PasNumber="AA123456", xroad_response="iter", xroad_items="Item") as items:
+            next(items)
+        items = client.request(PasNumber="AA123456", xroad_response="iter", xroad_items="Item")
+        next(items)
+        del items
+        client.request(PasNumber="AA123456")
+
+        # Connections with unread data are closed rather than returned to the pool.
+        self.assertEqual(self.server.connections, connections + 2)
+
+    def test_broken_stream_is_a_failure(self):
+        metrics = MetricsPlugin()
+        client = self.make_client(plugins=[metrics], breaker=CircuitBreaker(failure_threshold=1))
+        self.server.items = 10000
+        self.server.truncate = True
+
+        with self.assertRaises(TransportError):
+            list(client.request(PasNumber="AA123456", xroad_response="iter", xroad_items="Item"))
+
+        self.assertEqual(client.transport.breaker.state(KEY), "open")
+        self.assertIn(f'xroad_errors_total{{service="{KEY}",error="TransportError"}} 1', metrics.prometheus())
+
+    def test_latency(self):
+        client = self.make_client()
+        self.server.latency = 0.05
+
+        started = time.perf_counter()
+        outcomes = list(client.request_many([{"PasNumber": f"AA{i}"} for i in range(8)], max_workers=8))
+
+        self.assertLess(time.perf_counter() - started, 0.05 * 8)
+        self.assertEqual(len(outcomes), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
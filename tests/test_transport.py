@@ -0,0 +1,334 @@
+import gzip
+import os
+import socket
+import time
+import unittest
+import zlib
+from unittest import mock
+
+import requests
+from lxml import etree
+
+from benchmarks._stub import (
+    IDEN,
+    NSMAP,
+    XRO,
+    StubSecurityServer,
+    envelope,
+    make_response,
+)
+from XRoad.transport import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DRACTransport,
+    PooledTransport,
+    RequestCompression,
+    _join_iden_lines,
+    _legacy_drac_message,
+    drac_message,
+)
+
+SERVICE_KEY = "xRoadInstance-value/memberClass-value/memberCode-value/subsystemCode-value"
+
+
+def legacy(envelope):
+    message = etree.tostring(
+        envelope, pretty_print=True, xml_declaration=True, encoding="utf-8"
+    ).decode("utf-8")
+    return _legacy_drac_message(message).encode("utf-8")
+
+
+class TestDracMessage(unittest.TestCase):
+    def assertEquivalent(self, root):
+        self.assertEqual(drac_message(root), legacy(root))
+
+    def test_iden_lines_are_joined(self):
+        message = drac_message(envelope())
+
+        self.assertIn(
+            b'<xro:client iden:objectType="SUBSYSTEM">      <iden:xRoadInstance>', message
+        )
+        self.assertTrue(message.endswith(b"</SOAP-ENV:Envelope>\n"))
+        self.assertEquivalent(envelope())
+
+    def test_equivalence(self):
+        cases = [
+            envelope(),
+            envelope(items=0),
+            envelope(items=500),
+            envelope("Шевченко Тарас Григорович"),
+            envelope("text with iden: inside"),
+            envelope("multi\nline\ntext"),
+            envelope("carriage\rreturn"),
+            envelope("next\u0085line"),
+            envelope("line\u2028separator\u2029paragraph"),
+            envelope("&<>\"'", attribute="a\nb\tc"),
+            envelope(""),
+        ]
+        for root in cases:
+            with self.subTest(text=root.findtext(".//{http://example.org/drac}Item")):
+                self.assertEquivalent(root)
+
+    def test_without_iden(self):
+        root = etree.Element("root")
+        etree.SubElement(root, "child").text = "value"
+        self.assertEquivalent(root)
+
+    def test_last_line_with_iden(self):
+        root = etree.Element(f"{{{IDEN}}}memberCode", nsmap=NSMAP)
+        root.text = "123"
+        self.assertEquivalent(root)
+
+    def test_join_iden_lines(self):
+        cases = [
+            "",
+            "\n",
+            "a",
+            "a\n",
+            "<iden:a>1</iden:a>",
+            "<iden:a>1</iden:a>\n",
+            "x\n<iden:a>1</iden:a>\ny",
+            "x\n<iden:a>1</iden:a>\n<iden:b>2</iden:b>\ny\n",
+            "x\n\n<iden:a/>\n\nz",
+            "iden: iden:\niden:\n\n",
+        ]
+        for message in cases:
+            with self.subTest(message=message):
+                self.assertEqual(
+                    _join_iden_lines(message.encode("utf-8")),
+                    _legacy_drac_message(message).encode("utf-8"),
+                )
+
+
+class TestDRACTransport(unittest.TestCase):
+    def test_post_xml(self):
+        sent = []
+
+        class Recorder(DRACTransport):
+            def post(self, address, message, headers):
+                sent.append((address, message, headers))
+
+        root = envelope()
+        Recorder().post_xml("http://drac", root, {"SOAPAction": ""})
+
+        self.assertEqual(sent, [("http://drac", legacy(root), {"SOAPAction": ""})])
+
+
+
+class TestRequestCompression(unittest.TestCase):
+    ADDRESS = "http://producer.example.org/passport"
+
+    def test_encode(self):
+        message = b"<Item>AA123456</Item>" * 100
+
+        body, headers = RequestCompression().encode(self.ADDRESS, message, {"SOAPAction": ""})
+        self.assertEqual(gzip.decompress(body), message)
+        self.assertEqual(headers, {"SOAPAction": "", "Content-Encoding": "gzip"})
+
+        body, headers = RequestCompression("deflate").encode(self.ADDRESS, message, {})
+        self.assertEqual(zlib.decompress(body), message)
+        self.assertEqual(headers, {"Content-Encoding": "deflate"})
+
+    def test_plain_bodies(self):
+        compression = RequestCompression(min_size=100)
+
+        for message in (b"<Item/>", os.urandom(1000)):
+            with self.subTest(size=len(message)):
+                self.assertEqual(compression.encode(self.ADDRESS, message, {}), (message, {}))
+
+    def test_rejected_address_is_sent_plain(self):
+        compression = RequestCompression(min_size=0)
+        message = b"<Item>AA123456</Item>" * 100
+
+        self.assertFalse(compression.rejected(self.ADDRESS, make_response(500, b"")))
+        self.assertTrue(compression.rejected(self.ADDRESS, make_response(415, b"")))
+
+        self.assertEqual(compression.encode(self.ADDRESS, message, {}), (message, {}))
+        self.assertNotEqual(compression.encode("http://other", message, {})[0], message)
+
+    def test_unknown_encoding(self):
+        with self.assertRaises(ValueError):
+            RequestCompression("br")
+
+
+class TestCompressedPosts(unittest.TestCase):
+    def setUp(self):
+        self.server = StubSecurityServer().start()
+        self.addCleanup(self.server.stop)
+        self.message = envelope(items=200)
+
+    def test_pooled_transport(self):
+        transport = PooledTransport(compression=RequestCompression())
+
+        response = transport.post_xml(self.server.url, self.message, {})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.encodings, ["gzip"])
+
+    def test_fallback_to_plain(self):
+        self.server.accept_compressed = False
+        transports = (
+            PooledTransport(compression=RequestCompression()),
+            DRACTransport(compression=RequestCompression("deflate")),
+        )
+
+        for transport in transports:
+            with self.subTest(transport=type(transport).__name__):
+                del self.server.encodings[:]
+                for _ in range(2):
+                    response = transport.post_xml(self.server.url, self.message, {})
+                    self.assertEqual(response.status_code, 200)
+                encoding = transport.compression.encoding
+                self.assertEqual(self.server.encodings, [encoding, None, None])
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=10)
+        for _ in range(2):
+            breaker.failure("a")
+        self.assertTrue(breaker.allow("a"))
+
+        breaker.failure("a")
+
+        self.assertFalse(breaker.allow("a"))
+        self.assertEqual(breaker.state("a"), "open")
+        self.assertTrue(breaker.allow("b"))
+
+    def test_success_resets(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.failure("a")
+        breaker.success("a")
+        breaker.failure("a")
+
+        self.assertEqual(breaker.state("a"), "closed")
+
+    def test_half_open(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10)
+        breaker.failure("a")
+
+        with mock.patch("XRoad.transport.time.monotonic", return_value=time.monotonic() + 11):
+            self.assertEqual(breaker.state("a"), "half-open")
+            self.assertTrue(breaker.allow("a"))
+            self.assertFalse(breaker.allow("a"))  # One trial at a time.
+            breaker.failure("a")
+            self.assertFalse(breaker.allow("a"))
+
+        with mock.patch("XRoad.transport.time.monotonic", return_value=time.monotonic() + 22):
+            self.assertTrue(breaker.allow("a"))
+            breaker.success("a")
+        self.assertEqual(breaker.state("a"), "closed")
+
+    def test_threshold_validation(self):
+        with self.assertRaises(ValueError):
+            CircuitBreaker(failure_threshold=0)
+
+
+class TestPooledTransport(unittest.TestCase):
+    ADDRESS = "http://producer.example.org/passport"
+
+    def make_transport(self, responses, **kwargs):
+        transport = PooledTransport(**kwargs)
+        transport.session.post = mock.Mock(side_effect=responses)
+        transport._sleep = mock.Mock()
+        return transport
+
+    def test_pool_settings(self):
+        transport = PooledTransport(pool_maxsize=64, keep_alive=False)
+        adapter = transport.session.get_adapter(self.ADDRESS)
+
+        self.assertEqual(adapter._pool_maxsize, 64)
+        self.assertEqual(adapter.max_retries.allowed_methods, frozenset({"GET"}))
+        self.assertEqual(transport.session.headers["Connection"], "close")
+
+    def test_proxy_connections_disable_nagle(self):
+        adapter = PooledTransport().session.get_adapter(self.ADDRESS)
+
+        manager = adapter.proxy_manager_for("http://security-server")
+
+        self.assertIn(
+            (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1), manager.connection_pool_kw["socket_options"]
+        )
+
+    def test_safe_operation_is_retried(self):
+        ok = make_response(200, b"<ok/>")
+        transport = self.make_transport(
+            [requests.ConnectionError("refused"), make_response(503, b""), ok],
+            safe_operations=["GetActRecords"],
+        )
+
+        response = transport.post_xml(self.ADDRESS, envelope(), {})
+
+        self.assertIs(response, ok)
+        self.assertEqual(transport.session.post.call_count, 3)
+        self.assertEqual(transport._sleep.call_count, 2)
+        self.assertEqual(transport.breaker.state(SERVICE_KEY), "closed")
+
+    def test_unsafe_operation_is_not_retried(self):
+        transport = self.make_transport([requests.ConnectionError("refused")])
+
+        with self.assertRaises(requests.ConnectionError):
+            transport.post_xml(self.ADDRESS, envelope(), {})
+        self.assertEqual(transport.session.post.call_count, 1)
+
+    def test_fault_status_is_not_retried(self):
+        fault = make_response(500, b"<fault/>")
+        transport = self.make_transport([fault], safe_operations=["*"])
+
+        self.assertIs(transport.post_xml(self.ADDRESS, envelope(), {}), fault)
+        self.assertEqual(transport.session.post.call_count, 1)
+
+    def test_retries_exhausted(self):
+        transport = self.make_transport(
+            [make_response(503, b"")] * 3, safe_operations=["*"], retries=2
+        )
+
+        response = transport.post_xml(self.ADDRESS, envelope(), {})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(transport.session.post.call_count, 3)
+
+    def test_circuit_breaker_fails_fast(self):
+        transport = self.make_transport(
+            [requests.ConnectTimeout("timeout")] * 2,
+            breaker=CircuitBreaker(failure_threshold=2),
+        )
+        for _ in range(2):
+            with self.assertRaises(requests.ConnectTimeout):
+                transport.post_xml(self.ADDRESS, envelope(), {})
+
+        with self.assertRaises(CircuitOpenError):
+            transport.post_xml(self.ADDRESS, envelope(), {})
+        self.assertEqual(transport.session.post.call_count, 2)
+
+    def test_circuit_per_service(self):
+        transport = self.make_transport(
+            [requests.ConnectTimeout("timeout"), make_response(200, b"<ok/>")],
+            breaker=CircuitBreaker(failure_threshold=1),
+        )
+        other = envelope()
+        other.find(f".//{{{XRO}}}service/{{{IDEN}}}subsystemCode").text = "OTHER"
+        with self.assertRaises(requests.ConnectTimeout):
+            transport.post_xml(self.ADDRESS, envelope(), {})
+
+        # Same security server and address, another service: not affected.
+        self.assertEqual(transport.post_xml(self.ADDRESS, other, {}).status_code, 200)
+        with self.assertRaises(CircuitOpenError):
+            transport.post_xml(self.ADDRESS, envelope(), {})
+        self.assertEqual(transport.breaker.state(SERVICE_KEY), "open")
+        self.assertEqual(transport.breaker.state(self.ADDRESS), "closed")
+
+    def test_backoff_is_jittered_and_capped(self):
+        transport = PooledTransport(backoff=1, backoff_max=3)
+
+        with mock.patch("XRoad.transport.time.sleep") as sleep, mock.patch(
+                "XRoad.transport.random.uniform", side_effect=lambda a, b: b
+        ):
+            for attempt in range(4):
+                transport._sleep(attempt)
+
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [1, 2, 3, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
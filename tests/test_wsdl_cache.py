@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks._stub import CLIENT, SERVICE, SSU, WSDL, StubTransport
+from XRoad.client import XClient
+from XRoad.registry import WSDLRegistry
+from XRoad.wsdl_cache import CompiledWSDLCache
+
+EXTRA_XSD = "http://security-server/extra.xsd"
+EXTRA = b"""<xsd:schema xmlns:xsd="http://www.w3.org/2001/XMLSchema"
+    targetNamespace="http://example.org/extra">
+  <xsd:element name="%s" type="xsd:string"/>
+</xsd:schema>"""
+
+
+class ImportingTransport(StubTransport):
+    """
+    Serves the stub WSDL with an extra imported XSD whose element is `extra`.
+    """
+
+    extra = "Note"
+
+    def _load_remote_data(self, url):
+        if url == EXTRA_XSD:
+            self.loads.append(url)
+            return EXTRA % self.extra.encode()
+        return super()._load_remote_data(url).replace(
+            b'<xsd:schema targetNamespace="http://example.org/passport" elementFormDefault="qualified">',
+            b'<xsd:schema targetNamespace="http://example.org/passport" elementFormDefault="qualified">'
+            b'<xsd:import namespace="http://example.org/extra" schemaLocation="%s"/>' % EXTRA_XSD.encode(),
+        )
+
+
+class TestCompiledWSDLCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = CompiledWSDLCache(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _client(self, cache=None):
+        transport = StubTransport()
+        client = XClient(
+            SSU,
+            CLIENT,
+            SERVICE,
+            transport=transport,
+            registry=WSDLRegistry(),
+            compiled_cache=cache or self.cache,
+        )
+        return client, transport
+
+    def _files(self):
+        return [name for name in os.listdir(self.tmp.name) if name.endswith(".wsdl.pickle")]
+
+    def test_round_trip(self):
+        first, _ = self._client()
+        self.assertEqual(len(self._files()), 1)
+
+        second, transport = self._client()
+
+        self.assertIsNot(first.wsdl, second.wsdl)
+        self.assertIs(second.wsdl.transport, transport)
+        response = second.request(PasNumber="AA000001", xroad_id="ID-1")
+        self.assertEqual(response["PasNumber"], "AA000001")
+        self.assertEqual(response["RequestId"], "ID-1")
+        self.assertEqual(len(transport.posts), 1)
+
+    def test_key_depends_on_content(self):
+        self.assertNotEqual(self.cache.key(WSDL), self.cache.key(WSDL + b" "))
+        self.assertEqual(self.cache.key(WSDL), CompiledWSDLCache(self.tmp.name).key(WSDL))
+
+    def test_format_mismatch_falls_back(self):
+        self._client()
+        path = os.path.join(self.tmp.name, self._files()[0])
+        with open(path, "rb") as fh:
+            fh.readline()
+            fh.readline()
+            payload = fh.read()
+        with open(path, "wb") as fh:
+            fh.write(b"PYXROAD-WSDL\n{\"format\": 0}\n" + payload)
+
+        self.assertIsNone(self.cache.load(WSDL, StubTransport()))
+        client, _ = self._client()
+        self.assertEqual(client.request(PasNumber="AA000001")["PasNumber"], "AA000001")
+        self.assertIsNotNone(self.cache.load(WSDL, StubTransport()))
+
+    def test_corrupt_file_falls_back(self):
+        self._client()
+        path = os.path.join(self.tmp.name, self._files()[0])
+        with open(path, "r+b") as fh:
+            fh.seek(-20, os.SEEK_END)
+            fh.write(b"\x00" * 20)
+
+        client, _ = self._client()
+        self.assertEqual(client.request(PasNumber="AA000001")["PasNumber"], "AA000001")
+
+    def test_changed_import_is_stale(self):
+        transport = ImportingTransport()
+        self.cache.document(SSU, transport)
+        self.assertIsNotNone(self.cache.load(transport.load(SSU), ImportingTransport()))
+
+        changed = ImportingTransport()
+        changed.extra = "Remark"
+
+        self.assertIsNone(self.cache.load(changed.load(SSU), changed))
+        document = self.cache.document(SSU, changed)
+        self.assertIsNotNone(document.types.get_element("{http://example.org/extra}Remark"))
+        self.assertIsNotNone(self.cache.load(changed.load(SSU), changed))
+
+    def test_clear(self):
+        self._client()
+        self.cache.clear()
+        self.assertEqual(self._files(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()